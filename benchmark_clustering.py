@@ -0,0 +1,27 @@
+import random
+import timeit
+
+from opengate.test.test_cluster_candidates import (
+    random_boxes,
+    reference_get_cluster_candidates,
+)
+from opengate.util.object import get_cluster_candidates
+
+frame_shape = (1080, 1920)
+min_region = 320
+rng = random.Random(0)
+
+for count in [5, 20, 50, 100, 200]:
+    box_sets = [random_boxes(rng, frame_shape, count, 150) for _ in range(20)]
+
+    for name, function in [
+        ("loops", reference_get_cluster_candidates),
+        ("numpy", get_cluster_candidates),
+    ]:
+        duration = timeit.timeit(
+            lambda: [function(frame_shape, min_region, boxes) for boxes in box_sets],
+            number=5,
+        )
+        print(
+            f"{count} boxes {name}: {duration / (5 * len(box_sets)) * 1000:.3f}ms per call"
+        )
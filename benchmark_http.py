@@ -0,0 +1,41 @@
+import threading
+import time
+
+import numpy as np
+from pydantic import parse_obj_as
+
+from opengate.detectors import DetectorConfig
+from opengate.detectors.plugins.http_api import HttpDetector
+from opengate.test.detection_server import create_server
+
+requests_per_run = 200
+delay = 0.02
+server = create_server(0, delay, error_rate=0.05)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+api_url = f"http://127.0.0.1:{server.server_address[1]}/v1/vision/detection"
+
+frames = np.random.default_rng(0).integers(0, 255, (8, 320, 320, 3), np.uint8)
+
+for batch_size in [1, 2, 4, 8]:
+    detector_config = parse_obj_as(
+        DetectorConfig,
+        {
+            "type": "http",
+            "api_url": api_url,
+            "api_timeout": 1,
+            "batch_size": batch_size,
+            "model": {"path": "/etc/hosts"},
+        },
+    )
+    detector = HttpDetector(detector_config)
+
+    start = time.monotonic()
+    for i in range(0, requests_per_run, batch_size):
+        detector.detect_raw_batch(frames[:batch_size])
+    duration = time.monotonic() - start
+
+    latency, error_rate = detector.get_stats()
+    print(
+        f"{batch_size} in flight: {requests_per_run / duration:.1f} requests/s, "
+        f"{latency:.1f}ms latency, {error_rate:.2f} error rate"
+    )
@@ -27,8 +27,10 @@ from opengate.const import (
     CLIPS_DIR,
     CONFIG_DIR,
     DEFAULT_DB_PATH,
+    DETECTION_SLOTS,
     EXPORT_DIR,
     MODEL_CACHE_DIR,
+    MOTION_CACHE_DIR,
     OPENGATE_EMBLEM,
     RECORD_DIR,
 )
@@ -39,7 +41,7 @@ from opengate.events.maintainer import EventProcessor
 from opengate.http import create_app
 from opengate.log import log_process, root_configurer
 from opengate.models import Event, Recordings, RecordingsToDelete, Regions, Timeline
-from opengate.object_detection import ObjectDetectProcess
+from opengate.object_detection import DetectorQueue, ObjectDetectProcess
 from opengate.object_processing import TrackedObjectProcessor
 from opengate.output import output_frames
 from opengate.ptz.autotrack import PtzAutoTrackerThread
@@ -50,9 +52,11 @@ from opengate.stats import StatsEmitter, stats_init
 from opengate.storage import StorageMaintainer
 from opengate.timeline import TimelineProcessor
 from opengate.types import CameraMetricsTypes, FeatureMetricsTypes, PTZMetricsTypes
+from opengate.util.image import SharedMemoryFrameRing
+from opengate.util.ipc import DetectionSlots, MessagePipe
 from opengate.util.object import get_camera_regions_grid
 from opengate.version import VERSION
-from opengate.video import capture_camera, track_camera
+from opengate.video import capture_camera, capture_cameras, track_camera
 from opengate.watchdog import OpenGateWatchdog
 
 logger = logging.getLogger(__name__)
@@ -61,10 +65,11 @@ logger = logging.getLogger(__name__)
 class OpenGateApp:
     def __init__(self) -> None:
         self.stop_event: MpEvent = mp.Event()
-        self.detection_queue: Queue = mp.Queue()
+        self.detector_queues: dict[str, DetectorQueue] = {}
         self.detectors: dict[str, ObjectDetectProcess] = {}
-        self.detection_out_events: dict[str, MpEvent] = {}
-        self.detection_shms: list[mp.shared_memory.SharedMemory] = []
+        self.detection_responses: dict[str, MessagePipe] = {}
+        self.detection_slots: dict[str, DetectionSlots] = {}
+        self.frame_rings: dict[str, SharedMemoryFrameRing] = {}
         self.log_queue: Queue = mp.Queue()
         self.camera_metrics: dict[str, CameraMetricsTypes] = {}
         self.feature_metrics: dict[str, FeatureMetricsTypes] = {}
@@ -83,6 +88,7 @@ class OpenGateApp:
             CLIPS_DIR,
             CACHE_DIR,
             MODEL_CACHE_DIR,
+            MOTION_CACHE_DIR,
             EXPORT_DIR,
         ]:
             if not os.path.exists(d) and not os.path.islink(d):
@@ -120,6 +126,9 @@ class OpenGateApp:
                 "skipped_fps": mp.Value("d", 0.0),  # type: ignore[typeddict-item]
                 # issue https://github.com/python/typeshed/issues/8799
                 # from mypy 0.981 onwards
+                "bytes_copied": mp.Value("Q", 0),  # type: ignore[typeddict-item]
+                # issue https://github.com/python/typeshed/issues/8799
+                # from mypy 0.981 onwards
                 "process_fps": mp.Value("d", 0.0),  # type: ignore[typeddict-item]
                 # issue https://github.com/python/typeshed/issues/8799
                 # from mypy 0.981 onwards
@@ -162,6 +171,21 @@ class OpenGateApp:
                 "ffmpeg_pid": mp.Value("i", 0),  # type: ignore[typeddict-item]
                 # issue https://github.com/python/typeshed/issues/8799
                 # from mypy 0.981 onwards
+                "idle": mp.Value("i", 0),  # type: ignore[typeddict-item]
+                # issue https://github.com/python/typeshed/issues/8799
+                # from mypy 0.981 onwards
+                "region_cache_hits": mp.Value("i", 0),  # type: ignore[typeddict-item]
+                # issue https://github.com/python/typeshed/issues/8799
+                # from mypy 0.981 onwards
+                "region_cache_misses": mp.Value("i", 0),  # type: ignore[typeddict-item]
+                # issue https://github.com/python/typeshed/issues/8799
+                # from mypy 0.981 onwards
+                "region_cache_forced_refreshes": mp.Value(  # type: ignore[typeddict-item]
+                    # issue https://github.com/python/typeshed/issues/8799
+                    # from mypy 0.981 onwards
+                    "i",
+                    0,
+                ),
                 "frame_queue": mp.Queue(maxsize=2),
                 "region_grid_queue": mp.Queue(maxsize=1),
                 "capture_process": None,
@@ -373,7 +397,11 @@ class OpenGateApp:
 
     def init_stats(self) -> None:
         self.stats_tracking = stats_init(
-            self.config, self.camera_metrics, self.detectors, self.processes
+            self.config,
+            self.camera_metrics,
+            self.detectors,
+            self.processes,
+            self.frame_rings,
         )
 
     def init_external_event_processor(self) -> None:
@@ -420,39 +448,39 @@ class OpenGateApp:
         )
 
     def start_detectors(self) -> None:
+        largest_frame = max(
+            [
+                det.model.height * det.model.width * 3
+                for (name, det) in self.config.detectors.items()
+            ]
+        )
+        max_detections = max(
+            [det.model.max_detections for det in self.config.detectors.values()]
+        )
+
         for name in self.config.cameras.keys():
-            self.detection_out_events[name] = mp.Event()
+            # slots the detectors have responded to
+            self.detection_responses[name] = MessagePipe("<H")
 
             try:
-                largest_frame = max(
-                    [
-                        det.model.height * det.model.width * 3
-                        for (name, det) in self.config.detectors.items()
-                    ]
-                )
-                shm_in = mp.shared_memory.SharedMemory(
-                    name=name,
-                    create=True,
-                    size=largest_frame,
+                self.detection_slots[name] = DetectionSlots(
+                    name, DETECTION_SLOTS, largest_frame, max_detections, create=True
                 )
             except FileExistsError:
-                shm_in = mp.shared_memory.SharedMemory(name=name)
-
-            try:
-                shm_out = mp.shared_memory.SharedMemory(
-                    name=f"out-{name}", create=True, size=20 * 6 * 4
+                # left over from an unclean exit
+                mp.shared_memory.SharedMemory(name=name).unlink()
+                self.detection_slots[name] = DetectionSlots(
+                    name, DETECTION_SLOTS, largest_frame, max_detections, create=True
                 )
-            except FileExistsError:
-                shm_out = mp.shared_memory.SharedMemory(name=f"out-{name}")
-
-            self.detection_shms.append(shm_in)
-            self.detection_shms.append(shm_out)
 
+        cameras = list(self.config.cameras.keys())
         for name, detector_config in self.config.detectors.items():
+            self.detector_queues[name] = DetectorQueue(name, cameras)
+
             self.detectors[name] = ObjectDetectProcess(
                 name,
-                self.detection_queue,
-                self.detection_out_events,
+                self.detector_queues[name],
+                self.detection_responses,
                 detector_config,
             )
 
@@ -508,6 +536,18 @@ class OpenGateApp:
                 max(self.config.model.width, self.config.model.height),
             )
 
+    def init_frame_rings(self) -> None:
+        for name, config in self.config.cameras.items():
+            if not config.enabled:
+                continue
+
+            self.frame_rings[name] = SharedMemoryFrameRing(
+                name,
+                config.frame_shape_yuv[0] * config.frame_shape_yuv[1],
+                config.detect.frame_slots,
+                create=True,
+            )
+
     def start_camera_processors(self) -> None:
         for name, config in self.config.cameras.items():
             if not self.config.cameras[name].enabled:
@@ -522,8 +562,8 @@ class OpenGateApp:
                     config,
                     self.config.model,
                     self.config.model.merged_labelmap,
-                    self.detection_queue,
-                    self.detection_out_events[name],
+                    list(self.detector_queues.values()),
+                    self.detection_responses[name],
                     self.detected_frames_queue,
                     self.inter_process_queue,
                     self.camera_metrics[name],
@@ -537,6 +577,10 @@ class OpenGateApp:
             logger.info(f"Camera processor started for {name}: {camera_process.pid}")
 
     def start_camera_capture_processes(self) -> None:
+        if self.config.capture.multiplexed:
+            self.start_multiplexed_capture_processes()
+            return
+
         for name, config in self.config.cameras.items():
             if not self.config.cameras[name].enabled:
                 logger.info(f"Capture process not started for disabled camera {name}")
@@ -552,6 +596,33 @@ class OpenGateApp:
             capture_process.start()
             logger.info(f"Capture process started for {name}: {capture_process.pid}")
 
+    def start_multiplexed_capture_processes(self) -> None:
+        cameras = [
+            name for name, config in self.config.cameras.items() if config.enabled
+        ]
+        process_count = min(self.config.capture.processes, len(cameras))
+
+        for index in range(process_count):
+            names = cameras[index::process_count]
+            capture_process = mp.Process(
+                target=capture_cameras,
+                name=f"camera_capture:multiplexed_{index}",
+                args=(
+                    index,
+                    {name: self.config.cameras[name] for name in names},
+                    {name: self.camera_metrics[name] for name in names},
+                ),
+            )
+            capture_process.daemon = True
+
+            for name in names:
+                self.camera_metrics[name]["capture_process"] = capture_process
+
+            capture_process.start()
+            logger.info(
+                f"Capture process started for {', '.join(names)}: {capture_process.pid}"
+            )
+
     def start_audio_processors(self) -> None:
         if len([c for c in self.config.cameras.values() if c.audio.enabled]) > 0:
             audio_process = mp.Process(
@@ -618,7 +689,13 @@ class OpenGateApp:
 
         for _, camera in self.config.cameras.items():
             min_req_shm += round(
-                (camera.detect.width * camera.detect.height * 1.5 * 9 + 270480)
+                (
+                    camera.detect.width
+                    * camera.detect.height
+                    * 1.5
+                    * camera.detect.frame_slots
+                    + 270480
+                )
                 / 1048576,
                 1,
             )
@@ -682,6 +759,7 @@ class OpenGateApp:
             self.log_process.terminate()
             sys.exit(1)
         self.start_detectors()
+        self.init_frame_rings()
         self.start_video_output_processor()
         self.start_ptz_autotracker()
         self.init_historical_regions()
@@ -721,13 +799,6 @@ class OpenGateApp:
         for detector in self.detectors.values():
             detector.stop()
 
-        # Empty the detection queue and set the events for all requests
-        while not self.detection_queue.empty():
-            connection_id = self.detection_queue.get(timeout=1)
-            self.detection_out_events[connection_id].set()
-        self.detection_queue.close()
-        self.detection_queue.join_thread()
-
         self.dispatcher.stop()
         self.detected_frames_processor.join()
         self.ptz_autotracker_thread.join()
@@ -738,10 +809,19 @@ class OpenGateApp:
         self.opengate_watchdog.join()
         self.db.stop()
 
-        while len(self.detection_shms) > 0:
-            shm = self.detection_shms.pop()
-            shm.close()
-            shm.unlink()
+        for slots in self.detection_slots.values():
+            slots.close()
+            slots.unlink()
+
+        for detector_queue in self.detector_queues.values():
+            detector_queue.close()
+
+        for response in self.detection_responses.values():
+            response.close()
+
+        for ring in self.frame_rings.values():
+            ring.close()
+            ring.unlink()
 
         for queue in [
             self.event_queue,
@@ -370,6 +370,50 @@ class StationaryConfig(OpenGateBaseModel):
     )
 
 
+class IdleConfig(OpenGateBaseModel):
+    enabled: bool = Field(
+        default=False, title="Lower the processing rate of idle cameras."
+    )
+    fps: float = Field(
+        default=1, title="Number of frames per second to process while idle.", gt=0
+    )
+    timeout: int = Field(
+        default=60,
+        title="Seconds without motion or tracked objects before a camera is idle.",
+        ge=0,
+    )
+
+
+class MosaicConfig(OpenGateBaseModel):
+    enabled: bool = Field(
+        default=False,
+        title="Tile small regions of a frame into a single detector input.",
+    )
+    grid: int = Field(
+        default=2, title="Number of tiles per side of the mosaic.", ge=2, le=4
+    )
+    min_regions: int = Field(
+        default=2, title="Minimum number of small regions to build a mosaic.", ge=2
+    )
+
+
+class RegionCacheConfig(OpenGateBaseModel):
+    enabled: bool = Field(
+        default=False,
+        title="Reuse the detections of regions whose pixels have not changed.",
+    )
+    threshold: float = Field(
+        default=2.0,
+        title="Maximum mean luma difference of a region to reuse its detections.",
+        ge=0,
+    )
+    max_age: float = Field(
+        default=5.0,
+        title="Maximum seconds to reuse the detections of a region.",
+        gt=0,
+    )
+
+
 class DetectConfig(OpenGateBaseModel):
     height: Optional[int] = Field(title="Height of the stream for the detect role.")
     width: Optional[int] = Field(title="Width of the stream for the detect role.")
@@ -387,9 +431,38 @@ class DetectConfig(OpenGateBaseModel):
         default_factory=StationaryConfig,
         title="Stationary objects config.",
     )
+    idle: IdleConfig = Field(
+        default_factory=IdleConfig,
+        title="Idle camera processing config.",
+    )
+    mosaic: MosaicConfig = Field(
+        default_factory=MosaicConfig,
+        title="Region mosaic config.",
+    )
+    region_cache: RegionCacheConfig = Field(
+        default_factory=RegionCacheConfig,
+        title="Region detection cache config.",
+    )
+    detectors: List[str] = Field(
+        default_factory=list,
+        title="Detectors to prefer for this camera, any detector when empty.",
+    )
+    spill_over: Optional[float] = Field(
+        title="Estimated seconds until a preferred detector is free before any detector is used.",
+        ge=0,
+    )
     annotation_offset: int = Field(
         default=0, title="Milliseconds to offset detect annotations by."
     )
+    frame_slots: int = Field(
+        default=10,
+        title="Number of preallocated shared memory frame slots for the detect stream.",
+        ge=4,
+    )
+    latest_frame_wins: bool = Field(
+        default=False,
+        title="Drop the oldest queued frame instead of the newest when processing falls behind.",
+    )
 
 
 class FilterConfig(OpenGateBaseModel):
@@ -945,6 +1018,18 @@ class CameraConfig(OpenGateBaseModel):
         return cmd
 
 
+class CaptureConfig(OpenGateBaseModel):
+    multiplexed: bool = Field(
+        default=False,
+        title="Read the detect streams of many cameras in shared capture processes.",
+    )
+    processes: int = Field(
+        default=1,
+        title="Number of capture processes the cameras are spread over when multiplexed.",
+        ge=1,
+    )
+
+
 class DatabaseConfig(OpenGateBaseModel):
     path: str = Field(default=DEFAULT_DB_PATH, title="Database path.")
 
@@ -1064,6 +1149,15 @@ def verify_autotrack_zones(camera_config: CameraConfig) -> ValueError | None:
         )
 
 
+def verify_camera_detectors(config, camera_config: CameraConfig) -> None:
+    """Verify that the preferred detectors of a camera exist."""
+    for detector in camera_config.detect.detectors:
+        if detector not in config.detectors:
+            raise ValueError(
+                f"Camera {camera_config.name} prefers detector {detector} but that detector is not configured."
+            )
+
+
 class OpenGateConfig(OpenGateBaseModel):
     mqtt: MqttConfig = Field(title="MQTT Configuration.")
     database: DatabaseConfig = Field(
@@ -1107,6 +1201,9 @@ class OpenGateConfig(OpenGateBaseModel):
     ffmpeg: FfmpegConfig = Field(
         default_factory=FfmpegConfig, title="Global FFmpeg configuration."
     )
+    capture: CaptureConfig = Field(
+        default_factory=CaptureConfig, title="Camera capture configuration."
+    )
     objects: ObjectConfig = Field(
         default_factory=ObjectConfig, title="Global object configuration."
     )
@@ -1281,6 +1378,7 @@ class OpenGateConfig(OpenGateBaseModel):
             verify_recording_segments_setup_with_reasonable_time(camera_config)
             verify_zone_objects_are_tracked(camera_config)
             verify_autotrack_zones(camera_config)
+            verify_camera_detectors(config, camera_config)
 
             if camera_config.rtmp.enabled:
                 logger.warning(
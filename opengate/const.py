@@ -1,6 +1,7 @@
 CONFIG_DIR = "/config"
 DEFAULT_DB_PATH = f"{CONFIG_DIR}/opengate.db"
 MODEL_CACHE_DIR = f"{CONFIG_DIR}/model_cache"
+MOTION_CACHE_DIR = f"{CONFIG_DIR}/motion_cache"
 BASE_DIR = "/media/opengate"
 CLIPS_DIR = f"{BASE_DIR}/clips"
 RECORD_DIR = f"{BASE_DIR}/recordings"
@@ -58,6 +59,30 @@ MAX_SEGMENT_DURATION = 600
 MAX_SEGMENTS_IN_CACHE = 6
 MAX_PLAYLIST_SECONDS = 7200  # support 2 hour segments for a single playlist to account for cameras with inconsistent segment times
 
+# Frame Values
+
+FRAME_LEAK_TIMEOUT = 30  # seconds before the frames of an exited stage are reclaimed
+FRAME_LATENCY_SAMPLES = 256  # recent frame ages kept per pipeline point
+
+# Motion Values
+
+MOTION_STATE_INTERVAL = 60  # seconds between saving the motion background
+MOTION_HEATMAP_PUBLISH_INTERVAL = 300  # seconds between suggested mask updates
+
+# Detection Values
+
+DETECTION_SLOTS = 4  # detection requests a camera can have in flight
+DETECTION_NMS_THRESHOLD = 0.45  # iou above which a model's boxes are suppressed
+DETECTION_NMS_CANDIDATES = 300  # best boxes of a model output compared by nms
+
+# Region Values
+
+CLUSTER_VECTORIZE_MIN_BOXES = 24  # below this box clustering is faster in python
+MOSAIC_SEAM_TOLERANCE = 0.02  # fraction of a tile a box may cross a seam by
+REGION_GRID_EVENT_BATCH = 500  # events per timeline query when building a grid
+REGION_GRID_MAX_ENTRIES = 10000  # timeline entries read when building a grid
+REGION_FINGERPRINT_SIZE = 16  # side of the downscaled luma compared for a region
+
 # Internal Comms Topics
 
 INSERT_MANY_RECORDINGS = "insert_many_recordings"
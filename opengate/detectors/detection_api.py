@@ -1,11 +1,21 @@
 import logging
 from abc import ABC, abstractmethod
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 
 class DetectionApi(ABC):
     type_key: str
+    # detectors that run a batch faster than its inputs one at a time
+    supports_batch: bool = False
+    # most inputs of one detect_raw_batch call, set by detectors with batches
+    batch_size: int = 1
+    # remote detectors have nothing to warm up locally
+    warmup: bool = True
+    # names of the values of get_stats, reported in the detector stats
+    stats_keys: tuple[str, ...] = ()
 
     @abstractmethod
     def __init__(self, detector_config):
@@ -14,3 +24,14 @@ class DetectionApi(ABC):
     @abstractmethod
     def detect_raw(self, tensor_input):
         pass
+
+    def detect_raw_batch(self, tensor_input) -> list[np.ndarray]:
+        """Detect objects in each input of a batch, one detections array per input."""
+        return [
+            self.detect_raw(tensor_input=tensor_input[i : i + 1])
+            for i in range(len(tensor_input))
+        ]
+
+    def get_stats(self) -> tuple[float, ...]:
+        """Get the current value of each of the stats_keys."""
+        return ()
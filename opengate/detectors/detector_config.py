@@ -8,6 +8,7 @@ import matplotlib.pyplot as plt
 from pydantic import BaseModel, Extra, Field
 from pydantic.fields import PrivateAttr
 
+from opengate.const import MODEL_CACHE_DIR
 from opengate.util.builtin import load_labels
 
 logger = logging.getLogger(__name__)
@@ -48,6 +49,9 @@ class ModelConfig(BaseModel):
     model_type: ModelTypeEnum = Field(
         default=ModelTypeEnum.ssd, title="Object Detection Model Type"
     )
+    max_detections: int = Field(
+        default=20, ge=1, title="Maximum number of detections per inference."
+    )
     _merged_labelmap: Optional[Dict[int, str]] = PrivateAttr()
     _colormap: Dict[int, Tuple[int, int, int]] = PrivateAttr()
     _model_hash: str = PrivateAttr()
@@ -83,6 +87,17 @@ class ModelConfig(BaseModel):
                     file_hash.update(chunk)
             self._model_hash = file_hash.hexdigest()
 
+    def cache_path(self, plugin: str, *keys) -> str:
+        """Get the path of a file built from the model, like a compiled model.
+
+        The path is unique to the model file and the given keys.
+        """
+        if not hasattr(self, "_model_hash"):
+            self.compute_model_hash()
+
+        name = "-".join([self.model_hash, *(str(k) for k in keys)])
+        return os.path.join(MODEL_CACHE_DIR, plugin, name.replace(os.sep, "_"))
+
     def create_colormap(self, enabled_labels: set[str]) -> None:
         """Get a list of colors for enabled labels."""
         cmap = plt.cm.get_cmap("tab10", len(enabled_labels))
@@ -94,12 +109,45 @@ class ModelConfig(BaseModel):
         extra = Extra.forbid
 
 
+class DetectionCacheConfig(BaseModel):
+    enabled: bool = Field(
+        default=True, title="Reuse the detections of identical inputs."
+    )
+    max_entries: int = Field(
+        default=32, title="Maximum number of cached detection results.", ge=1
+    )
+    max_age: float = Field(
+        default=60.0, title="Maximum seconds to reuse a detection result.", gt=0
+    )
+
+    class Config:
+        extra = Extra.forbid
+
+
 class BaseDetectorConfig(BaseModel):
     # the type field must be defined in all subclasses
     type: str = Field(default="cpu", title="Detector Type")
     model: ModelConfig = Field(
         default=None, title="Detector specific model configuration."
     )
+    batch_size: int = Field(
+        default=1,
+        title="Maximum number of requests to run in one inference, if supported.",
+        ge=1,
+    )
+    batch_timeout: float = Field(
+        default=0.002,
+        title="Seconds to wait for more requests to fill a batch.",
+        ge=0,
+    )
+    warmup_inferences: int = Field(
+        default=2,
+        title="Number of inferences on a blank input before taking requests.",
+        ge=0,
+    )
+    result_cache: DetectionCacheConfig = Field(
+        default_factory=DetectionCacheConfig, title="Detection result cache config."
+    )
 
     class Config:
         extra = Extra.allow
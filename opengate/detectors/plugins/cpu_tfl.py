@@ -1,11 +1,11 @@
 import logging
 
-import numpy as np
 from pydantic import Field
 from typing_extensions import Literal
 
 from opengate.detectors.detection_api import DetectionApi
-from opengate.detectors.detector_config import BaseDetectorConfig
+from opengate.detectors.detector_config import BaseDetectorConfig, ModelTypeEnum
+from opengate.detectors.postprocess import PostProcessor
 
 try:
     from tflite_runtime.interpreter import Interpreter
@@ -33,6 +33,8 @@ class CpuTfl(DetectionApi):
         )
 
         self.interpreter.allocate_tensors()
+        self.model_type = detector_config.model.model_type
+        self.post_process = PostProcessor(detector_config.model)
 
         self.tensor_input_details = self.interpreter.get_input_details()
         self.tensor_output_details = self.interpreter.get_output_details()
@@ -41,6 +43,11 @@ class CpuTfl(DetectionApi):
         self.interpreter.set_tensor(self.tensor_input_details[0]["index"], tensor_input)
         self.interpreter.invoke()
 
+        if self.model_type != ModelTypeEnum.ssd:
+            return self.post_process(
+                self.interpreter.tensor(self.tensor_output_details[0]["index"])()[0]
+            )
+
         boxes = self.interpreter.tensor(self.tensor_output_details[0]["index"])()[0]
         class_ids = self.interpreter.tensor(self.tensor_output_details[1]["index"])()[0]
         scores = self.interpreter.tensor(self.tensor_output_details[2]["index"])()[0]
@@ -48,18 +55,4 @@ class CpuTfl(DetectionApi):
             self.interpreter.tensor(self.tensor_output_details[3]["index"])()[0]
         )
 
-        detections = np.zeros((20, 6), np.float32)
-
-        for i in range(count):
-            if scores[i] < 0.4 or i == 20:
-                break
-            detections[i] = [
-                class_ids[i],
-                float(scores[i]),
-                boxes[i][0],
-                boxes[i][1],
-                boxes[i][2],
-                boxes[i][3],
-            ]
-
-        return detections
+        return self.post_process((class_ids[:count], scores[:count], boxes[:count]))
@@ -0,0 +1,155 @@
+import io
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from PIL import Image
+from pydantic import Field
+from typing_extensions import Literal
+
+from opengate.detectors.detection_api import DetectionApi
+from opengate.detectors.detector_config import BaseDetectorConfig, PixelFormatEnum
+from opengate.detectors.postprocess import pack_detections
+
+logger = logging.getLogger(__name__)
+
+DETECTOR_KEY = "http"
+
+
+class HttpDetectorConfig(BaseDetectorConfig):
+    type: Literal[DETECTOR_KEY]
+    api_url: str = Field(
+        default="http://localhost:80/v1/vision/detection", title="Detection API URL"
+    )
+    api_timeout: float = Field(default=0.1, title="Detection API timeout (in seconds)")
+    api_key: str = Field(default="", title="Detection API key (if required)")
+
+
+class HttpDetector(DetectionApi):
+    """Sends inputs to a DeepStack compatible detection API.
+
+    Connections are kept alive in a pool, the requests of a batch are sent
+    concurrently.
+    """
+
+    type_key = DETECTOR_KEY
+    stats_keys = ("api_latency", "api_error_rate")
+    warmup = False
+    # labels of the api that are reported as another label
+    label_aliases: dict[str, str] = {}
+
+    def __init__(self, detector_config: HttpDetectorConfig):
+        self.api_url = detector_config.api_url
+        self.api_timeout = detector_config.api_timeout
+        self.api_key = detector_config.api_key
+        self.max_detections = detector_config.model.max_detections
+        self.swap_channels = (
+            detector_config.model.input_pixel_format == PixelFormatEnum.bgr
+        )
+
+        # the first index of a label wins
+        self.label_indexes = {}
+        for index, label in detector_config.model.merged_labelmap.items():
+            self.label_indexes.setdefault(label, index)
+        for alias, label in self.label_aliases.items():
+            if label in self.label_indexes:
+                self.label_indexes[alias] = self.label_indexes[label]
+
+        concurrency = self.batch_size = detector_config.batch_size
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=concurrency
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.supports_batch = concurrency > 1
+        self.executor = (
+            ThreadPoolExecutor(concurrency, thread_name_prefix="http_detector")
+            if self.supports_batch
+            else None
+        )
+
+        self.stats_lock = threading.Lock()
+        self.avg_latency = 0.0
+        self.error_rate = 0.0
+
+    def get_stats(self) -> tuple[float, ...]:
+        with self.stats_lock:
+            return (round(self.avg_latency * 1000, 2), round(self.error_rate, 3))
+
+    def record_request(self, start: float, error: bool) -> None:
+        with self.stats_lock:
+            self.avg_latency = (self.avg_latency * 9 + (time.monotonic() - start)) / 10
+            self.error_rate = (self.error_rate * 9 + error) / 10
+
+    def encode(self, tensor_input) -> bytes:
+        image = np.squeeze(tensor_input, axis=0).astype(np.uint8, copy=False)
+
+        if self.swap_channels:
+            image = image[:, :, ::-1]
+
+        # the pillow encoder is several times faster than the one of opencv
+        with io.BytesIO() as output:
+            Image.fromarray(image).save(output, format="JPEG")
+            return output.getvalue()
+
+    def detect_raw(self, tensor_input):
+        height, width = tensor_input.shape[1:3]
+        image_bytes = self.encode(tensor_input)
+        start = time.monotonic()
+
+        try:
+            response = self.session.post(
+                self.api_url,
+                data={"api_key": self.api_key},
+                files={"image": image_bytes},
+                timeout=self.api_timeout,
+            )
+            response_json = response.json()
+        except requests.exceptions.RequestException:
+            logger.error("Error calling detection API")
+            self.record_request(start, True)
+            return np.zeros((self.max_detections, 6), np.float32)
+
+        predictions = response_json.get("predictions")
+        self.record_request(start, predictions is None)
+
+        if predictions is None:
+            logger.debug(f"Error in parsing response json: {response_json}")
+            return np.zeros((self.max_detections, 6), np.float32)
+
+        logger.debug(f"Response: {predictions}")
+        class_ids = np.array(
+            [self.label_indexes.get(p["label"].lower(), -1) for p in predictions],
+            np.float32,
+        )
+        scores = np.array([p["confidence"] for p in predictions], np.float32)
+        boxes = np.array(
+            [[p["y_min"], p["x_min"], p["y_max"], p["x_max"]] for p in predictions],
+            np.float32,
+        ).reshape(-1, 4) / [height, width, height, width]
+
+        # skip unknown labels
+        known = class_ids >= 0
+        return pack_detections(
+            class_ids[known],
+            scores[known],
+            boxes[known],
+            self.max_detections,
+            threshold=0.4,
+        )
+
+    def detect_raw_batch(self, tensor_input):
+        if self.executor is None:
+            return super().detect_raw_batch(tensor_input)
+
+        return list(
+            self.executor.map(
+                self.detect_raw,
+                (tensor_input[i : i + 1] for i in range(len(tensor_input))),
+            )
+        )
@@ -0,0 +1,185 @@
+import logging
+from enum import Enum
+
+import numpy as np
+
+try:
+    import onnxruntime as ort
+
+    ONNX_SUPPORT = True
+except ModuleNotFoundError:
+    ONNX_SUPPORT = False
+
+from pydantic import Field
+from typing_extensions import Literal
+
+from opengate.detectors.detection_api import DetectionApi
+from opengate.detectors.detector_config import (
+    BaseDetectorConfig,
+    InputTensorEnum,
+    ModelTypeEnum,
+)
+from opengate.detectors.postprocess import PostProcessor
+
+logger = logging.getLogger(__name__)
+
+DETECTOR_KEY = "onnx"
+
+ONNX_TYPES = {
+    "tensor(float)": np.float32,
+    "tensor(float16)": np.float16,
+    "tensor(uint8)": np.uint8,
+    "tensor(int32)": np.int32,
+    "tensor(int64)": np.int64,
+}
+
+
+class GraphOptimizationEnum(str, Enum):
+    disabled = "disabled"
+    basic = "basic"
+    extended = "extended"
+    all = "all"
+
+
+class ONNXDetectorConfig(BaseDetectorConfig):
+    type: Literal[DETECTOR_KEY]
+    intra_op_threads: int = Field(
+        default=0, ge=0, title="Threads used within an operator, 0 uses all cores."
+    )
+    inter_op_threads: int = Field(
+        default=0, ge=0, title="Threads used between operators, 0 uses all cores."
+    )
+    graph_optimization: GraphOptimizationEnum = Field(
+        default=GraphOptimizationEnum.all, title="Graph optimization level."
+    )
+    input_scale: float = Field(
+        default=1 / 255,
+        gt=0,
+        title="Factor of the pixel values of float model inputs, 1 keeps 0 to 255.",
+    )
+
+
+class ONNXDetector(DetectionApi):
+    type_key = DETECTOR_KEY
+
+    def __init__(self, detector_config: ONNXDetectorConfig):
+        assert (
+            ONNX_SUPPORT
+        ), f"ONNX Runtime libraries not found, {DETECTOR_KEY} detector not present"
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = detector_config.intra_op_threads
+        options.inter_op_num_threads = detector_config.inter_op_threads
+        options.graph_optimization_level = {
+            GraphOptimizationEnum.disabled: ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+            GraphOptimizationEnum.basic: ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+            GraphOptimizationEnum.extended: ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+            GraphOptimizationEnum.all: ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+        }[detector_config.graph_optimization]
+
+        self.session = ort.InferenceSession(
+            detector_config.model.path,
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.model_type = detector_config.model.model_type
+        self.post_process = PostProcessor(detector_config.model)
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_dtype = ONNX_TYPES[model_input.type]
+        self.input_scale = detector_config.input_scale
+        self.outputs = self.session.get_outputs()
+        logger.info(f"Model Input Shape: {model_input.shape} {model_input.type}")
+
+        # a model with a dynamic batch runs any number of inputs, otherwise
+        # the rest of the batch is padded
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        self.batch_size = (
+            detector_config.batch_size if self.dynamic_batch else model_input.shape[0]
+        )
+        self.supports_batch = self.batch_size > 1
+
+        if self.batch_size != detector_config.batch_size:
+            logger.warning(
+                f"The model has a fixed batch of {self.batch_size}, "
+                f"batch_size {detector_config.batch_size} is ignored"
+            )
+
+        height = detector_config.model.height
+        width = detector_config.model.width
+        if detector_config.model.input_tensor == InputTensorEnum.nchw:
+            input_shape = (self.batch_size, 3, height, width)
+        else:
+            input_shape = (self.batch_size, height, width, 3)
+
+        # inputs are written to and outputs read from the same buffers every run
+        self.input_buffer = np.zeros(input_shape, self.input_dtype)
+        self.bindings = {}
+
+    def get_binding(self, count: int):
+        """Get the io binding and preallocated output buffers for count inputs.
+
+        Outputs with a dynamic shape other than the batch are allocated by ONNX
+        Runtime, their buffer is None.
+        """
+        if count not in self.bindings:
+            binding = self.session.io_binding()
+            binding.bind_cpu_input(self.input_name, self.input_buffer[:count])
+            buffers = []
+
+            for output in self.outputs:
+                shape = [count if i == 0 else d for i, d in enumerate(output.shape)]
+
+                if all(isinstance(d, int) for d in shape):
+                    buffer = np.empty(shape, ONNX_TYPES[output.type])
+                    binding.bind_output(
+                        output.name,
+                        "cpu",
+                        0,
+                        buffer.dtype,
+                        buffer.shape,
+                        buffer.ctypes.data,
+                    )
+                else:
+                    buffer = None
+                    binding.bind_output(output.name, "cpu")
+
+                buffers.append(buffer)
+
+            self.bindings[count] = (binding, buffers)
+
+        return self.bindings[count]
+
+    def detect_raw(self, tensor_input):
+        return self.detect_raw_batch(tensor_input)[0]
+
+    def detect_raw_batch(self, tensor_input):
+        count = len(tensor_input)
+        inputs = self.input_buffer[:count]
+
+        if self.input_dtype == np.uint8 or self.input_scale == 1:
+            np.copyto(inputs, tensor_input, casting="unsafe")
+        else:
+            np.multiply(tensor_input, self.input_scale, out=inputs, casting="unsafe")
+
+        binding, buffers = self.get_binding(
+            count if self.dynamic_batch else self.batch_size
+        )
+        self.session.run_with_iobinding(binding)
+        results = [
+            buffer if buffer is not None else value.numpy()
+            for buffer, value in zip(buffers, binding.get_outputs())
+        ]
+
+        return [self.process_output(results, i) for i in range(count)]
+
+    def process_output(self, results, index):
+        """Get the detections of one input of the batch from the model outputs."""
+        if self.model_type == ModelTypeEnum.ssd:
+            # boxes, class ids, scores and the count of detections, like tflite
+            boxes, class_ids, scores, count = (r[index] for r in results[:4])
+            count = int(count)
+            return self.post_process((class_ids[:count], scores[:count], boxes[:count]))
+
+        return self.post_process(results[0][index])
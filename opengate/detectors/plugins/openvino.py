@@ -1,4 +1,5 @@
 import logging
+import os
 
 import numpy as np
 import openvino.runtime as ov
@@ -7,6 +8,7 @@ from typing_extensions import Literal
 
 from opengate.detectors.detection_api import DetectionApi
 from opengate.detectors.detector_config import BaseDetectorConfig, ModelTypeEnum
+from opengate.detectors.postprocess import PostProcessor
 
 logger = logging.getLogger(__name__)
 
@@ -23,14 +25,23 @@ class OvDetector(DetectionApi):
 
     def __init__(self, detector_config: OvDetectorConfig):
         self.ov_core = ov.Core()
-        self.ov_model = self.ov_core.read_model(detector_config.model.path)
         self.ov_model_type = detector_config.model.model_type
 
-        self.h = detector_config.model.height
-        self.w = detector_config.model.width
+        # the openvino ssd output keeps lower scoring detections
+        self.post_process = PostProcessor(
+            detector_config.model,
+            threshold=0.1 if self.ov_model_type == ModelTypeEnum.ssd else None,
+        )
 
-        self.interpreter = self.ov_core.compile_model(
-            model=self.ov_model, device_name=detector_config.device
+        # a static batch lets one inference cover several requests, a lone
+        # request runs on a single input model instead of a padded batch
+        self.batch_size = detector_config.batch_size
+        self.supports_batch = self.batch_size > 1
+        self.interpreter = self.load_model(detector_config, 1)
+        self.batch_interpreter = (
+            self.load_model(detector_config, self.batch_size)
+            if self.supports_batch
+            else None
         )
 
         logger.info(f"Model Input Shape: {self.interpreter.input(0).shape}")
@@ -45,130 +56,92 @@ class OvDetector(DetectionApi):
                 logger.info(f"Model has {self.output_indexes} Output Tensors")
                 break
         if self.ov_model_type == ModelTypeEnum.yolox:
-            self.num_classes = tensor_shape[2] - 5
-            logger.info(f"YOLOX model has {self.num_classes} classes")
-            self.set_strides_grids()
-
-    def set_strides_grids(self):
-        grids = []
-        expanded_strides = []
-
-        strides = [8, 16, 32]
-
-        hsizes = [self.h // stride for stride in strides]
-        wsizes = [self.w // stride for stride in strides]
-
-        for hsize, wsize, stride in zip(hsizes, wsizes, strides):
-            xv, yv = np.meshgrid(np.arange(wsize), np.arange(hsize))
-            grid = np.stack((xv, yv), 2).reshape(1, -1, 2)
-            grids.append(grid)
-            shape = grid.shape[:2]
-            expanded_strides.append(np.full((*shape, 1), stride))
-        self.grids = np.concatenate(grids, 1)
-        self.expanded_strides = np.concatenate(expanded_strides, 1)
-
-    ## Takes in class ID, confidence score, and array of [x, y, w, h] that describes detection position,
-    ## returns an array that's easily passable back to OpenGate.
-    def process_yolo(self, class_id, conf, pos):
-        return [
-            class_id,  # class ID
-            conf,  # confidence score
-            (pos[1] - (pos[3] / 2)) / self.h,  # y_min
-            (pos[0] - (pos[2] / 2)) / self.w,  # x_min
-            (pos[1] + (pos[3] / 2)) / self.h,  # y_max
-            (pos[0] + (pos[2] / 2)) / self.w,  # x_max
-        ]
+            logger.info(f"YOLOX model has {tensor_shape[2] - 5} classes")
 
-    def detect_raw(self, tensor_input):
-        infer_request = self.interpreter.create_infer_request()
-        infer_request.infer([tensor_input])
+    def load_model(
+        self, detector_config: OvDetectorConfig, batch_size: int
+    ) -> ov.CompiledModel:
+        """Import the compiled model from the cache, or compile and cache it.
 
-        if self.ov_model_type == ModelTypeEnum.ssd:
-            results = infer_request.get_output_tensor()
-
-            detections = np.zeros((20, 6), np.float32)
-            i = 0
-            for object_detected in results.data[0, 0, :]:
-                if object_detected[0] != -1:
-                    logger.debug(object_detected)
-                if object_detected[2] < 0.1 or i == 20:
-                    break
-                detections[i] = [
-                    object_detected[1],  # Label ID
-                    float(object_detected[2]),  # Confidence
-                    object_detected[4],  # y_min
-                    object_detected[3],  # x_min
-                    object_detected[6],  # y_max
-                    object_detected[5],  # x_max
-                ]
-                i += 1
-            return detections
-        elif self.ov_model_type == ModelTypeEnum.yolox:
-            out_tensor = infer_request.get_output_tensor()
-            # [x, y, h, w, box_score, class_no_1, ..., class_no_80],
-            results = out_tensor.data
-            results[..., :2] = (results[..., :2] + self.grids) * self.expanded_strides
-            results[..., 2:4] = np.exp(results[..., 2:4]) * self.expanded_strides
-            image_pred = results[0, ...]
-
-            class_conf = np.max(
-                image_pred[:, 5 : 5 + self.num_classes], axis=1, keepdims=True
+        Only a model compiled for a specific device can be cached.
+        """
+        device = detector_config.device
+        cache_path = None
+
+        if device:
+            cache_path = detector_config.model.cache_path(
+                DETECTOR_KEY, device, batch_size, ov.get_version()
             )
-            class_pred = np.argmax(image_pred[:, 5 : 5 + self.num_classes], axis=1)
-            class_pred = np.expand_dims(class_pred, axis=1)
 
-            conf_mask = (image_pred[:, 4] * class_conf.squeeze() >= 0.3).squeeze()
-            # Detections ordered as (x1, y1, x2, y2, obj_conf, class_conf, class_pred)
-            dets = np.concatenate((image_pred[:, :5], class_conf, class_pred), axis=1)
-            dets = dets[conf_mask]
+            if os.path.exists(cache_path):
+                try:
+                    with open(cache_path, "rb") as f:
+                        return self.ov_core.import_model(f.read(), device)
+                except Exception as e:
+                    logger.warning(f"Failed to import cached model, recompiling: {e}")
 
-            ordered = dets[dets[:, 5].argsort()[::-1]][:20]
+        model = self.ov_core.read_model(detector_config.model.path)
 
-            detections = np.zeros((20, 6), np.float32)
+        if batch_size > 1:
+            input_shape = model.input(0).get_partial_shape()
+            input_shape[0] = batch_size
+            model.reshape(input_shape)
 
-            for i, object_detected in enumerate(ordered):
-                detections[i] = self.process_yolo(
-                    object_detected[6], object_detected[5], object_detected[:4]
-                )
-            return detections
-        elif self.ov_model_type == ModelTypeEnum.yolov8:
-            out_tensor = infer_request.get_output_tensor()
-            results = out_tensor.data[0]
-            output_data = np.transpose(results)
-            scores = np.max(output_data[:, 4:], axis=1)
-            if len(scores) == 0:
-                return np.zeros((20, 6), np.float32)
-            scores = np.expand_dims(scores, axis=1)
-            # add scores to the last column
-            dets = np.concatenate((output_data, scores), axis=1)
-            # filter out lines with scores below threshold
-            dets = dets[dets[:, -1] > 0.5, :]
-            # limit to top 20 scores, descending order
-            ordered = dets[dets[:, -1].argsort()[::-1]][:20]
-            detections = np.zeros((20, 6), np.float32)
-
-            for i, object_detected in enumerate(ordered):
-                detections[i] = self.process_yolo(
-                    np.argmax(object_detected[4:-1]),
-                    object_detected[-1],
-                    object_detected[:4],
-                )
-            return detections
-        elif self.ov_model_type == ModelTypeEnum.yolov5:
-            out_tensor = infer_request.get_output_tensor()
-            output_data = out_tensor.data[0]
-            # filter out lines with scores below threshold
-            conf_mask = (output_data[:, 4] >= 0.5).squeeze()
-            output_data = output_data[conf_mask]
-            # limit to top 20 scores, descending order
-            ordered = output_data[output_data[:, 4].argsort()[::-1]][:20]
-
-            detections = np.zeros((20, 6), np.float32)
-
-            for i, object_detected in enumerate(ordered):
-                detections[i] = self.process_yolo(
-                    np.argmax(object_detected[5:]),
-                    object_detected[4],
-                    object_detected[:4],
+        compiled_model = self.ov_core.compile_model(model=model, device_name=device)
+
+        if cache_path:
+            try:
+                blob = compiled_model.export_model()
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+
+                # other detectors may load the same model at the same time
+                temp_path = f"{cache_path}.{os.getpid()}"
+                with open(temp_path, "wb") as f:
+                    f.write(blob)
+                os.replace(temp_path, cache_path)
+            except Exception as e:
+                logger.info(f"Compiled model is not cached for {device}: {e}")
+
+        return compiled_model
+
+    def detect_raw(self, tensor_input):
+        return self.detect_raw_batch(tensor_input)[0]
+
+    def detect_raw_batch(self, tensor_input):
+        count = len(tensor_input)
+        interpreter = self.interpreter if count == 1 else self.batch_interpreter
+
+        # the compiled batch size is fixed, pad the rest of the batch
+        if 1 < count < self.batch_size:
+            tensor_input = np.concatenate(
+                [
+                    tensor_input,
+                    np.zeros(
+                        (self.batch_size - count, *tensor_input.shape[1:]),
+                        tensor_input.dtype,
+                    ),
+                ]
+            )
+
+        infer_request = interpreter.create_infer_request()
+        infer_request.infer([tensor_input])
+        results = infer_request.get_output_tensor().data
+
+        return [self.process_output(results, i) for i in range(count)]
+
+    def process_output(self, results, index):
+        """Get the detections of one input of the batch from the model output."""
+        if self.ov_model_type == ModelTypeEnum.ssd:
+            # all detections of the batch are in one list, tagged by image
+            objects = results[0, 0, :]
+            objects = objects[objects[:, 0] == index]
+
+            return self.post_process(
+                (
+                    objects[:, 1],  # Label ID
+                    objects[:, 2],  # Confidence
+                    objects[:, [4, 3, 6, 5]],  # y_min, x_min, y_max, x_max
                 )
-            return detections
+            )
+
+        return self.post_process(results[index])
@@ -3,8 +3,6 @@ import os.path
 import urllib.request
 from typing import Literal
 
-import numpy as np
-
 try:
     from hide_warnings import hide_warnings
 except:  # noqa: E722
@@ -16,7 +14,8 @@ except:  # noqa: E722
 from pydantic import Field
 
 from opengate.detectors.detection_api import DetectionApi
-from opengate.detectors.detector_config import BaseDetectorConfig
+from opengate.detectors.detector_config import BaseDetectorConfig, ModelTypeEnum
+from opengate.detectors.postprocess import PostProcessor
 
 logger = logging.getLogger(__name__)
 
@@ -75,8 +74,9 @@ class Rknn(DetectionApi):
 
         self.model_path = config.model.path or "default-yolov8n"
         self.core_mask = config.core_mask
-        self.height = config.model.height
-        self.width = config.model.width
+        self.post_process = PostProcessor(
+            config.model, threshold=0.4, model_type=ModelTypeEnum.yolov8
+        )
 
         if self.model_path in yolov8_suffix:
             if self.model_path == "default-yolov8n":
@@ -148,49 +148,9 @@ class Rknn(DetectionApi):
         results: array with shape: (1, 84, n, 1) where n depends on yolov8 model size (for 320x320 model n=2100)
 
         Returns:
-        detections: array with shape (20, 6) with 20 rows of (class, confidence, y_min, x_min, y_max, x_max)
+        detections: array with shape (max_detections, 6) with rows of (class, confidence, y_min, x_min, y_max, x_max)
         """
-
-        results = np.transpose(results[0, :, :, 0])  # array shape (2100, 84)
-        scores = np.max(
-            results[:, 4:], axis=1
-        )  # array shape (2100,); max confidence of each row
-
-        # remove lines with score scores < 0.4
-        filtered_arg = np.argwhere(scores > 0.4)
-        results = results[filtered_arg[:, 0]]
-        scores = scores[filtered_arg[:, 0]]
-
-        num_detections = len(scores)
-
-        if num_detections == 0:
-            return np.zeros((20, 6), np.float32)
-
-        if num_detections > 20:
-            top_arg = np.argpartition(scores, -20)[-20:]
-            results = results[top_arg]
-            scores = scores[top_arg]
-            num_detections = 20
-
-        classes = np.argmax(results[:, 4:], axis=1)
-
-        boxes = np.transpose(
-            np.vstack(
-                (
-                    (results[:, 1] - 0.5 * results[:, 3]) / self.height,
-                    (results[:, 0] - 0.5 * results[:, 2]) / self.width,
-                    (results[:, 1] + 0.5 * results[:, 3]) / self.height,
-                    (results[:, 0] + 0.5 * results[:, 2]) / self.width,
-                )
-            )
-        )
-
-        detections = np.zeros((20, 6), np.float32)
-        detections[:num_detections, 0] = classes
-        detections[:num_detections, 1] = scores
-        detections[:num_detections, 2:] = boxes
-
-        return detections
+        return self.post_process(results[0, :, :, 0])
 
     @hide_warnings
     def inference(self, tensor_input):
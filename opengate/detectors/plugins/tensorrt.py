@@ -14,8 +14,10 @@ except ModuleNotFoundError:
 from pydantic import Field
 from typing_extensions import Literal
 
+from opengate.const import DETECTION_NMS_CANDIDATES
 from opengate.detectors.detection_api import DetectionApi
 from opengate.detectors.detector_config import BaseDetectorConfig
+from opengate.detectors.postprocess import nms, pack_detections
 
 logger = logging.getLogger(__name__)
 
@@ -214,6 +216,7 @@ class TensorRtDetector(DetectionApi):
         )
 
         self.conf_th = 0.4  ##TODO: model config parameter
+        self.max_detections = detector_config.model.max_detections
         self.nms_threshold = 0.4
         err, self.stream = cuda.cuStreamCreate(0)
         self.trt_logger = TrtLogger()
@@ -270,7 +273,7 @@ class TensorRtDetector(DetectionApi):
 
     def detect_raw(self, tensor_input):
         # Input tensor has the shape of the [height, width, 3]
-        # Output tensor of float32 of shape [20, 6] where:
+        # Output tensor of float32 of shape [max_detections, 6] where:
         # O - class id
         # 1 - score
         # 2..5 - a value between 0 and 1 of the box: [top, left, bottom, right]
@@ -288,27 +291,29 @@ class TensorRtDetector(DetectionApi):
         raw_detections = self._postprocess_yolo(trt_outputs, self.conf_th)
 
         if len(raw_detections) == 0:
-            return np.zeros((20, 6), np.float32)
+            return np.zeros((self.max_detections, 6), np.float32)
 
         # raw_detections: Nx7 numpy arrays of
         #             [[x, y, w, h, box_confidence, class_id, class_prob],
 
         # Calculate score as box_confidence x class_prob
-        raw_detections[:, 4] = raw_detections[:, 4] * raw_detections[:, 6]
-        # Reorder elements by the score, best on top, remove class_prob
-        ordered = raw_detections[raw_detections[:, 4].argsort()[::-1]][:, 0:6]
-        # transform width to right with clamp to 0..1
-        ordered[:, 2] = np.clip(ordered[:, 2] + ordered[:, 0], 0, 1)
-        # transform height to bottom with clamp to 0..1
-        ordered[:, 3] = np.clip(ordered[:, 3] + ordered[:, 1], 0, 1)
-        # put result into the correct order and limit to top 20
-        detections = ordered[:, [5, 4, 1, 0, 3, 2]][:20]
-
-        # pad to 20x6 shape
-        append_cnt = 20 - len(detections)
-        if append_cnt > 0:
-            detections = np.append(
-                detections, np.zeros((append_cnt, 6), np.float32), axis=0
+        scores = raw_detections[:, 4] * raw_detections[:, 6]
+        class_ids = raw_detections[:, 5]
+        # transform to top, left, bottom, right with clamp to 0..1
+        x, y, w, h = raw_detections[:, :4].T
+        boxes = np.clip(np.stack([y, x, y + h, x + w], axis=1), 0, 1)
+
+        # nms compares every pair of boxes, so only keep the best candidates
+        best = np.argsort(-scores)[:DETECTION_NMS_CANDIDATES]
+        keep = best[
+            nms(
+                boxes[best],
+                scores[best],
+                class_ids[best],
+                self.nms_threshold,
+                limit=self.max_detections,
             )
-
-        return detections
+        ]
+        return pack_detections(
+            class_ids[keep], scores[keep], boxes[keep], self.max_detections
+        )
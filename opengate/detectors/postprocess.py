@@ -0,0 +1,218 @@
+"""Vectorized decoding of detection model outputs.
+
+Decoders return a detections array: max_detections rows of class id, score
+and a y_min, x_min, y_max, x_max box relative to the model input, sorted by
+score and padded with zeros.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from opengate.const import DETECTION_NMS_CANDIDATES, DETECTION_NMS_THRESHOLD
+from opengate.detectors.detector_config import ModelConfig, ModelTypeEnum
+
+# minimum score of a detection for each model type
+DEFAULT_THRESHOLDS = {
+    ModelTypeEnum.ssd: 0.4,
+    ModelTypeEnum.yolox: 0.3,
+    ModelTypeEnum.yolov5: 0.5,
+    ModelTypeEnum.yolov8: 0.5,
+}
+
+
+def pack_detections(
+    class_ids, scores, boxes, max_detections: int, threshold: float = 0.0
+) -> np.ndarray:
+    """Get the best detections above the threshold as a detections array."""
+    scores = np.asarray(scores, np.float32).reshape(-1)
+    keep = np.flatnonzero(scores >= threshold)
+
+    if len(keep) > max_detections:
+        keep = keep[np.argpartition(-scores[keep], max_detections - 1)[:max_detections]]
+
+    keep = keep[np.argsort(-scores[keep], kind="stable")]
+
+    detections = np.zeros((max_detections, 6), np.float32)
+    detections[: len(keep), 0] = np.asarray(class_ids).reshape(-1)[keep]
+    detections[: len(keep), 1] = scores[keep]
+    detections[: len(keep), 2:] = np.asarray(boxes).reshape(-1, 4)[keep]
+    return detections
+
+
+def nms(
+    boxes,
+    scores,
+    class_ids,
+    iou_threshold: float = DETECTION_NMS_THRESHOLD,
+    limit: Optional[int] = None,
+) -> np.ndarray:
+    """Get the indexes of the boxes kept by class-wise non-maximum suppression.
+
+    Indexes are sorted by score, at most limit boxes are kept.
+    """
+    boxes = np.asarray(boxes, np.float32).reshape(-1, 4)
+    scores = np.asarray(scores).reshape(-1)
+    class_ids = np.asarray(class_ids).reshape(-1)
+    order = np.argsort(-scores, kind="stable")
+
+    y_min, x_min, y_max, x_max = boxes[order].T
+    areas = (y_max - y_min) * (x_max - x_min)
+    height = np.minimum(y_max[:, np.newaxis], y_max) - np.maximum(
+        y_min[:, np.newaxis], y_min
+    )
+    width = np.minimum(x_max[:, np.newaxis], x_max) - np.maximum(
+        x_min[:, np.newaxis], x_min
+    )
+    inter = np.maximum(height, 0) * np.maximum(width, 0)
+    union = areas[:, np.newaxis] + areas - inter
+    iou = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+    sorted_classes = class_ids[order]
+    suppresses = (iou > iou_threshold) & (
+        sorted_classes[:, np.newaxis] == sorted_classes
+    )
+
+    keep = []
+    suppressed = np.zeros(len(order), bool)
+    for i in range(len(order)):
+        if suppressed[i]:
+            continue
+
+        keep.append(i)
+
+        if limit is not None and len(keep) == limit:
+            break
+
+        suppressed |= suppresses[i]
+
+    return order[keep]
+
+
+def yolo_boxes(positions, width: int, height: int) -> np.ndarray:
+    """Convert x_center, y_center, width, height pixel boxes to relative boxes."""
+    positions = np.asarray(positions).reshape(-1, 4)
+    half_size = positions[:, 2:] / 2
+    return np.concatenate(
+        [
+            (positions[:, 1:2] - half_size[:, 1:]) / height,  # y_min
+            (positions[:, 0:1] - half_size[:, :1]) / width,  # x_min
+            (positions[:, 1:2] + half_size[:, 1:]) / height,  # y_max
+            (positions[:, 0:1] + half_size[:, :1]) / width,  # x_max
+        ],
+        axis=1,
+    )
+
+
+def yolox_grids(
+    width: int, height: int, strides: tuple[int, ...] = (8, 16, 32)
+) -> tuple[np.ndarray, np.ndarray]:
+    """Get the anchor grid cells and strides of every YOLOX output row."""
+    grids = []
+    expanded_strides = []
+
+    for stride in strides:
+        xv, yv = np.meshgrid(np.arange(width // stride), np.arange(height // stride))
+        grid = np.stack((xv, yv), 2).reshape(-1, 2)
+        grids.append(grid)
+        expanded_strides.append(np.full((len(grid), 1), stride))
+
+    return np.concatenate(grids), np.concatenate(expanded_strides)
+
+
+class PostProcessor:
+    """Decodes the raw output of a model into detections arrays."""
+
+    def __init__(
+        self,
+        model_config: ModelConfig,
+        threshold: Optional[float] = None,
+        model_type: Optional[ModelTypeEnum] = None,
+    ):
+        self.model_type = model_type or model_config.model_type
+        self.width = model_config.width
+        self.height = model_config.height
+        self.max_detections = model_config.max_detections
+        self.threshold = (
+            DEFAULT_THRESHOLDS[self.model_type] if threshold is None else threshold
+        )
+
+        if self.model_type == ModelTypeEnum.yolox:
+            self.grids, self.expanded_strides = yolox_grids(self.width, self.height)
+
+        self.decode = {
+            ModelTypeEnum.ssd: self.decode_ssd,
+            ModelTypeEnum.yolox: self.decode_yolox,
+            ModelTypeEnum.yolov5: self.decode_yolov5,
+            ModelTypeEnum.yolov8: self.decode_yolov8,
+        }[self.model_type]
+
+    def __call__(self, output) -> np.ndarray:
+        """Decode the output of one input, see the decode method of the model type."""
+        return self.decode(output)
+
+    def decode_ssd(self, output) -> np.ndarray:
+        """Decode (class_ids, scores, boxes) with boxes as y_min, x_min, y_max, x_max.
+
+        SSD models have already suppressed overlapping boxes.
+        """
+        class_ids, scores, boxes = output
+        return pack_detections(
+            class_ids, scores, boxes, self.max_detections, self.threshold
+        )
+
+    def decode_yolo(self, class_ids, scores, positions) -> np.ndarray:
+        """Decode the candidates of a YOLO model that are above the threshold."""
+        # nms compares every pair of boxes, so only keep the best candidates
+        if len(scores) > DETECTION_NMS_CANDIDATES:
+            best = np.argpartition(-scores, DETECTION_NMS_CANDIDATES - 1)[
+                :DETECTION_NMS_CANDIDATES
+            ]
+            class_ids, scores, positions = (
+                class_ids[best],
+                scores[best],
+                positions[best],
+            )
+
+        boxes = yolo_boxes(positions, self.width, self.height)
+        keep = nms(boxes, scores, class_ids, limit=self.max_detections)
+        return pack_detections(
+            class_ids[keep], scores[keep], boxes[keep], self.max_detections
+        )
+
+    def decode_yolox(self, output) -> np.ndarray:
+        """Decode rows of x, y, w, h relative to the grid, box score, class scores."""
+        output = np.asarray(output)
+        class_conf = np.max(output[:, 5:], axis=1)
+        keep = output[:, 4] * class_conf >= self.threshold
+
+        positions = np.concatenate(
+            [
+                (output[keep, :2] + self.grids[keep]) * self.expanded_strides[keep],
+                np.exp(output[keep, 2:4]) * self.expanded_strides[keep],
+            ],
+            axis=1,
+        )
+        return self.decode_yolo(
+            np.argmax(output[keep, 5:], axis=1), class_conf[keep], positions
+        )
+
+    def decode_yolov5(self, output) -> np.ndarray:
+        """Decode rows of x, y, w, h, box score, class scores."""
+        output = np.asarray(output)
+        output = output[output[:, 4] >= self.threshold]
+        return self.decode_yolo(
+            np.argmax(output[:, 5:], axis=1), output[:, 4], output[:, :4]
+        )
+
+    def decode_yolov8(self, output) -> np.ndarray:
+        """Decode columns of x, y, w, h, class scores."""
+        output = np.asarray(output)
+        scores = np.max(output[4:], axis=0)
+        keep = scores > self.threshold
+
+        # only find the class of the candidates
+        candidates = output[:, keep].T
+        return self.decode_yolo(
+            np.argmax(candidates[:, 4:], axis=1), scores[keep], candidates[:, :4]
+        )
@@ -618,7 +618,7 @@ def grid_snapshot(camera_name):
             for y in range(grid_size):
                 cell = grid[x][y]
 
-                if len(cell["sizes"]) == 0:
+                if not cell.get("count"):
                     continue
 
                 std_dev = round(cell["std_dev"] * width, 2)
@@ -635,7 +635,7 @@ def grid_snapshot(camera_name):
                 )
                 cv2.putText(
                     frame,
-                    f"#: {len(cell['sizes'])}",
+                    f"#: {cell['count']}",
                     (
                         int(x * grid_coef * width + 10),
                         int((y * grid_coef + 0.02) * height),
@@ -1219,6 +1219,7 @@ def mjpeg_feed(camera_name):
         "mask": request.args.get("mask", type=int),
         "motion_boxes": request.args.get("motion", type=int),
         "regions": request.args.get("regions", type=int),
+        "heatmap": request.args.get("heatmap", type=int),
     }
     if camera_name in current_app.opengate_config.cameras:
         # return a multipart response
@@ -1250,6 +1251,19 @@ def camera_ptz_info(camera_name):
         )
 
 
+@bp.route("/<camera_name>/motion/heatmap")
+def motion_heatmap(camera_name):
+    if camera_name in current_app.opengate_config.cameras:
+        return jsonify(
+            current_app.detected_frames_processor.get_motion_heatmap(camera_name)
+        )
+    else:
+        return make_response(
+            jsonify({"success": False, "message": "Camera not found"}),
+            404,
+        )
+
+
 @bp.route("/<camera_name>/latest.jpg")
 def latest_frame(camera_name):
     draw_options = {
@@ -1259,6 +1273,7 @@ def latest_frame(camera_name):
         "mask": request.args.get("mask", type=int),
         "motion_boxes": request.args.get("motion", type=int),
         "regions": request.args.get("regions", type=int),
+        "heatmap": request.args.get("heatmap", type=int),
     }
     resize_quality = request.args.get("quality", default=70, type=int)
 
@@ -0,0 +1,121 @@
+"""Track where motion fires and where it never leads to detections."""
+
+import threading
+
+import cv2
+import numpy as np
+
+from opengate.util import boxes as box_ops
+
+
+class MotionHeatmap:
+    """A decaying low resolution heatmap of motion boxes for a camera.
+
+    Every cell counts how often a motion box covered it and how often that
+    motion box overlapped no detection. Counts halve every half_life seconds,
+    so only persistent motion stays hot. Hot cells that are almost never
+    productive are suggested as motion masks.
+    """
+
+    def __init__(
+        self,
+        frame_shape: tuple[int, int],
+        cell_size: int = 32,
+        half_life: int = 3600,
+        min_heat: float = 100,
+        min_unproductive_ratio: float = 0.98,
+    ):
+        self.frame_shape = frame_shape
+        self.cell_size = cell_size
+        self.half_life = half_life
+        self.min_heat = min_heat
+        self.min_unproductive_ratio = min_unproductive_ratio
+        self.grid_shape = (
+            -(-frame_shape[0] // cell_size),
+            -(-frame_shape[1] // cell_size),
+        )
+        self.motion = np.zeros(self.grid_shape, np.float32)
+        self.unproductive = np.zeros(self.grid_shape, np.float32)
+        self.last_update = None
+        self.lock = threading.Lock()
+
+    def update(self, frame_time: float, motion_boxes, detection_boxes) -> None:
+        with self.lock:
+            if self.last_update is not None and frame_time > self.last_update:
+                decay = 0.5 ** ((frame_time - self.last_update) / self.half_life)
+                self.motion *= decay
+                self.unproductive *= decay
+
+            self.last_update = frame_time
+
+            productive = box_ops.intersects_any(motion_boxes, detection_boxes)
+
+            for box, box_productive in zip(motion_boxes, productive):
+                cells = (
+                    slice(box[1] // self.cell_size, box[3] // self.cell_size + 1),
+                    slice(box[0] // self.cell_size, box[2] // self.cell_size + 1),
+                )
+                self.motion[cells] += 1
+
+                if not box_productive:
+                    self.unproductive[cells] += 1
+
+    def noisy_cells(self) -> np.ndarray:
+        return (self.motion >= self.min_heat) & (
+            self.unproductive >= self.motion * self.min_unproductive_ratio
+        )
+
+    def suggest_masks(self) -> list[str]:
+        """Get motion mask polygons for hot areas that never produce detections."""
+        with self.lock:
+            noisy = self.noisy_cells().astype(np.uint8)
+
+        # trace the outline of the cells at full resolution
+        noisy = cv2.resize(
+            noisy,
+            (self.grid_shape[1] * self.cell_size, self.grid_shape[0] * self.cell_size),
+            interpolation=cv2.INTER_NEAREST,
+        )[: self.frame_shape[0], : self.frame_shape[1]]
+        contours, _ = cv2.findContours(
+            noisy, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+        )
+
+        return [
+            ",".join(f"{x},{y}" for x, y in contour.reshape(-1, 2))
+            for contour in contours
+        ]
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            motion = np.round(self.motion, 2).tolist()
+            unproductive = np.round(self.unproductive, 2).tolist()
+
+        return {
+            "cell_size": self.cell_size,
+            "motion": motion,
+            "unproductive": unproductive,
+            "suggested_masks": self.suggest_masks(),
+        }
+
+    def draw(self, frame: np.ndarray) -> None:
+        """Overlay the heatmap and suggested masks on a BGR frame."""
+        with self.lock:
+            heat = np.log1p(self.motion)
+            noisy = self.noisy_cells()
+
+        if heat.max() > 0:
+            heat = (heat * (255 / heat.max())).astype(np.uint8)
+            colored = cv2.applyColorMap(
+                cv2.resize(
+                    heat,
+                    (frame.shape[1], frame.shape[0]),
+                    interpolation=cv2.INTER_LINEAR,
+                ),
+                cv2.COLORMAP_JET,
+            )
+            cv2.addWeighted(colored, 0.4, frame, 0.6, 0, dst=frame)
+
+        if noisy.any():
+            for mask in self.suggest_masks():
+                points = np.array(mask.split(","), dtype=np.int32).reshape(-1, 2)
+                cv2.polylines(frame, [points], True, (255, 255, 255), 2)
@@ -1,17 +1,62 @@
+import hashlib
 import logging
+import os
+import time
+from typing import Optional
 
 import cv2
 import imutils
 import numpy as np
-from scipy.ndimage import gaussian_filter
 
 from opengate.config import MotionConfig
+from opengate.const import MOTION_STATE_INTERVAL
 from opengate.motion import MotionDetector
 
 logger = logging.getLogger(__name__)
 
 
+def get_unmasked_tiles(unmasked: np.ndarray, tile_size: int) -> list[tuple]:
+    """Get strips of tiles that contain unmasked pixels as (rows, cols) slices.
+
+    Neighbouring tiles in a row are joined and rows with the same tiles are
+    merged, so an unmasked frame is a single strip.
+    """
+    height, width = unmasked.shape
+    strips = []
+    previous_runs = None
+
+    for y in range(0, height, tile_size):
+        row = unmasked[y : y + tile_size]
+        runs = []
+
+        for x in range(0, width, tile_size):
+            if not row[:, x : x + tile_size].any():
+                continue
+
+            if runs and runs[-1][1] == x:
+                runs[-1][1] = min(x + tile_size, width)
+            else:
+                runs.append([x, min(x + tile_size, width)])
+
+        if runs and runs == previous_runs:
+            for i in range(-len(runs), 0):
+                rows, cols = strips[i]
+                strips[i] = (slice(rows.start, min(y + tile_size, height)), cols)
+        else:
+            strips.extend(
+                (slice(y, min(y + tile_size, height)), slice(start, end))
+                for start, end in runs
+            )
+
+        previous_runs = runs
+
+    return strips
+
+
 class ImprovedMotionDetector(MotionDetector):
+    # size of the tiles that are skipped when fully masked
+    TILE_SIZE = 16
+
     def __init__(
         self,
         frame_shape,
@@ -24,6 +69,7 @@ class ImprovedMotionDetector(MotionDetector):
         blur_radius=1,
         interpolation=cv2.INTER_NEAREST,
         contrast_frame_history=50,
+        state_path: Optional[str] = None,
     ):
         self.name = name
         self.config = config
@@ -41,7 +87,6 @@ class ImprovedMotionDetector(MotionDetector):
             dsize=(self.motion_frame_size[1], self.motion_frame_size[0]),
             interpolation=cv2.INTER_AREA,
         )
-        self.mask = np.where(resized_mask == [0])
         self.save_images = False
         self.calibrating = True
         self.improve_contrast = improve_contrast
@@ -53,6 +98,59 @@ class ImprovedMotionDetector(MotionDetector):
         self.contrast_values[:, 1:2] = 255
         self.contrast_values_index = 0
 
+        # only the area around the unmasked pixels is processed, padded so the
+        # blur and dilation at its edges see the same pixels as the full frame
+        unmasked = (resized_mask > 0).astype(np.uint8)
+        padding = blur_radius + 1
+        x, y, w, h = cv2.boundingRect(unmasked)
+        self.crop_offset = (max(x - padding, 0), max(y - padding, 0))
+        self.crop = (
+            slice(self.crop_offset[1], min(y + h + padding, unmasked.shape[0])),
+            slice(self.crop_offset[0], min(x + w + padding, unmasked.shape[1])),
+        )
+        self.fully_masked = w == 0 or h == 0
+        crop_unmasked = unmasked[self.crop]
+        crop_size = crop_unmasked.shape
+        # ORed into the frame to set masked pixels to 255
+        self.mask_fill = np.where(crop_unmasked == 0, 255, 0).astype(np.uint8)
+        self.histogram_mask = crop_unmasked
+        self.tiles = get_unmasked_tiles(
+            cv2.dilate(
+                crop_unmasked, np.ones((2 * padding + 1, 2 * padding + 1), np.uint8)
+            ),
+            self.TILE_SIZE,
+        )
+
+        # buffers reused for every frame
+        self.avg_frame_uint8 = np.zeros(self.motion_frame_size, np.uint8)
+        self.resized_frame = np.zeros(self.motion_frame_size, np.uint8)
+        self.frame_delta = np.zeros(crop_size, np.uint8)
+        self.thresh = np.zeros(crop_size, np.uint8)
+        self.thresh_dilated = np.zeros(crop_size, np.uint8)
+        self.histogram = np.zeros((256, 1), np.float32)
+        self.contrast_lut = np.zeros(256, np.uint8)
+        self.lut_range = np.arange(256, dtype=np.uint8)
+        self.blurred = np.zeros(crop_size, np.float64)
+        offsets = np.arange(-blur_radius, blur_radius + 1)
+        self.blur_kernel = np.exp(-0.5 * offsets**2)
+        self.blur_kernel /= self.blur_kernel.sum()
+        self.identity_kernel = np.ones(1)
+
+        # masked pixels are always 255, start the average there so they
+        # never show up as motion while calibrating
+        self.avg_frame[unmasked == 0] = 255
+        self.avg_frame_uint8[unmasked == 0] = 255
+
+        # a saved background is only valid for the same resolution and mask
+        self.state_path = state_path
+        self.state_key = hashlib.sha1(
+            f"{frame_shape}{self.motion_frame_size}".encode() + resized_mask.tobytes()
+        ).hexdigest()
+        self.last_state_save = time.monotonic()
+
+        if state_path:
+            self.load_state()
+
     def is_calibrating(self):
         return self.calibrating
 
@@ -61,12 +159,19 @@ class ImprovedMotionDetector(MotionDetector):
 
         gray = frame[0 : self.frame_shape[0], 0 : self.frame_shape[1]]
 
+        if self.fully_masked:
+            return motion_boxes
+
         # resize frame
-        resized_frame = cv2.resize(
+        cv2.resize(
             gray,
             dsize=(self.motion_frame_size[1], self.motion_frame_size[0]),
+            dst=self.resized_frame,
             interpolation=self.interpolation,
         )
+        resized_frame = self.resized_frame[self.crop]
+        avg_frame = self.avg_frame[self.crop]
+        avg_frame_uint8 = self.avg_frame_uint8[self.crop]
 
         if self.save_images:
             resized_saved = resized_frame.copy()
@@ -74,8 +179,9 @@ class ImprovedMotionDetector(MotionDetector):
         # Improve contrast
         if self.improve_contrast.value:
             # TODO tracking moving average of min/max to avoid sudden contrast changes
-            minval = np.percentile(resized_frame, 4).astype(np.uint8)
-            maxval = np.percentile(resized_frame, 96).astype(np.uint8)
+            minval, maxval = self.get_percentiles(
+                resized_frame, 4, 96, mask=self.histogram_mask
+            )
             # skip contrast calcs if the image is a single color
             if minval < maxval:
                 # keep track of the last 50 contrast values
@@ -86,19 +192,21 @@ class ImprovedMotionDetector(MotionDetector):
 
                 avg_min, avg_max = np.mean(self.contrast_values, axis=0)
 
-                resized_frame = np.clip(resized_frame, avg_min, avg_max)
-                resized_frame = (
-                    ((resized_frame - avg_min) / (avg_max - avg_min)) * 255
-                ).astype(np.uint8)
+                # stretch through a lookup table instead of per pixel float math
+                self.contrast_lut[:] = (
+                    (np.clip(self.lut_range, avg_min, avg_max) - avg_min)
+                    / (avg_max - avg_min)
+                ) * 255
+                cv2.LUT(resized_frame, self.contrast_lut, dst=resized_frame)
 
         if self.save_images:
             contrasted_saved = resized_frame.copy()
 
         # mask frame
         # this has to come after contrast improvement
-        resized_frame[self.mask] = [255]
+        cv2.bitwise_or(resized_frame, self.mask_fill, dst=resized_frame)
 
-        resized_frame = gaussian_filter(resized_frame, sigma=1, radius=self.blur_radius)
+        self.blur(resized_frame)
 
         if self.save_images:
             blurred_saved = resized_frame.copy()
@@ -106,18 +214,31 @@ class ImprovedMotionDetector(MotionDetector):
         if self.save_images or self.calibrating:
             self.frame_counter += 1
         # compare to average
-        frameDelta = cv2.absdiff(resized_frame, cv2.convertScaleAbs(self.avg_frame))
+        # fully masked tiles are never written and stay 0
+        frameDelta = self.frame_delta
+        thresh = self.thresh
+        for tile in self.tiles:
+            cv2.absdiff(
+                resized_frame[tile], avg_frame_uint8[tile], dst=frameDelta[tile]
+            )
 
-        # compute the threshold image for the current frame
-        thresh = cv2.threshold(
-            frameDelta, self.threshold.value, 255, cv2.THRESH_BINARY
-        )[1]
+            # compute the threshold image for the current frame
+            cv2.threshold(
+                frameDelta[tile],
+                self.threshold.value,
+                255,
+                cv2.THRESH_BINARY,
+                dst=thresh[tile],
+            )
 
         # dilate the thresholded image to fill in holes, then find contours
         # on thresholded image
-        thresh_dilated = cv2.dilate(thresh, None, iterations=1)
+        thresh_dilated = cv2.dilate(thresh, None, dst=self.thresh_dilated, iterations=1)
         cnts = cv2.findContours(
-            thresh_dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+            thresh_dilated,
+            cv2.RETR_EXTERNAL,
+            cv2.CHAIN_APPROX_SIMPLE,
+            offset=self.crop_offset,
         )
         cnts = imutils.grab_contours(cnts)
 
@@ -152,11 +273,19 @@ class ImprovedMotionDetector(MotionDetector):
 
         if self.save_images:
             thresh_dilated = cv2.cvtColor(thresh_dilated, cv2.COLOR_GRAY2BGR)
+            # the boxes are in frame coordinates, the images are cropped
+            x_offset, y_offset = self.crop_offset
             for b in motion_boxes:
                 cv2.rectangle(
                     thresh_dilated,
-                    (int(b[0] / self.resize_factor), int(b[1] / self.resize_factor)),
-                    (int(b[2] / self.resize_factor), int(b[3] / self.resize_factor)),
+                    (
+                        int(b[0] / self.resize_factor) - x_offset,
+                        int(b[1] / self.resize_factor) - y_offset,
+                    ),
+                    (
+                        int(b[2] / self.resize_factor) - x_offset,
+                        int(b[3] / self.resize_factor) - y_offset,
+                    ),
                     (0, 0, 255),
                     2,
                 )
@@ -179,18 +308,112 @@ class ImprovedMotionDetector(MotionDetector):
             self.motion_frame_count += 1
             if self.motion_frame_count >= 10:
                 # only average in the current frame if the difference persists for a bit
-                cv2.accumulateWeighted(
-                    resized_frame,
-                    self.avg_frame,
-                    0.2 if self.calibrating else self.config.frame_alpha,
-                )
+                self.update_average(resized_frame, avg_frame, avg_frame_uint8)
         else:
             # when no motion, just keep averaging the frames together
-            cv2.accumulateWeighted(
-                resized_frame,
-                self.avg_frame,
-                0.2 if self.calibrating else self.config.frame_alpha,
-            )
+            self.update_average(resized_frame, avg_frame, avg_frame_uint8)
             self.motion_frame_count = 0
 
+        if (
+            self.state_path
+            and not self.calibrating
+            and time.monotonic() - self.last_state_save >= MOTION_STATE_INTERVAL
+        ):
+            self.save_state()
+
         return motion_boxes
+
+    def save_state(self) -> None:
+        """Save the background so it can be restored after a restart."""
+        self.last_state_save = time.monotonic()
+
+        if self.calibrating:
+            return
+
+        tmp_path = f"{self.state_path}.tmp"
+
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    key=self.state_key,
+                    avg_frame=self.avg_frame,
+                    contrast_values=self.contrast_values,
+                    contrast_values_index=self.contrast_values_index,
+                )
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.warning(f"{self.name}: Unable to save motion background: {e}")
+
+    def load_state(self) -> bool:
+        """Restore a saved background if it matches the resolution and mask."""
+        try:
+            with np.load(self.state_path) as state:
+                if str(state["key"]) != self.state_key:
+                    logger.debug(f"{self.name}: Saved motion background is outdated.")
+                    return False
+
+                self.avg_frame[:] = state["avg_frame"]
+                self.contrast_values[:] = state["contrast_values"]
+                self.contrast_values_index = int(state["contrast_values_index"])
+        except FileNotFoundError:
+            return False
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"{self.name}: Unable to load motion background: {e}")
+            return False
+
+        cv2.convertScaleAbs(self.avg_frame, dst=self.avg_frame_uint8)
+        self.calibrating = False
+        logger.debug(f"{self.name}: Restored motion background.")
+        return True
+
+    def blur(self, frame):
+        """Gaussian blur in place, matching scipy.ndimage.gaussian_filter(sigma=1).
+
+        Like scipy the columns and then the rows are filtered separately and
+        truncated back to uint8 in between, so results are identical.
+        """
+        for kernel_x, kernel_y in (
+            (self.identity_kernel, self.blur_kernel),
+            (self.blur_kernel, self.identity_kernel),
+        ):
+            cv2.sepFilter2D(
+                frame,
+                cv2.CV_64F,
+                kernel_x,
+                kernel_y,
+                dst=self.blurred,
+                borderType=cv2.BORDER_REFLECT,
+            )
+            np.copyto(frame, self.blurred, casting="unsafe")
+
+    def update_average(self, frame, avg_frame, avg_frame_uint8):
+        cv2.accumulateWeighted(
+            frame,
+            avg_frame,
+            0.2 if self.calibrating else self.config.frame_alpha,
+        )
+        # keep a uint8 copy to compare the next frame against
+        cv2.convertScaleAbs(avg_frame, dst=avg_frame_uint8)
+
+    def get_percentiles(self, frame, *percentiles, mask=None) -> list[int]:
+        """Same as np.percentile(frame, p).astype(np.uint8) without sorting the frame.
+
+        Only pixels that are non zero in mask are counted when it is given.
+        """
+        cv2.calcHist([frame], [0], mask, [256], [0, 256], hist=self.histogram)
+        cumulative = np.cumsum(self.histogram[:, 0])
+        last = int(cumulative[-1]) - 1
+        values = []
+
+        for p in percentiles:
+            # linear interpolation between the two closest ranks like numpy
+            rank = last * p / 100
+            lower = int(rank)
+            fraction = rank - lower
+            lower_value, upper_value = np.searchsorted(
+                cumulative, (lower, min(lower + 1, last)), side="right"
+            )
+            values.append(int(lower_value + fraction * (upper_value - lower_value)))
+
+        return values
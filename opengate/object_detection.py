@@ -2,28 +2,73 @@ import datetime
 import logging
 import multiprocessing as mp
 import os
-import queue
 import signal
 import threading
+import time
 from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Optional
 
 import numpy as np
+import xxhash
 from setproctitle import setproctitle
 
-from opengate.detectors import create_detector
-from opengate.detectors.detector_config import InputTensorEnum
+from opengate.detectors import api_types, create_detector
+from opengate.detectors.detector_config import DetectionCacheConfig, InputTensorEnum
 from opengate.util.builtin import EventsPerSecond, load_labels
-from opengate.util.image import SharedMemoryFrameManager
+from opengate.util.ipc import DetectionSlots, MessagePipe
 from opengate.util.services import listen
 
 logger = logging.getLogger(__name__)
 
 
+def label_array(labels) -> np.ndarray:
+    """Get a list or dict of labels as an array indexed by class id."""
+    if not isinstance(labels, dict):
+        labels = dict(enumerate(labels))
+
+    array = np.full(max(labels, default=-1) + 1, None, dtype=object)
+    for index, label in labels.items():
+        array[index] = label
+    return array
+
+
+def parse_detections(raw_detections, labels: np.ndarray, threshold: float) -> list:
+    """Get (label, score, box) tuples of the raw detections above the threshold."""
+    raw_detections = np.asarray(raw_detections).reshape(-1, 6)
+
+    # detections are sorted by score
+    below = np.flatnonzero(raw_detections[:, 1] < threshold)
+    if len(below):
+        raw_detections = raw_detections[: below[0]]
+
+    class_ids = raw_detections[:, 0].astype(int)
+    known = (class_ids >= 0) & (class_ids < len(labels))
+    known[known] = np.not_equal(labels[class_ids[known]], None)
+
+    if not known.all():
+        logger.warning(f"Raw Detect returned invalid label: {raw_detections[~known]}")
+        raw_detections = raw_detections[known]
+        class_ids = class_ids[known]
+
+    return list(
+        zip(
+            labels[class_ids].tolist(),
+            raw_detections[:, 1].tolist(),
+            map(tuple, raw_detections[:, 2:].tolist()),
+        )
+    )
+
+
 class ObjectDetector(ABC):
     @abstractmethod
     def detect(self, tensor_input, threshold=0.4):
         pass
 
+    def detect_all(self, tensor_inputs, threshold=0.4) -> list:
+        """Detect objects in each of the inputs, results are in input order."""
+        return [self.detect(tensor_input, threshold) for tensor_input in tensor_inputs]
+
 
 def tensor_transform(desired_shape):
     # Currently this function only supports BHWC permutations
@@ -44,6 +89,7 @@ class LocalObjectDetector(ObjectDetector):
             self.labels = {}
         else:
             self.labels = load_labels(labels)
+        self.label_array = label_array(self.labels)
 
         if detector_config:
             self.input_transform = tensor_transform(detector_config.model.input_tensor)
@@ -53,19 +99,9 @@ class LocalObjectDetector(ObjectDetector):
         self.detect_api = create_detector(detector_config)
 
     def detect(self, tensor_input, threshold=0.4):
-        detections = []
-
-        raw_detections = self.detect_raw(tensor_input)
-
-        for d in raw_detections:
-            if int(d[0]) < 0 or int(d[0]) >= len(self.labels):
-                logger.warning(f"Raw Detect returned invalid label: {d}")
-                continue
-            if d[1] < threshold:
-                break
-            detections.append(
-                (self.labels[int(d[0])], float(d[1]), (d[2], d[3], d[4], d[5]))
-            )
+        detections = parse_detections(
+            self.detect_raw(tensor_input), self.label_array, threshold
+        )
         self.fps.update()
         return detections
 
@@ -74,13 +110,172 @@ class LocalObjectDetector(ObjectDetector):
             tensor_input = np.transpose(tensor_input, self.input_transform)
         return self.detect_api.detect_raw(tensor_input=tensor_input)
 
+    def detect_raw_batch(self, tensor_input):
+        if self.input_transform:
+            tensor_input = np.transpose(tensor_input, self.input_transform)
+        return self.detect_api.detect_raw_batch(tensor_input=tensor_input)
+
+
+class DetectionResultCache:
+    """Reuses the detections of inputs identical to a recent input.
+
+    Frozen streams resend the same frame and some regions are detected again
+    unchanged, their inputs hash to the same key.
+    """
+
+    def __init__(self, config: DetectionCacheConfig):
+        self.config = config
+        # input hash -> (detection time, detections), least recently used first
+        self.entries: OrderedDict[int, tuple[float, np.ndarray]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(tensor_input: np.ndarray) -> int:
+        return xxhash.xxh3_64_intdigest(np.ascontiguousarray(tensor_input))
+
+    def get(self, key: int, now: float) -> Optional[np.ndarray]:
+        """Get the cached detections of an input or None if it must be detected."""
+        entry = self.entries.get(key)
+
+        if entry is None or now - entry[0] > self.config.max_age:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: int, now: float, detections: np.ndarray) -> None:
+        # detectors may reuse their output buffers
+        self.entries[key] = (now, np.array(detections, np.float32))
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.config.max_entries:
+            self.entries.popitem(last=False)
+
+
+class DetectorQueue:
+    """The request pipe of a detector process and its current load.
+
+    Cameras send (camera index, slot, generation) messages to the detector, a
+    message hands the slot to the detector until it responds. The generation
+    counts the restarts of the detector process, requests sent to an exited
+    process are dropped.
+    """
+
+    def __init__(self, name: str, cameras: list[str]):
+        self.name = name
+        self.cameras = cameras
+        self.camera_indexes = {camera: i for i, camera in enumerate(cameras)}
+        self.requests = MessagePipe("<HHI")
+        self.generation = mp.Value("i", 0)
+        self.pending = mp.Value("i", 0)
+        self.running = mp.Value("i", 0)
+        self.avg_inference_speed = mp.Value("d", 0.01)
+        self.avg_wait = mp.Value("d", 0.0)
+
+    def put(self, camera: str, slot: int) -> Optional[int]:
+        """Send a request, returns the generation it was sent to."""
+        with self.pending.get_lock():
+            generation = self.generation.value
+            self.pending.value += 1
+
+        if not self.requests.send(self.camera_indexes[camera], slot, generation):
+            with self.pending.get_lock():
+                self.pending.value -= 1
+            return None
+
+        return generation
+
+    def get(self, count: int, timeout: float = 0) -> list[tuple[str, int]]:
+        """Take up to count requests, waiting at most timeout for the first."""
+        generation = self.generation.value
+        return [
+            (self.cameras[camera], slot)
+            for camera, slot, request_generation in self.requests.receive(
+                count, timeout
+            )
+            if request_generation == generation
+        ]
+
+    def reset(self) -> None:
+        """Drop the requests of a detector process that has exited."""
+        with self.pending.get_lock():
+            self.generation.value += 1
+            self.pending.value = 0
+
+        self.running.value = 0
+
+    def started(self, request_time: float) -> None:
+        """Update the load when the detector takes a request."""
+        with self.pending.get_lock():
+            self.pending.value -= 1
+
+        self.running.value += 1
+        wait = time.monotonic() - request_time
+        self.avg_wait.value = (self.avg_wait.value * 9 + wait) / 10
+
+    def finished(self, count: int) -> None:
+        """Update the load when the detector has answered count requests."""
+        self.running.value -= count
+
+    def estimated_completion(self) -> float:
+        """Estimated seconds until a new request would be done."""
+        outstanding = max(0, self.pending.value) + self.running.value
+        return (outstanding + 1) * self.avg_inference_speed.value
+
+    def close(self) -> None:
+        self.requests.close()
+
+
+def select_detector(
+    detector_queues: list[DetectorQueue],
+    preferred: list[str],
+    spill_over: Optional[float] = None,
+) -> DetectorQueue:
+    """Get the detector that would finish a new request first.
+
+    Only preferred detectors are used, unless they would take longer than
+    spill_over seconds.
+    """
+    candidates = [d for d in detector_queues if d.name in preferred]
+
+    if candidates:
+        best = min(candidates, key=lambda d: d.estimated_completion())
+
+        if spill_over is None or best.estimated_completion() <= spill_over:
+            return best
+
+    return min(detector_queues, key=lambda d: d.estimated_completion())
+
+
+def get_batch(
+    detector_queue: DetectorQueue, batch_size: int, timeout: float
+) -> list[tuple[str, int]]:
+    """Collect up to batch_size requests, waiting at most timeout to fill a batch."""
+    batch = detector_queue.get(batch_size)
+    deadline = time.monotonic() + timeout
+
+    while batch and len(batch) < batch_size:
+        remaining = deadline - time.monotonic()
+
+        if remaining <= 0 or not detector_queue.requests.wait(remaining):
+            break
+
+        batch += detector_queue.get(batch_size - len(batch))
+
+    return batch
+
 
 def run_detector(
     name: str,
-    detection_queue: mp.Queue,
-    out_events: dict[str, mp.Event],
-    avg_speed,
+    detector_queue: DetectorQueue,
+    responses: dict[str, MessagePipe],
     start,
+    api_stats,
+    cache_hits,
+    cache_misses,
     detector_config,
 ):
     threading.current_thread().name = f"detector:{name}"
@@ -98,37 +293,108 @@ def run_detector(
     signal.signal(signal.SIGTERM, receiveSignal)
     signal.signal(signal.SIGINT, receiveSignal)
 
-    frame_manager = SharedMemoryFrameManager()
     object_detector = LocalObjectDetector(detector_config=detector_config)
 
-    outputs = {}
-    for name in out_events.keys():
-        out_shm = mp.shared_memory.SharedMemory(name=f"out-{name}", create=False)
-        out_np = np.ndarray((20, 6), dtype=np.float32, buffer=out_shm.buf)
-        outputs[name] = {"shm": out_shm, "np": out_np}
+    camera_slots = {camera: DetectionSlots(camera) for camera in detector_queue.cameras}
+    input_shape = (1, detector_config.model.height, detector_config.model.width, 3)
+
+    detect_api = object_detector.detect_api
+    batch_size = detect_api.batch_size if detect_api.supports_batch else 1
+
+    # the first inferences pay for lazy initialization, so run them before
+    # requests are waiting on the detector
+    if detector_config.warmup_inferences and detect_api.warmup:
+        warmup_start = time.monotonic()
+        blank_input = np.zeros(input_shape, np.uint8)
+
+        for _ in range(detector_config.warmup_inferences):
+            object_detector.detect_raw(blank_input)
+
+        if batch_size > 1:
+            object_detector.detect_raw_batch(
+                np.zeros((batch_size, *input_shape[1:]), np.uint8)
+            )
+
+        logger.info(f"Warmed up in {time.monotonic() - warmup_start:.2f}s")
+
+    avg_speed = detector_queue.avg_inference_speed
+    result_cache = (
+        DetectionResultCache(detector_config.result_cache)
+        if detector_config.result_cache.enabled
+        else None
+    )
+
+    def respond(camera: str, slot: int, detections) -> None:
+        camera_slots[camera].set_output(slot, detections)
+
+        # the camera waits for every slot, the pipe holds many more responses
+        if not responses[camera].send(slot):
+            logger.error(f"Response pipe of {camera} is full")
+
+    input_frames = []
 
     while not stop_event.is_set():
-        try:
-            connection_id = detection_queue.get(timeout=1)
-        except queue.Empty:
-            continue
-        input_frame = frame_manager.get(
-            connection_id,
-            (1, detector_config.model.height, detector_config.model.width, 3),
-        )
+        batch = get_batch(detector_queue, batch_size, detector_config.batch_timeout)
 
-        if input_frame is None:
+        if not batch:
+            detector_queue.requests.wait(1)
             continue
 
-        # detect and send the output
-        start.value = datetime.datetime.now().timestamp()
-        detections = object_detector.detect_raw(input_frame)
-        duration = datetime.datetime.now().timestamp() - start.value
-        outputs[connection_id]["np"][:] = detections[:]
-        out_events[connection_id].set()
-        start.value = 0.0
+        detect_requests = []
+        input_frames = []
+        input_keys = []
+        for camera, slot in batch:
+            detector_queue.started(camera_slots[camera].request_times[slot])
+            input_frame = camera_slots[camera].input(slot, input_shape)
+
+            if result_cache:
+                key = result_cache.key(input_frame)
+                detections = result_cache.get(key, time.monotonic())
+
+                if detections is not None:
+                    respond(camera, slot, detections)
+                    continue
+
+                input_keys.append(key)
+
+            detect_requests.append((camera, slot))
+            input_frames.append(input_frame)
+
+        if input_frames:
+            # detect and send the output
+            start.value = datetime.datetime.now().timestamp()
+            if len(input_frames) == 1:
+                batch_detections = [object_detector.detect_raw(input_frames[0])]
+            else:
+                batch_detections = object_detector.detect_raw_batch(
+                    np.concatenate(input_frames)
+                )
+            duration = datetime.datetime.now().timestamp() - start.value
+
+            for (camera, slot), detections in zip(detect_requests, batch_detections):
+                respond(camera, slot, detections)
+            start.value = 0.0
+
+            if result_cache:
+                now = time.monotonic()
+                for key, detections in zip(input_keys, batch_detections):
+                    result_cache.set(key, now, detections)
 
-        avg_speed.value = (avg_speed.value * 9 + duration) / 10
+            # average time per request, so batching shows as faster inference
+            avg_speed.value = (avg_speed.value * 9 + duration / len(input_frames)) / 10
+
+        detector_queue.finished(len(batch))
+
+        if result_cache:
+            cache_hits.value = result_cache.hits
+            cache_misses.value = result_cache.misses
+
+        if len(api_stats):
+            api_stats[:] = object_detector.detect_api.get_stats()
+
+    del input_frames
+    for slots in camera_slots.values():
+        slots.close()
 
     logger.info("Exited detection process...")
 
@@ -137,15 +403,20 @@ class ObjectDetectProcess:
     def __init__(
         self,
         name,
-        detection_queue,
-        out_events,
+        detector_queue: DetectorQueue,
+        responses: dict[str, MessagePipe],
         detector_config,
     ):
         self.name = name
-        self.out_events = out_events
-        self.detection_queue = detection_queue
-        self.avg_inference_speed = mp.Value("d", 0.01)
+        self.responses = responses
+        self.detector_queue = detector_queue
+        self.avg_inference_speed = detector_queue.avg_inference_speed
         self.detection_start = mp.Value("d", 0.0)
+        api = api_types.get(detector_config.type)
+        self.api_stats_keys = api.stats_keys if api else ()
+        self.api_stats = mp.Array("d", len(self.api_stats_keys))
+        self.cache_hits = mp.Value("i", 0)
+        self.cache_misses = mp.Value("i", 0)
         self.detect_process = None
         self.detector_config = detector_config
         self.start_or_restart()
@@ -167,15 +438,19 @@ class ObjectDetectProcess:
         self.detection_start.value = 0.0
         if (self.detect_process is not None) and self.detect_process.is_alive():
             self.stop()
+        if self.detect_process is not None:
+            self.detector_queue.reset()
         self.detect_process = mp.Process(
             target=run_detector,
             name=f"detector:{self.name}",
             args=(
                 self.name,
-                self.detection_queue,
-                self.out_events,
-                self.avg_inference_speed,
+                self.detector_queue,
+                self.responses,
                 self.detection_start,
+                self.api_stats,
+                self.cache_hits,
+                self.cache_misses,
                 self.detector_config,
             ),
         )
@@ -183,50 +458,169 @@ class ObjectDetectProcess:
         self.detect_process.start()
 
 
-class RemoteObjectDetector:
-    def __init__(self, name, labels, detection_queue, event, model_config, stop_event):
+class RemoteObjectDetector(ObjectDetector):
+    def __init__(
+        self,
+        name,
+        labels,
+        detector_queues: list[DetectorQueue],
+        response: MessagePipe,
+        model_config,
+        stop_event,
+        detect_config=None,
+    ):
         self.labels = labels
+        self.label_array = label_array(labels)
         self.name = name
         self.fps = EventsPerSecond()
-        self.detection_queue = detection_queue
-        self.event = event
+        self.detector_queues = detector_queues
+        self.preferred_detectors = detect_config.detectors if detect_config else []
+        self.spill_over = detect_config.spill_over if detect_config else None
+        self.response = response
         self.stop_event = stop_event
-        self.shm = mp.shared_memory.SharedMemory(name=self.name, create=False)
-        self.np_shm = np.ndarray(
-            (1, model_config.height, model_config.width, 3),
-            dtype=np.uint8,
-            buffer=self.shm.buf,
+        self.slots = DetectionSlots(self.name)
+        self.free = deque(range(self.slots.slots))
+        # slot -> detector and generation of the requests in flight
+        self.requests: dict[int, tuple[DetectorQueue, int]] = {}
+        # slots the detector has responded to
+        self.done: set[int] = set()
+        # slots whose request timed out, freed once the detector responds
+        self.abandoned: set[int] = set()
+        self.input_shape = (1, model_config.height, model_config.width, 3)
+
+    def receive(self, timeout: float = 0) -> None:
+        """Take back the slots of the responses of the detectors."""
+        for (slot,) in self.response.receive(self.slots.slots, timeout):
+            self.requests.pop(slot, None)
+
+            if slot in self.abandoned:
+                self.abandoned.remove(slot)
+                self.free.append(slot)
+            else:
+                self.done.add(slot)
+
+    def reclaim(self) -> None:
+        """Take back the slots of requests lost by a restarted detector."""
+        lost = [
+            slot
+            for slot, (detector_queue, generation) in self.requests.items()
+            if detector_queue.generation.value != generation
+        ]
+
+        if not lost:
+            return
+
+        # responses sent before the detector exited are already in the pipe
+        self.receive()
+
+        for slot in lost:
+            if self.requests.pop(slot, None) is None:
+                continue
+
+            logger.warning(f"{self.name}: detection request lost by a detector restart")
+            self.abandoned.discard(slot)
+            self.free.append(slot)
+
+    def submit(self, tensor_input) -> Optional[int]:
+        """Send a request to the least loaded detector, returns its slot."""
+        self.receive()
+
+        if not self.free:
+            self.reclaim()
+
+            if not self.free:
+                return None
+
+        slot = self.free.popleft()
+
+        # copy input to shared memory
+        self.slots.input(slot, self.input_shape)[:] = tensor_input[:]
+        self.slots.request_times[slot] = time.monotonic()
+
+        detector_queue = select_detector(
+            self.detector_queues, self.preferred_detectors, self.spill_over
         )
-        self.out_shm = mp.shared_memory.SharedMemory(
-            name=f"out-{self.name}", create=False
+        generation = detector_queue.put(self.name, slot)
+
+        if generation is None:
+            self.free.appendleft(slot)
+            return None
+
+        self.requests[slot] = (detector_queue, generation)
+        return slot
+
+    def wait(self, slot: int, threshold=0.4, timeout=5.0):
+        """Wait for the detections of a submitted request."""
+        deadline = time.monotonic() + timeout
+
+        # responses of other slots wake this up too
+        while slot not in self.done:
+            self.reclaim()
+
+            # the request was lost
+            if slot not in self.requests:
+                return []
+
+            remaining = deadline - time.monotonic()
+
+            if remaining <= 0 or self.stop_event.is_set():
+                self.abandoned.add(slot)
+                return []
+
+            self.receive(min(remaining, 1))
+
+        self.done.remove(slot)
+        detections = parse_detections(
+            self.slots.outputs[slot], self.label_array, threshold
         )
-        self.out_np_shm = np.ndarray((20, 6), dtype=np.float32, buffer=self.out_shm.buf)
+        self.free.append(slot)
+        self.fps.update()
+        return detections
 
     def detect(self, tensor_input, threshold=0.4):
-        detections = []
-
         if self.stop_event.is_set():
-            return detections
+            return []
 
-        # copy input to shared memory
-        self.np_shm[:] = tensor_input[:]
-        self.event.clear()
-        self.detection_queue.put(self.name)
-        result = self.event.wait(timeout=5.0)
+        slot = self.submit(tensor_input)
 
-        # if it timed out
-        if result is None:
-            return detections
+        if slot is None:
+            logger.warning(f"{self.name}: no detection slot is available")
+            return []
 
-        for d in self.out_np_shm:
-            if d[1] < threshold:
+        return self.wait(slot, threshold)
+
+    def detect_all(self, tensor_inputs, threshold=0.4) -> list:
+        """Detect objects in each of the inputs, keeping several in flight.
+
+        Each input is submitted as soon as it is created, so creating the next
+        input overlaps with the detection of the previous ones, which can run
+        on different detectors at the same time.
+        """
+        results = []
+        in_flight: deque[tuple[int, int]] = deque()
+
+        for tensor_input in tensor_inputs:
+            if self.stop_event.is_set():
                 break
-            detections.append(
-                (self.labels[int(d[0])], float(d[1]), (d[2], d[3], d[4], d[5]))
-            )
-        self.fps.update()
-        return detections
+
+            results.append([])
+            slot = self.submit(tensor_input)
+
+            # all slots are in flight, wait for the oldest request
+            while slot is None and in_flight:
+                index, done_slot = in_flight.popleft()
+                results[index] = self.wait(done_slot, threshold)
+                slot = self.submit(tensor_input)
+
+            if slot is not None:
+                in_flight.append((len(results) - 1, slot))
+            else:
+                logger.warning(f"{self.name}: no detection slot is available")
+
+        for index, slot in in_flight:
+            results[index] = self.wait(slot, threshold)
+
+        return results
 
     def cleanup(self):
-        self.shm.unlink()
-        self.out_shm.unlink()
+        self.slots.close()
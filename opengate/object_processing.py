@@ -20,10 +20,13 @@ from opengate.config import (
     RecordConfig,
     SnapshotsConfig,
 )
-from opengate.const import CLIPS_DIR
+from opengate.const import CLIPS_DIR, MOTION_HEATMAP_PUBLISH_INTERVAL
 from opengate.events.maintainer import EventTypeEnum
+from opengate.motion.heatmap import MotionHeatmap
 from opengate.ptz.autotrack import PtzAutoTrackerThread
 from opengate.util.image import (
+    FrameLatencyEnum,
+    FrameStageEnum,
     SharedMemoryFrameManager,
     area,
     calculate_region,
@@ -482,19 +485,20 @@ class CameraState:
         self.current_frame_time = 0.0
         self.motion_boxes = []
         self.regions = []
-        self.previous_frame_id = None
+        self.current_frame_index = None
+        self.motion_heatmap = MotionHeatmap(self.camera_config.frame_shape)
         self.callbacks = defaultdict(list)
         self.ptz_autotracker_thread = ptz_autotracker_thread
 
     def get_current_frame(self, draw_options={}):
         with self.current_frame_lock:
-            frame_copy = np.copy(self._current_frame)
+            # the frame is held until the next update, so convert it in place
+            frame_copy = cv2.cvtColor(self._current_frame, cv2.COLOR_YUV2BGR_I420)
             frame_time = self.current_frame_time
             tracked_objects = {k: v.to_dict() for k, v in self.tracked_objects.items()}
             motion_boxes = self.motion_boxes.copy()
             regions = self.regions.copy()
 
-        frame_copy = cv2.cvtColor(frame_copy, cv2.COLOR_YUV2BGR_I420)
         # draw on the frame
         if draw_options.get("bounding_boxes"):
             # draw the bounding boxes on the frame
@@ -597,6 +601,9 @@ class CameraState:
                     2,
                 )
 
+        if draw_options.get("heatmap"):
+            self.motion_heatmap.draw(frame_copy)
+
         if draw_options.get("timestamp"):
             color = self.camera_config.timestamp_style.color
             draw_timestamp(
@@ -617,11 +624,12 @@ class CameraState:
     def on(self, event_type: str, callback: Callable[[dict], None]):
         self.callbacks[event_type].append(callback)
 
-    def update(self, frame_time, current_detections, motion_boxes, regions):
+    def update(
+        self, frame_time, frame_index, current_detections, motion_boxes, regions
+    ):
         # get the new frame
-        frame_id = f"{self.name}{frame_time}"
         current_frame = self.frame_manager.get(
-            frame_id, self.camera_config.frame_shape_yuv
+            self.name, self.camera_config.frame_shape_yuv, frame_index
         )
 
         tracked_objects = self.tracked_objects.copy()
@@ -779,9 +787,13 @@ class CameraState:
             self.motion_boxes = motion_boxes
             self.regions = regions
             self._current_frame = current_frame
-            if self.previous_frame_id is not None:
-                self.frame_manager.close(self.previous_frame_id)
-            self.previous_frame_id = frame_id
+
+            # the previous frame is no longer needed by this stage
+            if self.current_frame_index is not None:
+                self.frame_manager.release(
+                    self.name, self.current_frame_index, FrameStageEnum.tracked
+                )
+            self.current_frame_index = frame_index
 
 
 class TrackedObjectProcessor(threading.Thread):
@@ -810,6 +822,7 @@ class TrackedObjectProcessor(threading.Thread):
         self.camera_states: dict[str, CameraState] = {}
         self.frame_manager = SharedMemoryFrameManager()
         self.last_motion_detected: dict[str, float] = {}
+        self.last_heatmap_published: dict[str, float] = {}
         self.ptz_autotracker_thread = ptz_autotracker_thread
 
         def start(camera, obj: TrackedObject, current_frame_time):
@@ -1052,6 +1065,33 @@ class TrackedObjectProcessor(threading.Thread):
                 # reset the last_motion so redundant `off` commands aren't sent
                 self.last_motion_detected[camera] = 0
 
+    def update_motion_heatmap(self, camera, frame_time, motion_boxes):
+        camera_state = self.camera_states[camera]
+        camera_state.motion_heatmap.update(
+            frame_time,
+            motion_boxes,
+            [
+                obj.obj_data["box"]
+                for obj in camera_state.tracked_objects.values()
+                if obj.obj_data["frame_time"] == frame_time
+            ],
+        )
+
+        # publish suggested motion masks now and then
+        if (
+            frame_time - self.last_heatmap_published.get(camera, 0)
+            >= MOTION_HEATMAP_PUBLISH_INTERVAL
+        ):
+            self.dispatcher.publish(
+                f"{camera}/motion/suggested_masks",
+                json.dumps(camera_state.motion_heatmap.suggest_masks()),
+                retain=True,
+            )
+            self.last_heatmap_published[camera] = frame_time
+
+    def get_motion_heatmap(self, camera) -> dict:
+        return self.camera_states[camera].motion_heatmap.to_dict()
+
     def get_best(self, camera, label):
         # TODO: need a lock here
         camera_state = self.camera_states[camera]
@@ -1079,11 +1119,16 @@ class TrackedObjectProcessor(threading.Thread):
         return self.camera_states[camera].current_frame_time
 
     def run(self):
+        for camera, camera_config in self.config.cameras.items():
+            if camera_config.enabled:
+                self.frame_manager.get_ring(camera).register(FrameStageEnum.tracked)
+
         while not self.stop_event.is_set():
             try:
                 (
                     camera,
                     frame_time,
+                    frame_index,
                     current_tracked_objects,
                     motion_boxes,
                     regions,
@@ -1091,22 +1136,34 @@ class TrackedObjectProcessor(threading.Thread):
             except queue.Empty:
                 continue
 
+            # the camera processor already holds the frame, this only verifies it
+            if not self.frame_manager.hold(camera, frame_index, FrameStageEnum.tracked):
+                logger.debug(f"{camera}: frame {frame_time} was freed before tracking.")
+                continue
+
             camera_state = self.camera_states[camera]
 
             camera_state.update(
-                frame_time, current_tracked_objects, motion_boxes, regions
+                frame_time, frame_index, current_tracked_objects, motion_boxes, regions
             )
 
             self.update_mqtt_motion(camera, frame_time, motion_boxes)
+            self.update_motion_heatmap(camera, frame_time, motion_boxes)
+            self.frame_manager.get_ring(camera).record_latency(
+                FrameLatencyEnum.processed, frame_time
+            )
 
             tracked_objects = [
                 o.to_dict() for o in camera_state.tracked_objects.values()
             ]
 
+            # hand the frame over to the output process
+            self.frame_manager.hold(camera, frame_index, FrameStageEnum.output)
             self.video_output_queue.put(
                 (
                     camera,
                     frame_time,
+                    frame_index,
                     tracked_objects,
                     motion_boxes,
                     regions,
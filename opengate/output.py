@@ -26,6 +26,8 @@ from opengate.config import BirdseyeModeEnum, OpenGateConfig
 from opengate.const import BASE_DIR, BIRDSEYE_PIPE
 from opengate.types import CameraMetricsTypes
 from opengate.util.image import (
+    FrameLatencyEnum,
+    FrameStageEnum,
     SharedMemoryFrameManager,
     copy_yuv_to_position,
     get_yuv_crop,
@@ -340,6 +342,7 @@ class BirdsEyeFrameManager:
                 "dimensions": [settings.detect.width, settings.detect.height],
                 "last_active_frame": 0.0,
                 "current_frame": 0.0,
+                "current_frame_index": None,
                 "layout_frame": 0.0,
                 "channel_dims": {
                     "y": y,
@@ -358,19 +361,19 @@ class BirdsEyeFrameManager:
         logger.debug("Clearing the birdseye frame")
         self.frame[:] = self.blank_frame
 
-    def copy_to_position(self, position, camera=None, frame_time=None):
+    def copy_to_position(self, position, camera=None, frame_index=None):
         if camera is None:
             frame = None
             channel_dims = None
         else:
-            try:
-                frame = self.frame_manager.get(
-                    f"{camera}{frame_time}", self.config.cameras[camera].frame_shape_yuv
-                )
-            except FileNotFoundError:
-                # TODO: better frame management would prevent this edge case
-                logger.warning(
-                    f"Unable to copy frame {camera}{frame_time} to birdseye."
+            frame = self.frame_manager.get(
+                camera, self.config.cameras[camera].frame_shape_yuv, frame_index
+            )
+
+            # the slot has already been reused for a newer frame
+            if frame is None:
+                logger.debug(
+                    f"Unable to copy frame {frame_index} of {camera} to birdseye."
                 )
                 return
             channel_dims = self.cameras[camera]["channel_dims"]
@@ -529,7 +532,9 @@ class BirdsEyeFrameManager:
         for row in self.camera_layout:
             for position in row:
                 self.copy_to_position(
-                    position[1], position[0], self.cameras[position[0]]["current_frame"]
+                    position[1],
+                    position[0],
+                    self.cameras[position[0]]["current_frame_index"],
                 )
 
         return True
@@ -677,7 +682,9 @@ class BirdsEyeFrameManager:
         else:
             return standard_candidate_layout
 
-    def update(self, camera, object_count, motion_count, frame_time, frame) -> bool:
+    def update(
+        self, camera, object_count, motion_count, frame_time, frame_index
+    ) -> bool:
         # don't process if birdseye is disabled for this camera
         camera_config = self.config.cameras[camera].birdseye
         if not camera_config.enabled:
@@ -701,6 +708,7 @@ class BirdsEyeFrameManager:
 
         # update the last active frame for the camera
         self.cameras[camera]["current_frame"] = frame_time
+        self.cameras[camera]["current_frame_index"] = frame_index
         if self.camera_active(birdseye_mode, object_count, motion_count):
             self.cameras[camera]["last_active_frame"] = frame_time
 
@@ -744,6 +752,10 @@ def output_frames(
     frame_manager = SharedMemoryFrameManager()
     previous_frames = {}
 
+    for camera, camera_config in config.cameras.items():
+        if camera_config.enabled:
+            frame_manager.get_ring(camera).register(FrameStageEnum.output)
+
     # start a websocket server on 8082
     WebSocketWSGIHandler.http_version = "1.1"
     websocket_server = make_server(
@@ -823,6 +835,7 @@ def output_frames(
             (
                 camera,
                 frame_time,
+                frame_index,
                 current_tracked_objects,
                 motion_boxes,
                 regions,
@@ -830,9 +843,14 @@ def output_frames(
         except queue.Empty:
             continue
 
-        frame_id = f"{camera}{frame_time}"
+        # the object processor already holds the frame, this only verifies it
+        if not frame_manager.hold(camera, frame_index, FrameStageEnum.output):
+            logger.debug(f"{camera}: frame {frame_time} was freed before output.")
+            continue
 
-        frame = frame_manager.get(frame_id, config.cameras[camera].frame_shape_yuv)
+        frame = frame_manager.get(
+            camera, config.cameras[camera].frame_shape_yuv, frame_index
+        )
 
         # send camera frame to ffmpeg process if websockets are connected
         if any(
@@ -857,7 +875,7 @@ def output_frames(
                 len([o for o in current_tracked_objects if not o["stationary"]]),
                 len(motion_boxes),
                 frame_time,
-                frame,
+                frame_index,
             ):
                 frame_bytes = birdseye_manager.frame.tobytes()
 
@@ -871,22 +889,26 @@ def output_frames(
                     pass
 
         if camera in previous_frames:
-            frame_manager.delete(f"{camera}{previous_frames[camera]}")
+            frame_manager.release(
+                camera, previous_frames[camera], FrameStageEnum.output
+            )
 
-        previous_frames[camera] = frame_time
+        previous_frames[camera] = frame_index
+        frame_manager.get_ring(camera).record_latency(
+            FrameLatencyEnum.output, frame_time
+        )
 
     while not video_output_queue.empty():
         (
             camera,
             frame_time,
+            frame_index,
             current_tracked_objects,
             motion_boxes,
             regions,
         ) = video_output_queue.get(True, 10)
 
-        frame_id = f"{camera}{frame_time}"
-        frame = frame_manager.get(frame_id, config.cameras[camera].frame_shape_yuv)
-        frame_manager.delete(frame_id)
+        frame_manager.release(camera, frame_index, FrameStageEnum.output)
 
     for b in broadcasters.values():
         b.join()
@@ -94,11 +94,18 @@ class PtzMotionEstimator:
                 f"{camera}: Motion estimator running - frame time: {frame_time}"
             )
 
-            frame_id = f"{camera}{frame_time}"
+            frame_index = self.frame_manager.get_ring(camera).find(frame_time)
+
+            if frame_index is None:
+                return self.coord_transformations
+
             yuv_frame = self.frame_manager.get(
-                frame_id, self.camera_config.frame_shape_yuv
+                camera, self.camera_config.frame_shape_yuv, frame_index
             )
 
+            if yuv_frame is None:
+                return self.coord_transformations
+
             frame = cv2.cvtColor(yuv_frame, cv2.COLOR_YUV2GRAY_I420)
 
             # mask out detections for better motion estimation
@@ -134,8 +141,6 @@ class PtzMotionEstimator:
             except Exception:
                 pass
 
-            self.frame_manager.close(frame_id)
-
         return self.coord_transformations
 
 
@@ -15,6 +15,7 @@ from opengate.config import OpenGateConfig
 from opengate.const import CACHE_DIR, CLIPS_DIR, DRIVER_AMD, DRIVER_ENV_VAR, RECORD_DIR
 from opengate.object_detection import ObjectDetectProcess
 from opengate.types import CameraMetricsTypes, StatsTrackingTypes
+from opengate.util.image import FrameLatencyEnum, SharedMemoryFrameRing
 from opengate.util.services import (
     get_amd_gpu_stats,
     get_bandwidth_stats,
@@ -33,10 +34,12 @@ def stats_init(
     camera_metrics: dict[str, CameraMetricsTypes],
     detectors: dict[str, ObjectDetectProcess],
     processes: dict[str, int],
+    frame_rings: dict[str, SharedMemoryFrameRing],
 ) -> StatsTrackingTypes:
     stats_tracking: StatsTrackingTypes = {
         "camera_metrics": camera_metrics,
         "detectors": detectors,
+        "frame_rings": frame_rings,
         "started": int(time.time()),
         "latest_opengate_version": "0.13.2",
         "last_updated": int(time.time()),
@@ -219,6 +222,30 @@ async def set_gpu_stats(
         all_stats["gpu_usages"] = stats
 
 
+def region_cache_stats(camera_stats: CameraMetricsTypes) -> dict[str, Any]:
+    hits = camera_stats["region_cache_hits"].value
+    misses = camera_stats["region_cache_misses"].value
+    forced_refreshes = camera_stats["region_cache_forced_refreshes"].value
+    lookups = hits + misses + forced_refreshes
+    return {
+        "hits": hits,
+        "misses": misses,
+        "forced_refreshes": forced_refreshes,
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+    }
+
+
+def result_cache_stats(detector: ObjectDetectProcess) -> dict[str, Any]:
+    hits = detector.cache_hits.value  # type: ignore[attr-defined]
+    misses = detector.cache_misses.value  # type: ignore[attr-defined]
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+    }
+
+
 def stats_snapshot(
     config: OpenGateConfig,
     stats_tracking: StatsTrackingTypes,
@@ -246,8 +273,11 @@ def stats_snapshot(
             "camera_fps": round(camera_stats["camera_fps"].value, 2),
             "process_fps": round(camera_stats["process_fps"].value, 2),
             "skipped_fps": round(camera_stats["skipped_fps"].value, 2),
+            "bytes_copied": camera_stats["bytes_copied"].value,
             "detection_fps": round(camera_stats["detection_fps"].value, 2),
             "detection_enabled": camera_stats["detection_enabled"].value,
+            "idle": bool(camera_stats["idle"].value),
+            "region_cache": region_cache_stats(camera_stats),
             "pid": pid,
             "capture_pid": cpid,
             "ffmpeg_pid": ffmpeg_pid,
@@ -255,6 +285,24 @@ def stats_snapshot(
             "audio_dBFS": round(camera_stats["audio_dBFS"].value, 4),
         }
 
+        frame_ring = stats_tracking["frame_rings"].get(name)
+        if frame_ring:
+            stats["cameras"][name]["frames_leaked"] = frame_ring.leaked
+            stats["cameras"][name]["frames_freed_early"] = frame_ring.freed_early
+
+            # milliseconds from capture until the frame reached each point
+            latency = {}
+            for point in FrameLatencyEnum:
+                percentiles = frame_ring.latency_percentiles(point)
+
+                if percentiles:
+                    latency[point.name] = {
+                        f"p{p}": round(value * 1000, 2)
+                        for p, value in zip((50, 95, 99), percentiles)
+                    }
+
+            stats["cameras"][name]["latency"] = latency
+
     stats["detectors"] = {}
     for name, detector in stats_tracking["detectors"].items():
         pid = detector.detect_process.pid if detector.detect_process else None
@@ -265,7 +313,15 @@ def stats_snapshot(
             "detection_start": detector.detection_start.value,  # type: ignore[attr-defined]
             # issue https://github.com/python/typeshed/issues/8799
             # from mypy 0.981 onwards
+            "queue_depth": max(0, detector.detector_queue.pending.value),  # type: ignore[attr-defined]
+            # issue https://github.com/python/typeshed/issues/8799
+            # from mypy 0.981 onwards
+            "queue_wait": round(detector.detector_queue.avg_wait.value * 1000, 2),  # type: ignore[attr-defined]
+            # issue https://github.com/python/typeshed/issues/8799
+            # from mypy 0.981 onwards
             "pid": pid,
+            "result_cache": result_cache_stats(detector),
+            **dict(zip(detector.api_stats_keys, detector.api_stats[:])),
         }
     stats["detection_fps"] = round(total_detection_fps, 2)
 
@@ -0,0 +1,97 @@
+"""A stand-in DeepStack compatible detection API to load test the http detector.
+
+Run with python -m opengate.test.detection_server.
+
+Every image gets one person detection covering its center.
+"""
+
+import json
+import random
+import time
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import click
+import cv2
+import numpy as np
+
+
+def create_handler(delay: float, error_rate: float):
+    class DetectionHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # headers and body are written separately on kept alive connections
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            message = BytesParser(policy=policy.HTTP).parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+            )
+            image = None
+
+            for part in message.iter_parts():
+                if part.get_param("name", header="content-disposition") == "image":
+                    image = cv2.imdecode(
+                        np.frombuffer(part.get_payload(decode=True), np.uint8),
+                        cv2.IMREAD_COLOR,
+                    )
+
+            time.sleep(delay)
+
+            if image is None or random.random() < error_rate:
+                self.respond(500, {"success": False, "error": "failed"})
+                return
+
+            height, width = image.shape[:2]
+            self.respond(
+                200,
+                {
+                    "success": True,
+                    "predictions": [
+                        {
+                            "label": "person",
+                            "confidence": 0.9,
+                            "y_min": height // 4,
+                            "x_min": width // 4,
+                            "y_max": height * 3 // 4,
+                            "x_max": width * 3 // 4,
+                        }
+                    ],
+                },
+            )
+
+        def respond(self, status: int, data: dict) -> None:
+            content = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+    return DetectionHandler
+
+
+def create_server(
+    port: int, delay: float = 0.0, error_rate: float = 0.0
+) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), create_handler(delay, error_rate))
+    server.daemon_threads = True
+    return server
+
+
+@click.command()
+@click.option("-p", "--port", default=5000, help="Port to listen on.")
+@click.option("-d", "--delay", default=0.02, help="Seconds of simulated inference.")
+@click.option("-e", "--error-rate", default=0.0, help="Fraction of failed requests.")
+def serve(port, delay, error_rate):
+    server = create_server(port, delay, error_rate)
+    print(f"Listening on http://127.0.0.1:{port}/v1/vision/detection")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,42 @@
+"""Test the array box helpers against the single box versions."""
+
+import random
+import unittest
+
+from opengate.test.test_cluster_candidates import random_boxes
+from opengate.util import boxes as box_ops
+from opengate.util.object import box_inside, box_overlaps
+
+
+class TestBoxOps(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.boxes_a = random_boxes(rng, (720, 1280), 40, 400)
+        self.boxes_b = random_boxes(rng, (720, 1280), 30, 400)
+        # touching edges count as overlapping
+        self.boxes_b.append((self.boxes_a[0][2], 0, 1279, self.boxes_a[0][1]))
+
+    def test_empty(self):
+        assert box_ops.overlap_matrix([], self.boxes_b).shape == (0, 31)
+        assert box_ops.intersects_any(self.boxes_a, []).tolist() == [False] * 40
+        assert box_ops.inside_any([], self.boxes_a).tolist() == []
+
+    def test_overlaps(self):
+        assert box_ops.overlap_matrix(self.boxes_a, self.boxes_b).tolist() == [
+            [box_overlaps(a, b) for b in self.boxes_b] for a in self.boxes_a
+        ]
+        assert box_ops.intersects_any(self.boxes_a, self.boxes_b).tolist() == [
+            any(box_overlaps(a, b) for b in self.boxes_b) for a in self.boxes_a
+        ]
+
+    def test_inside(self):
+        assert box_ops.inside_matrix(self.boxes_a, self.boxes_b).tolist() == [
+            [box_inside(a, b) for b in self.boxes_b] for a in self.boxes_a
+        ]
+        assert box_ops.inside_any(self.boxes_b, self.boxes_a).tolist() == [
+            any(box_inside(a, b) for a in self.boxes_a) for b in self.boxes_b
+        ]
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,103 @@
+"""Test the vectorized get_cluster_candidates against the loop based version."""
+
+import random
+import unittest
+
+from opengate.util.image import area
+from opengate.util.object import (
+    box_inside,
+    get_cluster_boundary,
+    get_cluster_candidates,
+    get_cluster_region,
+)
+
+
+def reference_get_cluster_candidates(frame_shape, min_region, boxes):
+    cluster_candidates = []
+    used_boxes = []
+    for current_index, b in enumerate(boxes):
+        if current_index in used_boxes:
+            continue
+        cluster = [current_index]
+        used_boxes.append(current_index)
+        cluster_boundary = get_cluster_boundary(b, min_region)
+        for compare_index, compare_box in enumerate(boxes):
+            if compare_index in used_boxes:
+                continue
+
+            if not box_inside(cluster_boundary, compare_box):
+                continue
+
+            potential_cluster = cluster + [compare_index]
+            cluster_region = get_cluster_region(
+                frame_shape, min_region, potential_cluster, boxes
+            )
+            should_cluster = True
+            if (cluster_region[2] - cluster_region[0]) > min_region:
+                for b in potential_cluster:
+                    box = boxes[b]
+                    if area(box) / area(cluster_region) < 0.05:
+                        should_cluster = False
+                        break
+
+            if should_cluster:
+                cluster.append(compare_index)
+                used_boxes.append(compare_index)
+        cluster_candidates.append(cluster)
+
+    unique = {tuple(sorted(c)) for c in cluster_candidates}
+    return [list(tup) for tup in unique]
+
+
+def random_boxes(rng: random.Random, frame_shape, count, max_size, integers=True):
+    boxes = []
+    for _ in range(count):
+        width = rng.randint(1, max_size)
+        height = rng.randint(1, max_size)
+        x = rng.randint(0, frame_shape[1] - width)
+        y = rng.randint(0, frame_shape[0] - height)
+        box = (x, y, x + width, y + height)
+
+        if not integers:
+            box = tuple(v + rng.random() for v in box)
+
+        boxes.append(box)
+    return boxes
+
+
+class TestClusterCandidates(unittest.TestCase):
+    def assert_same_clusters(self, frame_shape, min_region, boxes):
+        assert get_cluster_candidates(
+            frame_shape, min_region, boxes
+        ) == reference_get_cluster_candidates(frame_shape, min_region, boxes)
+
+    def test_empty(self):
+        assert get_cluster_candidates((720, 1280), 320, []) == []
+
+    def test_randomized_equivalence(self):
+        rng = random.Random(0)
+
+        for _ in range(500):
+            frame_shape = rng.choice([(720, 1280), (1080, 1920), (480, 640)])
+            min_region = rng.choice([160, 320, 416, 640])
+            count = rng.randint(1, 60)
+            max_size = rng.choice([20, 100, 400])
+            self.assert_same_clusters(
+                frame_shape,
+                min_region,
+                random_boxes(rng, frame_shape, count, max_size, rng.random() < 0.8),
+            )
+
+    def test_boxes_outside_frame(self):
+        rng = random.Random(1)
+
+        for _ in range(100):
+            boxes = [
+                (x - 200, y - 200, x2 + 200, y2 + 200)
+                for x, y, x2, y2 in random_boxes(rng, (720, 1280), 20, 300)
+            ]
+            self.assert_same_clusters((720, 1280), 320, boxes)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
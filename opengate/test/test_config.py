@@ -87,6 +87,47 @@ class TestConfig(unittest.TestCase):
         assert runtime_config.detectors["edgetpu"].model.width == 160
         assert runtime_config.detectors["openvino"].model.width == 512
 
+    def test_onnx_detector(self):
+        config = {
+            "detectors": {
+                "onnx": {
+                    "type": "onnx",
+                    "intra_op_threads": 2,
+                    "graph_optimization": "basic",
+                    "model": {"path": "/etc/hosts", "model_type": "yolov8"},
+                },
+            },
+        }
+
+        opengate_config = OpenGateConfig(**(deep_merge(config, self.minimal)))
+        runtime_config = opengate_config.runtime_config()
+
+        assert runtime_config.detectors["onnx"].type == DetectorTypeEnum.onnx
+        assert runtime_config.detectors["onnx"].intra_op_threads == 2
+        assert runtime_config.detectors["onnx"].inter_op_threads == 0
+        assert runtime_config.detectors["onnx"].graph_optimization == "basic"
+        assert runtime_config.detectors["onnx"].model.path == "/etc/hosts"
+
+    def test_model_cache_path(self):
+        config = {
+            "detectors": {
+                "openvino": {"type": "openvino", "device": "GPU.0"},
+            },
+            "model": {"path": "/etc/hosts"},
+        }
+
+        opengate_config = OpenGateConfig(**(deep_merge(config, self.minimal)))
+        runtime_config = opengate_config.runtime_config()
+        model = runtime_config.detectors["openvino"].model
+
+        assert runtime_config.detectors["openvino"].warmup_inferences == 2
+        assert model.cache_path("openvino", "GPU.0", 1) == os.path.join(
+            MODEL_CACHE_DIR, "openvino", f"{model.model_hash}-GPU.0-1"
+        )
+        assert model.cache_path("openvino", "GPU.0", 2) != model.cache_path(
+            "openvino", "GPU.0", 1
+        )
+
     def test_invalid_mqtt_config(self):
         config = {
             "mqtt": {"host": "mqtt", "user": "test"},
@@ -1619,6 +1660,34 @@ class TestConfig(unittest.TestCase):
 
         self.assertRaises(ValueError, lambda: OpenGateConfig(**config))
 
+    def test_fails_unknown_preferred_detector(self):
+        config = {
+            "mqtt": {"host": "mqtt"},
+            "detectors": {"coral": {"type": "edgetpu", "device": "usb"}},
+            "cameras": {
+                "back": {
+                    "ffmpeg": {
+                        "inputs": [
+                            {"path": "rtsp://10.0.0.1:554/video", "roles": ["detect"]}
+                        ]
+                    },
+                    "detect": {
+                        "height": 1080,
+                        "width": 1920,
+                        "fps": 5,
+                        "detectors": ["cpu"],
+                    },
+                }
+            },
+        }
+
+        opengate_config = OpenGateConfig(**config)
+        self.assertRaises(ValueError, lambda: opengate_config.runtime_config())
+
+        config["cameras"]["back"]["detect"]["detectors"] = ["coral"]
+        runtime_config = OpenGateConfig(**config).runtime_config()
+        assert runtime_config.cameras["back"].detect.detectors == ["coral"]
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
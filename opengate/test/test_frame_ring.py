@@ -0,0 +1,120 @@
+"""Test the shared memory frame ring."""
+
+import datetime
+import multiprocessing as mp
+import unittest
+
+from opengate.const import FRAME_LATENCY_SAMPLES
+from opengate.util.image import (
+    FrameLatencyEnum,
+    FrameStageEnum,
+    SharedMemoryFrameManager,
+    SharedMemoryFrameRing,
+)
+
+
+class TestSharedMemoryFrameRing(unittest.TestCase):
+    def setUp(self):
+        self.ring = SharedMemoryFrameRing(
+            "test_ring", 6, 4, create=True, leak_timeout=30
+        )
+        self.frame_manager = SharedMemoryFrameManager()
+
+    def tearDown(self):
+        self.frame_manager.get_ring("test_ring").close()
+        self.ring.close()
+        self.ring.unlink()
+
+    def capture(self, frame_time):
+        frame_index = self.ring.acquire(frame_time)
+        self.ring.release(frame_index, FrameStageEnum.capture)
+        return frame_index
+
+    def test_frame_is_shared(self):
+        frame_index = self.ring.acquire(1.0)
+        self.ring.buffer(frame_index)[:] = bytes(range(6))
+        frame = self.frame_manager.get("test_ring", (3, 2), frame_index)
+        assert frame.tolist() == [[0, 1], [2, 3], [4, 5]]
+        del frame
+
+    def test_stale_generation_is_rejected(self):
+        first = self.capture(1.0)
+
+        for i in range(4):
+            self.capture(2.0 + i)
+
+        assert self.frame_manager.get("test_ring", (6,), first) is None
+        assert not self.frame_manager.hold("test_ring", first, FrameStageEnum.output)
+        assert self.ring.freed_early == 1
+
+    def test_held_slots_are_skipped(self):
+        held = self.ring.acquire(1.0)
+        acquired = [self.ring.acquire(2.0 + i) for i in range(3)]
+        assert held not in acquired
+        assert self.ring.acquire(5.0) is None
+
+        # a frame is only reused once every stage has released it
+        self.frame_manager.hold("test_ring", held, FrameStageEnum.process)
+        self.frame_manager.release("test_ring", held, FrameStageEnum.capture)
+        assert self.ring.acquire(6.0) is None
+
+        self.frame_manager.release("test_ring", held, FrameStageEnum.process)
+        frame_index = self.ring.acquire(7.0)
+        assert frame_index is not None
+        assert frame_index % 4 == held % 4
+        assert self.ring.find(7.0) == frame_index
+
+    def test_frames_of_exited_stages_are_reclaimed(self):
+        # the process stage is owned by a process that exits
+        process = mp.Process(target=self.ring.register, args=(FrameStageEnum.process,))
+        process.start()
+        process.join()
+
+        for i in range(4):
+            frame_index = self.ring.acquire(float(i))
+            self.ring.hold(frame_index, FrameStageEnum.process)
+            self.ring.release(frame_index, FrameStageEnum.capture)
+
+        assert self.ring.acquire(10.0) is None
+        assert self.ring.acquire(40.0) is not None
+        assert self.ring.leaked == 1
+
+    def test_live_stages_keep_their_frames(self):
+        self.ring.register(FrameStageEnum.output)
+
+        # the output keeps the last frame of a camera that has stalled
+        held = self.capture(1.0)
+        self.ring.hold(held, FrameStageEnum.output)
+
+        for i in range(3):
+            self.ring.acquire(2.0 + i)
+
+        assert self.ring.acquire(100.0) is None
+        assert self.ring.leaked == 0
+
+    def test_attached_ring_resumes_generation(self):
+        for i in range(5):
+            self.capture(float(i))
+
+        ring = self.frame_manager.get_ring("test_ring")
+        assert ring.slots == 4
+        assert ring.frame_size == 6
+        assert ring.acquire(10.0) == 6
+
+    def test_latency_percentiles(self):
+        assert self.ring.latency_percentiles(FrameLatencyEnum.output) is None
+
+        ring = self.frame_manager.get_ring("test_ring")
+        now = datetime.datetime.now().timestamp()
+
+        for i in range(FRAME_LATENCY_SAMPLES + 10):
+            ring.record_latency(FrameLatencyEnum.output, now - (i % 100) / 100)
+
+        p50, p95, p99 = self.ring.latency_percentiles(FrameLatencyEnum.output)
+        assert 0.45 < p50 < 0.55
+        assert 0.9 < p95 < p99 < 1.1
+        assert self.ring.latency_percentiles(FrameLatencyEnum.motion) is None
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,67 @@
+import threading
+import unittest
+
+import numpy as np
+from pydantic import parse_obj_as
+
+from opengate.detectors import DetectorConfig
+from opengate.detectors.plugins.deepstack import DeepStack
+from opengate.detectors.plugins.http_api import HttpDetector
+from opengate.test.detection_server import create_server
+
+
+class TestHttpDetector(unittest.TestCase):
+    def setUp(self):
+        self.server = create_server(0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.api_url = (
+            f"http://127.0.0.1:{self.server.server_address[1]}/v1/vision/detection"
+        )
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def create(self, detector_type: str, **config):
+        detector_config = parse_obj_as(
+            DetectorConfig,
+            {
+                "type": detector_type,
+                "api_url": self.api_url,
+                "api_timeout": 5,
+                "model": {"labelmap": {0: "person", 2: "car", 5: "person"}},
+                **config,
+            },
+        )
+        return (HttpDetector if detector_type == "http" else DeepStack)(detector_config)
+
+    def test_detect_batch(self):
+        detector = self.create("http", batch_size=3)
+        assert detector.supports_batch
+
+        detections = detector.detect_raw_batch(np.zeros((3, 40, 80, 3), np.uint8))
+        assert len(detections) == 3
+
+        for detection in detections:
+            assert detection.shape == (20, 6)
+            assert np.allclose(detection[0], [0, 0.9, 0.25, 0.25, 0.75, 0.75])
+            assert not detection[1:].any()
+
+        assert detector.get_stats()[1] == 0
+
+    def test_label_indexes(self):
+        assert self.create("http").label_indexes["person"] == 0
+        assert "truck" not in self.create("http").label_indexes
+        assert self.create("deepstack").label_indexes["truck"] == 2
+
+    def test_error(self):
+        # nothing listens on port 1
+        detector = self.create("http", api_url="http://127.0.0.1:1/v1/vision/detection")
+        detections = detector.detect_raw(np.zeros((1, 40, 80, 3), np.uint8))
+
+        assert not detections.any()
+        assert detector.get_stats()[1] > 0
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,188 @@
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+
+import numpy as np
+
+from opengate.object_detection import DetectorQueue, RemoteObjectDetector
+from opengate.util.ipc import DetectionSlots, MessagePipe
+
+
+class TestMessagePipe(unittest.TestCase):
+    def setUp(self):
+        self.pipe = MessagePipe("<HH")
+
+    def tearDown(self):
+        self.pipe.close()
+
+    def test_send_receive(self):
+        assert self.pipe.receive() == []
+
+        for slot in range(3):
+            assert self.pipe.send(1, slot)
+
+        assert self.pipe.receive(2) == [(1, 0), (1, 1)]
+        assert self.pipe.receive() == [(1, 2)]
+
+    def test_many_senders(self):
+        def send(camera):
+            for slot in range(100):
+                self.pipe.send(camera, slot)
+
+        senders = [threading.Thread(target=send, args=(c,)) for c in range(4)]
+        for sender in senders:
+            sender.start()
+        for sender in senders:
+            sender.join()
+
+        # messages are never split
+        messages = []
+        while received := self.pipe.receive(7):
+            messages += received
+        assert sorted(messages) == [(c, s) for c in range(4) for s in range(100)]
+
+    def test_wait(self):
+        assert not self.pipe.wait(0.01)
+        assert self.pipe.receive(timeout=0.01) == []
+
+        threading.Timer(0.01, self.pipe.send, args=(0, 1)).start()
+        assert self.pipe.receive(timeout=1) == [(0, 1)]
+
+    def test_full(self):
+        while self.pipe.send(0, 0):
+            pass
+
+        assert not self.pipe.send(0, 0)
+
+        # the pipe frees whole pages
+        assert len(self.pipe.receive(1024)) == 1024
+        assert self.pipe.send(0, 0)
+
+
+class TestDetectionSlots(unittest.TestCase):
+    def setUp(self):
+        self.slots = DetectionSlots("test_slots", 2, 8 * 8 * 3, create=True)
+
+    def tearDown(self):
+        self.slots.close()
+        self.slots.unlink()
+
+    def test_attach(self):
+        attached = DetectionSlots("test_slots")
+        self.addCleanup(attached.close)
+        assert (attached.slots, attached.input_size) == (2, 8 * 8 * 3)
+
+        self.slots.input(1, (1, 8, 8, 3))[:] = 5
+        self.slots.outputs[1][0] = (1, 0.9, 0, 0, 1, 1)
+        assert attached.input(1, (1, 8, 8, 3)).max() == 5
+        assert attached.input(0, (1, 8, 8, 3)).max() == 0
+        assert attached.outputs[1][0][1] == np.float32(0.9)
+
+    def test_set_output(self):
+        self.slots.set_output(0, np.ones((30, 6), np.float32))
+        assert self.slots.outputs[0].all()
+
+        # fewer detections than the slot holds clears the rest
+        self.slots.set_output(0, np.full((5, 6), 2, np.float32))
+        assert (self.slots.outputs[0][:5] == 2).all()
+        assert not self.slots.outputs[0][5:].any()
+
+
+class TestRemoteObjectDetector(unittest.TestCase):
+    def setUp(self):
+        self.slots = DetectionSlots("test_remote", 2, 8 * 8 * 3, create=True)
+        self.detector_queue = DetectorQueue("test_remote", ["test_remote"])
+        self.response = MessagePipe("<H")
+        self.detector = RemoteObjectDetector(
+            "test_remote",
+            {0: "person", 1: "car"},
+            [self.detector_queue],
+            self.response,
+            Mock(height=8, width=8),
+            threading.Event(),
+        )
+
+    def tearDown(self):
+        self.detector.cleanup()
+        self.detector_queue.close()
+        self.response.close()
+        self.slots.close()
+        self.slots.unlink()
+
+    def respond(self):
+        """Answer requests the way the detector process does."""
+        for camera, slot in self.detector_queue.get(2):
+            value = self.slots.input(slot, (1, 8, 8, 3))[0, 0, 0, 0]
+            self.slots.outputs[slot] = 0
+            self.slots.outputs[slot][0] = (value, 0.9, 0.1, 0.1, 0.5, 0.5)
+            self.slots.outputs[slot][1] = (0, 0.3, 0.1, 0.1, 0.5, 0.5)
+            self.response.send(slot)
+
+    def test_pipelined_requests(self):
+        first = self.detector.submit(np.zeros((1, 8, 8, 3), np.uint8))
+        second = self.detector.submit(np.ones((1, 8, 8, 3), np.uint8))
+        assert (first, second) == (0, 1)
+
+        # all slots are in flight
+        assert self.detector.submit(np.zeros((1, 8, 8, 3), np.uint8)) is None
+
+        threading.Timer(0.01, self.respond).start()
+
+        # results below the threshold are dropped
+        assert self.detector.wait(second) == [
+            ("car", np.float32(0.9), tuple(np.float32([0.1, 0.1, 0.5, 0.5])))
+        ]
+        assert self.detector.wait(first)[0][0] == "person"
+        assert self.detector.wait(first, timeout=0.01) == []
+
+    def test_timeout(self):
+        slot = self.detector.submit(np.zeros((1, 8, 8, 3), np.uint8))
+        assert self.detector.wait(slot, timeout=0.01) == []
+
+        # the slot is reused once the late response arrives
+        assert self.detector.submit(np.zeros((1, 8, 8, 3), np.uint8)) == 1
+        self.respond()
+        assert self.detector.submit(np.zeros((1, 8, 8, 3), np.uint8)) == slot
+
+    def test_detector_restart(self):
+        first = self.detector.submit(np.zeros((1, 8, 8, 3), np.uint8))
+        second = self.detector.submit(np.ones((1, 8, 8, 3), np.uint8))
+
+        # the detector exits after taking the first request
+        assert self.detector_queue.get(1) == [("test_remote", first)]
+        self.detector_queue.started(time.monotonic())
+        self.detector_queue.reset()
+        assert self.detector_queue.pending.value == 0
+        assert self.detector_queue.running.value == 0
+
+        # the restarted detector drops the requests of the exited one
+        assert self.detector_queue.get(2) == []
+        assert self.detector.wait(first) == []
+        assert self.detector.wait(second, timeout=0.01) == []
+        assert sorted(self.detector.free) == [0, 1]
+
+        threading.Timer(0.01, self.respond).start()
+        assert self.detector.detect(np.ones((1, 8, 8, 3), np.uint8))[0][0] == "car"
+
+    def test_detect_all(self):
+        stop = threading.Event()
+
+        def run():
+            while not stop.is_set():
+                self.respond()
+                self.detector_queue.requests.wait(0.01)
+
+        responder = threading.Thread(target=run)
+        responder.start()
+
+        # more inputs than slots, waits on the oldest when they are all in flight
+        try:
+            results = self.detector.detect_all(
+                np.full((1, 8, 8, 3), i % 2, np.uint8) for i in range(5)
+            )
+        finally:
+            stop.set()
+            responder.join()
+
+        assert [r[0][0] for r in results] == ["person", "car"] * 2 + ["person"]
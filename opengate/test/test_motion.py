@@ -0,0 +1,192 @@
+"""Test the improved motion detector."""
+
+import multiprocessing as mp
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from scipy.ndimage import gaussian_filter
+
+from opengate.config import OpenGateConfig
+from opengate.motion.heatmap import MotionHeatmap
+from opengate.motion.improved_motion import (
+    ImprovedMotionDetector,
+    get_unmasked_tiles,
+)
+
+
+class TestImprovedMotionDetector(unittest.TestCase):
+    def setUp(self):
+        self.frame_shape = (720, 1280)
+        self.detector = self.create_detector()
+        self.rng = np.random.default_rng(0)
+
+    def create_detector(self, mask=None, state_path=None):
+        config = OpenGateConfig(
+            **{
+                "mqtt": {"host": "mqtt"},
+                "cameras": {
+                    "back": {
+                        "ffmpeg": {
+                            "inputs": [
+                                {
+                                    "path": "rtsp://10.0.0.1:554/video",
+                                    "roles": ["detect"],
+                                }
+                            ]
+                        },
+                        "detect": {"height": 720, "width": 1280},
+                        "motion": {"mask": mask or []},
+                    }
+                },
+            }
+        ).runtime_config()
+        motion_config = config.cameras["back"].motion
+        return ImprovedMotionDetector(
+            self.frame_shape,
+            motion_config,
+            5,
+            mp.Value("i", 1),
+            mp.Value("i", motion_config.threshold),
+            mp.Value("i", motion_config.contour_area),
+            state_path=state_path,
+        )
+
+    def test_percentiles_match_numpy(self):
+        for _ in range(50):
+            frame = self.rng.integers(
+                0, self.rng.integers(1, 256), (180, 320), dtype=np.uint8
+            )
+            assert self.detector.get_percentiles(frame, 4, 96) == [
+                int(np.percentile(frame, p).astype(np.uint8)) for p in (4, 96)
+            ]
+
+    def test_blur_matches_gaussian_filter(self):
+        frame = self.rng.integers(0, 256, self.detector.motion_frame_size, np.uint8)
+        expected = gaussian_filter(frame, sigma=1, radius=1)
+        self.detector.blur(frame)
+        assert np.array_equal(frame, expected)
+
+    def detect_moving_object(self, box):
+        background = np.full(
+            (self.frame_shape[0] * 3 // 2, self.frame_shape[1]), 80, np.uint8
+        )
+
+        # the background is only averaged in once motion persisted for 10 frames
+        for _ in range(100):
+            if not self.detector.detect(background):
+                break
+
+        assert not self.detector.is_calibrating()
+
+        frame = background.copy()
+        frame[box[1] : box[3], box[0] : box[2]] = 230
+        return self.detector.detect(frame)
+
+    def test_unmasked_tiles(self):
+        unmasked = np.zeros((40, 70), np.uint8)
+        assert get_unmasked_tiles(unmasked, 16) == []
+
+        unmasked[:] = 1
+        assert get_unmasked_tiles(unmasked, 16) == [(slice(0, 40), slice(0, 70))]
+
+        unmasked[:, 20:50] = 0
+        unmasked[35:, :] = 0
+        assert get_unmasked_tiles(unmasked, 16) == [
+            (slice(0, 40), slice(0, 32)),
+            (slice(0, 40), slice(48, 70)),
+        ]
+
+    def test_masked_area_is_cropped(self):
+        # everything above y=300 and right of x=900 is masked
+        self.detector = self.create_detector(
+            ["0,0,1280,0,1280,300,0,300", "900,300,1280,300,1280,720,900,720"]
+        )
+        x_offset, y_offset = self.detector.crop_offset
+        assert x_offset == 0 and y_offset > 0
+        cropped = self.detector.resized_frame[self.detector.crop]
+        assert cropped.shape[1] < self.detector.motion_frame_size[1]
+
+        boxes = self.detect_moving_object((600, 400, 750, 520))
+        assert len(boxes) == 1
+        x_min, y_min, x_max, y_max = boxes[0]
+        assert x_min <= 600 and y_min <= 400
+        assert x_max >= 750 and y_max >= 520
+        assert x_max < 800 and y_max < 600
+
+        # motion in the masked area is ignored
+        assert self.detect_moving_object((1000, 100, 1200, 200)) == []
+
+    def test_fully_masked(self):
+        self.detector = self.create_detector(["0,0,1280,0,1280,720,0,720"])
+        frame = self.rng.integers(0, 256, (1080, 1280), np.uint8)
+        assert self.detector.detect(frame) == []
+
+    def test_detects_moving_object(self):
+        boxes = self.detect_moving_object((600, 300, 750, 420))
+        assert len(boxes) == 1
+        x_min, y_min, x_max, y_max = boxes[0]
+        assert x_min <= 600 and y_min <= 300
+        assert x_max >= 750 and y_max >= 420
+
+    def test_background_is_restored(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            state_path = os.path.join(cache_dir, "back.npz")
+            self.detector = self.create_detector(state_path=state_path)
+            self.detect_moving_object((600, 300, 750, 420))
+            self.detector.save_state()
+
+            restored = self.create_detector(state_path=state_path)
+            assert not restored.is_calibrating()
+            assert np.array_equal(restored.avg_frame, self.detector.avg_frame)
+            assert np.array_equal(
+                restored.contrast_values, self.detector.contrast_values
+            )
+
+            # a different mask invalidates the saved background
+            masked = self.create_detector(
+                ["0,0,1280,0,1280,300,0,300"], state_path=state_path
+            )
+            assert masked.is_calibrating()
+
+
+class TestMotionHeatmap(unittest.TestCase):
+    def setUp(self):
+        self.heatmap = MotionHeatmap((720, 1280), min_heat=50)
+
+    def test_unproductive_motion_is_suggested(self):
+        tree = (1000, 0, 1150, 130)
+        road = (100, 400, 400, 600)
+        car = (150, 420, 350, 580)
+
+        for i in range(100):
+            self.heatmap.update(i / 5, [tree, road], [car])
+
+        masks = self.heatmap.suggest_masks()
+        assert len(masks) == 1
+        points = np.array(masks[0].split(","), dtype=int).reshape(-1, 2)
+        x_min, y_min = points.min(axis=0)
+        x_max, y_max = points.max(axis=0)
+        assert x_min <= tree[0] and y_min <= tree[1]
+        assert x_max >= tree[2] and y_max >= tree[3]
+        assert x_max < 1280 and y_max < 720
+
+        frame = np.zeros((720, 1280, 3), np.uint8)
+        self.heatmap.draw(frame)
+        assert frame[50, 1050].any()
+
+    def test_motion_decays(self):
+        for i in range(100):
+            self.heatmap.update(i / 5, [(0, 0, 100, 100)], [])
+
+        assert self.heatmap.suggest_masks()
+
+        # nothing happened for two hours
+        self.heatmap.update(7220, [], [])
+        assert 24 < self.heatmap.motion.max() <= 25
+        assert not self.heatmap.suggest_masks()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -1,3 +1,7 @@
+import multiprocessing as mp
+import os
+import threading
+import time
 import unittest
 from unittest.mock import Mock, patch
 
@@ -8,7 +12,9 @@ import opengate.detectors as detectors
 import opengate.object_detection
 from opengate.config import DetectorConfig, ModelConfig
 from opengate.detectors import DetectorTypeEnum
-from opengate.detectors.detector_config import InputTensorEnum
+from opengate.detectors.detection_api import DetectionApi
+from opengate.detectors.detector_config import DetectionCacheConfig, InputTensorEnum
+from opengate.util.ipc import DetectionSlots, MessagePipe
 
 
 class TestLocalObjectDetector(unittest.TestCase):
@@ -136,3 +142,211 @@ class TestLocalObjectDetector(unittest.TestCase):
             == np.zeros((1, 32, 32, 3)).shape
         )
         assert test_result == TEST_DETECT_RESULT
+
+
+class TestBatchedDetection(unittest.TestCase):
+    def test_default_batch_runs_each_input(self):
+        class TestApi(DetectionApi):
+            def __init__(self, detector_config):
+                pass
+
+            def detect_raw(self, tensor_input):
+                assert tensor_input.shape == (1, 32, 32, 3)
+                return np.full((20, 6), tensor_input[0, 0, 0, 0], np.float32)
+
+        tensor_input = np.arange(3, dtype=np.uint8).reshape(3, 1, 1, 1)
+        tensor_input = np.tile(tensor_input, (1, 32, 32, 3))
+        results = TestApi(None).detect_raw_batch(tensor_input)
+        assert [r[0, 0] for r in results] == [0, 1, 2]
+
+    def test_get_batch(self):
+        detector_queue = opengate.object_detection.DetectorQueue(
+            "test_batch", ["front", "back"]
+        )
+        self.addCleanup(detector_queue.close)
+
+        detector_queue.put("front", 0)
+        detector_queue.put("back", 0)
+        detector_queue.put("front", 1)
+        detector_queue.put("front", 2)
+
+        # in the order of the requests
+        batch = opengate.object_detection.get_batch(detector_queue, 3, 0)
+        assert batch == [("front", 0), ("back", 0), ("front", 1)]
+
+        # waits up to the timeout for more requests
+        start = time.monotonic()
+        batch = opengate.object_detection.get_batch(detector_queue, 3, 0.05)
+        assert batch == [("front", 2)]
+        assert time.monotonic() - start >= 0.05
+
+        assert opengate.object_detection.get_batch(detector_queue, 1, 1) == []
+
+
+class TestDetectorDispatch(unittest.TestCase):
+    def setUp(self):
+        self.coral = opengate.object_detection.DetectorQueue("coral", ["front"])
+        self.coral.avg_inference_speed.value = 0.01
+        self.cpu = opengate.object_detection.DetectorQueue("cpu", ["front"])
+        self.cpu.avg_inference_speed.value = 0.1
+        self.detectors = [self.coral, self.cpu]
+
+    def tearDown(self):
+        for detector in self.detectors:
+            detector.close()
+
+    def select(self, preferred=[], spill_over=None):
+        return opengate.object_detection.select_detector(
+            self.detectors, preferred, spill_over
+        ).name
+
+    def test_least_loaded(self):
+        assert self.select() == "coral"
+
+        # the cpu is faster than waiting for 10 requests on the coral
+        self.coral.pending.value = 10
+        assert self.select() == "cpu"
+
+    def test_affinity_and_spill_over(self):
+        assert self.select(["cpu"]) == "cpu"
+
+        self.cpu.pending.value = 2
+        assert self.select(["cpu"]) == "cpu"
+        assert self.select(["cpu"], spill_over=0.5) == "cpu"
+        assert self.select(["cpu"], spill_over=0.2) == "coral"
+
+    def test_queue_load(self):
+        self.coral.put("front", 0)
+        self.coral.put("front", 1)
+        assert self.coral.pending.value == 2
+        assert self.coral.estimated_completion() == 0.03
+
+        assert self.coral.get(1) == [("front", 0)]
+        self.coral.started(time.monotonic() - 0.1)
+        assert self.coral.pending.value == 1
+        assert self.coral.avg_wait.value > 0
+
+        # running requests count until they are answered
+        assert self.coral.estimated_completion() == 0.03
+        self.coral.finished(1)
+        assert self.coral.estimated_completion() == 0.02
+
+
+class TestDetectorRestart(unittest.TestCase):
+    def setUp(self):
+        self.crash = mp.Value("i", 1)
+        crash = self.crash
+
+        class TestApi(DetectionApi):
+            def __init__(self, detector_config):
+                pass
+
+            def detect_raw(self, tensor_input):
+                # the first process exits with the requests it has taken
+                if crash.value:
+                    os._exit(1)
+
+                detections = np.zeros((20, 6), np.float32)
+                detections[0] = (0, 0.9, 0.1, 0.1, 0.5, 0.5)
+                return detections
+
+        patcher = patch.dict("opengate.detectors.api_types", {"cpu": TestApi})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.slots = DetectionSlots("test_restart", 2, 8 * 8 * 3, create=True)
+        self.detector_queue = opengate.object_detection.DetectorQueue(
+            "test_restart", ["test_restart"]
+        )
+        self.response = MessagePipe("<H")
+        detector_config = parse_obj_as(
+            DetectorConfig,
+            {
+                "type": "cpu",
+                "warmup_inferences": 0,
+                "result_cache": {"enabled": False},
+                "model": {"width": 8, "height": 8},
+            },
+        )
+        self.process = opengate.object_detection.ObjectDetectProcess(
+            "test_restart",
+            self.detector_queue,
+            {"test_restart": self.response},
+            detector_config,
+        )
+        self.detector = opengate.object_detection.RemoteObjectDetector(
+            "test_restart",
+            {0: "person"},
+            [self.detector_queue],
+            self.response,
+            Mock(height=8, width=8),
+            threading.Event(),
+        )
+
+    def tearDown(self):
+        self.process.stop()
+        self.detector.cleanup()
+        self.detector_queue.close()
+        self.response.close()
+        self.slots.close()
+        self.slots.unlink()
+
+    def test_restart_with_requests_in_flight(self):
+        first = self.detector.submit(np.zeros((1, 8, 8, 3), np.uint8))
+        second = self.detector.submit(np.zeros((1, 8, 8, 3), np.uint8))
+        self.process.detect_process.join(5)
+        assert self.process.detect_process.exitcode == 1
+
+        self.crash.value = 0
+        self.process.start_or_restart()
+        assert self.detector_queue.pending.value == 0
+        assert self.detector_queue.running.value == 0
+
+        # both slots are taken back and used for new requests
+        start = time.monotonic()
+        assert self.detector.wait(first) == []
+        assert self.detector.wait(second) == []
+        assert time.monotonic() - start < 1
+
+        for _ in range(3):
+            assert self.detector.detect(np.zeros((1, 8, 8, 3), np.uint8)) == [
+                ("person", np.float32(0.9), tuple(np.float32([0.1, 0.1, 0.5, 0.5])))
+            ]
+
+
+class TestDetectionResultCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = opengate.object_detection.DetectionResultCache(
+            DetectionCacheConfig(max_entries=2, max_age=10)
+        )
+        self.inputs = [np.full((1, 8, 8, 3), i, np.uint8) for i in range(3)]
+        self.keys = [self.cache.key(i) for i in self.inputs]
+
+    def test_identical_inputs(self):
+        assert self.cache.get(self.keys[0], 0) is None
+
+        detections = np.ones((20, 6), np.float32)
+        self.cache.set(self.keys[0], 0, detections)
+
+        # the cache keeps its own copy
+        detections[:] = 0
+        assert self.cache.key(self.inputs[0].copy()) == self.keys[0]
+        assert self.cache.get(self.keys[0], 5).all()
+        assert self.cache.get(self.keys[1], 5) is None
+        assert (self.cache.hits, self.cache.misses) == (1, 2)
+
+    def test_max_age(self):
+        self.cache.set(self.keys[0], 0, np.ones((20, 6), np.float32))
+        assert self.cache.get(self.keys[0], 10) is not None
+        assert self.cache.get(self.keys[0], 10.1) is None
+
+    def test_least_recently_used(self):
+        for key in self.keys[:2]:
+            self.cache.set(key, 0, np.ones((20, 6), np.float32))
+
+        self.cache.get(self.keys[0], 0)
+        self.cache.set(self.keys[2], 0, np.ones((20, 6), np.float32))
+
+        assert self.cache.get(self.keys[1], 0) is None
+        assert self.cache.get(self.keys[0], 0) is not None
+        assert self.cache.get(self.keys[2], 0) is not None
@@ -0,0 +1,160 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from pydantic import parse_obj_as
+
+from opengate.detectors import DetectorConfig
+from opengate.detectors.plugins.onnx import ONNX_SUPPORT, ONNXDetector
+from opengate.detectors.postprocess import pack_detections
+
+try:
+    from onnx import TensorProto, helper, save
+
+    ONNX_BUILD_SUPPORT = True
+except ModuleNotFoundError:
+    ONNX_BUILD_SUPPORT = False
+
+
+def create_model(path: str, batch, input_type) -> None:
+    """Save an ssd model that outputs each 2x2 input as 3 boxes.
+
+    The class id of a box is its smallest value and the score its largest.
+    """
+    nodes = []
+    model_input = "input"
+
+    if input_type != TensorProto.FLOAT:
+        nodes.append(
+            helper.make_node("Cast", ["input"], ["cast"], to=TensorProto.FLOAT)
+        )
+        model_input = "cast"
+
+    nodes += [
+        helper.make_node("Reshape", [model_input, "box_shape"], ["boxes"]),
+        helper.make_node("ReduceMin", ["boxes", "box_axis"], ["class_ids"], keepdims=0),
+        helper.make_node("ReduceMax", ["boxes", "box_axis"], ["scores"], keepdims=0),
+        helper.make_node("Mul", ["scores", "zero"], ["zeros"]),
+        helper.make_node("Add", ["zeros", "one"], ["ones"]),
+        helper.make_node("ReduceSum", ["ones", "count_axis"], ["count"], keepdims=0),
+    ]
+    graph = helper.make_graph(
+        nodes,
+        "test",
+        [helper.make_tensor_value_info("input", input_type, [batch, 2, 2, 3])],
+        [
+            helper.make_tensor_value_info("boxes", TensorProto.FLOAT, [batch, 3, 4]),
+            helper.make_tensor_value_info("class_ids", TensorProto.FLOAT, [batch, 3]),
+            helper.make_tensor_value_info("scores", TensorProto.FLOAT, [batch, 3]),
+            helper.make_tensor_value_info("count", TensorProto.FLOAT, [batch]),
+        ],
+        [
+            helper.make_tensor("box_shape", TensorProto.INT64, [3], [-1, 3, 4]),
+            helper.make_tensor("box_axis", TensorProto.INT64, [1], [2]),
+            helper.make_tensor("count_axis", TensorProto.INT64, [1], [1]),
+            helper.make_tensor("zero", TensorProto.FLOAT, [], [0]),
+            helper.make_tensor("one", TensorProto.FLOAT, [], [1]),
+        ],
+    )
+    save(
+        helper.make_model(
+            graph, opset_imports=[helper.make_opsetid("", 18)], ir_version=8
+        ),
+        path,
+    )
+
+
+@unittest.skipUnless(
+    ONNX_SUPPORT and ONNX_BUILD_SUPPORT, "onnx and onnxruntime are not installed"
+)
+class TestONNXDetector(unittest.TestCase):
+    def setUp(self):
+        self.model_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.model_dir.cleanup)
+        self.inputs = np.random.default_rng(0).integers(0, 255, (4, 2, 2, 3), np.uint8)
+
+    def create(self, batch, input_type=None, **config):
+        path = os.path.join(self.model_dir.name, "model.onnx")
+        create_model(path, batch, input_type or TensorProto.FLOAT)
+        detector_config = parse_obj_as(
+            DetectorConfig,
+            {
+                "type": "onnx",
+                "model": {"path": path, "width": 2, "height": 2},
+                **config,
+            },
+        )
+        return ONNXDetector(detector_config)
+
+    def reference(self, tensor_input, scale):
+        """Decode the inputs the way the model and the ssd post processing do."""
+        boxes = tensor_input.reshape(-1, 3, 4).astype(np.float32) * np.float32(scale)
+        return [
+            pack_detections(b.min(axis=1), b.max(axis=1), b, 20, threshold=0.4)
+            for b in boxes
+        ]
+
+    def assert_detections(self, results, tensor_input, scale=1 / 255):
+        expected = self.reference(tensor_input, scale)
+        assert len(results) == len(expected)
+
+        for result, detections in zip(results, expected):
+            np.testing.assert_allclose(result, detections, rtol=1e-6)
+
+    def test_dynamic_batch(self):
+        detector = self.create("batch", batch_size=4)
+        assert detector.dynamic_batch
+        assert detector.supports_batch
+        assert detector.batch_size == 4
+
+        self.assert_detections(detector.detect_raw_batch(self.inputs), self.inputs)
+        self.assert_detections(
+            detector.detect_raw_batch(self.inputs[1:3]), self.inputs[1:3]
+        )
+        self.assert_detections(
+            [detector.detect_raw(self.inputs[3:4])], self.inputs[3:4]
+        )
+
+        # the io binding of each batch size is reused
+        assert sorted(detector.bindings) == [1, 2, 4]
+
+    def test_fixed_batch(self):
+        with self.assertLogs("opengate.detectors.plugins.onnx", "WARNING"):
+            detector = self.create(2, batch_size=4)
+
+        # requests are batched by the model batch, not the configured one
+        assert not detector.dynamic_batch
+        assert detector.batch_size == 2
+
+        self.assert_detections(
+            detector.detect_raw_batch(self.inputs[:2]), self.inputs[:2]
+        )
+
+        # a single input is padded to the model batch
+        self.assert_detections(
+            [detector.detect_raw(self.inputs[2:3])], self.inputs[2:3]
+        )
+        assert list(detector.bindings) == [2]
+
+    def test_single_input_model(self):
+        detector = self.create(1, batch_size=1)
+        assert not detector.supports_batch
+        self.assert_detections([detector.detect_raw(self.inputs[:1])], self.inputs[:1])
+
+    def test_input_scale(self):
+        detector = self.create("batch", batch_size=4, input_scale=0.002)
+        self.assert_detections(
+            detector.detect_raw_batch(self.inputs), self.inputs, scale=0.002
+        )
+
+    def test_uint8_input_is_not_scaled(self):
+        detector = self.create("batch", input_type=TensorProto.UINT8, batch_size=4)
+        assert detector.input_dtype == np.uint8
+        self.assert_detections(
+            detector.detect_raw_batch(self.inputs), self.inputs, scale=1
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
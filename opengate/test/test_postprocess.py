@@ -0,0 +1,139 @@
+import unittest
+
+import numpy as np
+
+from opengate.detectors.detector_config import ModelConfig, ModelTypeEnum
+from opengate.detectors.postprocess import PostProcessor, nms, pack_detections
+
+
+def yolo_rows(rng, count, classes):
+    """Random x, y, w, h pixel boxes for a 320x320 model."""
+    centers = rng.uniform(40, 280, (count, 2))
+    sizes = rng.uniform(10, 80, (count, 2))
+    return np.concatenate([centers, sizes], axis=1), rng.uniform(0, 1, (count, classes))
+
+
+class TestPackDetections(unittest.TestCase):
+    def test_best_detections_first(self):
+        scores = np.array([0.3, 0.9, 0.5, 0.7, 0.6])
+        boxes = np.arange(20).reshape(5, 4) / 20
+
+        detections = pack_detections(np.arange(5), scores, boxes, 3, threshold=0.4)
+        assert detections.shape == (3, 6)
+        assert detections[:, 0].tolist() == [1, 3, 4]
+        assert np.allclose(detections[0, 2:], boxes[1])
+
+        # padded with empty detections
+        detections = pack_detections(np.arange(5), scores, boxes, 8, threshold=0.55)
+        assert detections[:, 0].tolist() == [1, 3, 4, 0, 0, 0, 0, 0]
+        assert not detections[3:].any()
+
+        assert not pack_detections([], [], [], 4).any()
+
+
+class TestNms(unittest.TestCase):
+    def test_class_wise(self):
+        boxes = np.array(
+            [
+                [0.1, 0.1, 0.5, 0.5],
+                [0.12, 0.1, 0.52, 0.5],  # overlaps the first
+                [0.1, 0.1, 0.5, 0.5],  # same box, other class
+                [0.6, 0.6, 0.9, 0.9],
+            ]
+        )
+        scores = np.array([0.8, 0.9, 0.7, 0.6])
+        class_ids = np.array([0, 0, 1, 0])
+
+        assert nms(boxes, scores, class_ids).tolist() == [1, 2, 3]
+        assert nms(boxes, scores, class_ids, limit=2).tolist() == [1, 2]
+        assert nms(boxes, scores, class_ids, iou_threshold=0.95).tolist() == [
+            1,
+            0,
+            2,
+            3,
+        ]
+        assert nms([], [], []).tolist() == []
+
+
+class TestPostProcessor(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def processor(self, model_type, **kwargs):
+        return PostProcessor(
+            ModelConfig(model_type=model_type, max_detections=10), **kwargs
+        )
+
+    def test_ssd(self):
+        class_ids = np.array([3, 1, 2])
+        scores = np.array([0.9, 0.6, 0.3])
+        boxes = np.array([[0.1, 0.2, 0.3, 0.4]] * 3)
+
+        detections = self.processor(ModelTypeEnum.ssd)((class_ids, scores, boxes))
+        assert detections.shape == (10, 6)
+        assert detections[:2, 0].tolist() == [3, 1]
+        assert not detections[2:].any()
+
+    def test_yolov5(self):
+        positions, class_scores = yolo_rows(self.rng, 500, 4)
+        objectness = self.rng.uniform(0, 1, (500, 1))
+        output = np.concatenate([positions, objectness, class_scores], axis=1)
+
+        detections = self.processor(ModelTypeEnum.yolov5)(output)
+
+        # every detection is a confident, non overlapping row of the output
+        count = int((detections[:, 1] > 0).sum())
+        assert count == 10
+        assert (detections[:count, 1] >= 0.5).all()
+        assert (np.diff(detections[:count, 1]) <= 0).all()
+
+        best = output[np.argmax(output[:, 4])]
+        assert detections[0, 0] == np.argmax(best[5:])
+        assert np.allclose(
+            detections[0, 2:],
+            [
+                (best[1] - best[3] / 2) / 320,
+                (best[0] - best[2] / 2) / 320,
+                (best[1] + best[3] / 2) / 320,
+                (best[0] + best[2] / 2) / 320,
+            ],
+        )
+
+        # suppressing again keeps every detection
+        assert (
+            len(
+                nms(
+                    detections[:count, 2:], detections[:count, 1], detections[:count, 0]
+                )
+            )
+            == count
+        )
+
+    def test_yolov8(self):
+        positions, class_scores = yolo_rows(self.rng, 300, 3)
+        # only a few confident boxes, far apart
+        class_scores *= 0.4
+        class_scores[:3] = np.eye(3) * 0.9
+        positions[:3, :2] = [[50, 50], [150, 150], [250, 250]]
+        output = np.concatenate([positions, class_scores], axis=1).T
+
+        detections = self.processor(ModelTypeEnum.yolov8)(output)
+        assert sorted(detections[:3, 0].tolist()) == [0, 1, 2]
+        assert not detections[3:].any()
+
+    def test_yolox(self):
+        processor = self.processor(ModelTypeEnum.yolox)
+        rows = len(processor.grids)
+        assert rows == 40 * 40 + 20 * 20 + 10 * 10
+
+        output = np.zeros((rows, 5 + 2), np.float32)
+        # one object in the cell at x=3, y=2 of the stride 8 grid
+        index = 2 * 40 + 3
+        output[index] = [0.5, 0.5, np.log(4), np.log(2), 0.9, 0.1, 0.8]
+
+        detections = processor(output)
+        assert detections[0, 0] == 1
+        assert np.isclose(detections[0, 1], 0.8)
+        # center at (28, 20), 32 wide and 16 high
+        assert np.allclose(detections[0, 2:], np.array([12, 12, 28, 44]) / 320)
+        assert not detections[1:].any()
@@ -1,17 +1,58 @@
+import fcntl
+import multiprocessing as mp
+import os
+import queue
+import threading
 import unittest
+from unittest.mock import Mock
 
 import cv2
 import numpy as np
 from norfair.drawing.color import Palette
 from norfair.drawing.drawer import Drawer
 
-from opengate.util.image import intersection, transliterate_to_latin
+from opengate.config import (
+    DetectConfig,
+    IdleConfig,
+    ModelConfig,
+    MosaicConfig,
+    RegionCacheConfig,
+    RuntimeFilterConfig,
+)
+from opengate.object_detection import ObjectDetector
+from opengate.util.image import (
+    FrameStageEnum,
+    SharedMemoryFrameManager,
+    SharedMemoryFrameRing,
+    calculate_region,
+    intersection,
+    transliterate_to_latin,
+)
 from opengate.util.object import (
+    create_mosaic_input,
+    create_region_grid,
     get_cluster_boundary,
     get_cluster_candidates,
     get_cluster_region,
     get_region_from_grid,
+    get_startup_regions,
+    is_object_filtered,
+    objects_filtered,
     reduce_detections,
+    update_region_grid,
+    upgrade_region_grid,
+)
+from opengate.video import (
+    CaptureMultiplexer,
+    IdleScheduler,
+    RegionResultCache,
+    capture_frames,
+    detect_mosaic,
+    detect_regions,
+    process_frames,
+    queue_frame,
+    read_frame,
+    set_pipe_size,
 )
 
 
@@ -297,6 +338,48 @@ class TestObjectBoundingBoxes(unittest.TestCase):
         assert len(consolidated_detections) == len(detections)
 
 
+class TestObjectFilters(unittest.TestCase):
+    def test_matches_single_object_filter(self):
+        rng = np.random.default_rng(0)
+        labels = rng.choice(["person", "car", "dog", "cat"], 200).tolist()
+        scores = rng.uniform(0.3, 1, 200)
+        boxes = np.sort(rng.integers(0, 720, (200, 2, 2)), axis=1).reshape(-1, 4)
+        width = boxes[:, 2] - boxes[:, 0]
+        height = boxes[:, 3] - boxes[:, 1]
+        areas = width * height
+        ratios = width / np.maximum(1, height)
+
+        object_filters = {
+            "person": RuntimeFilterConfig(
+                min_area=500,
+                max_ratio=2,
+                mask="0,0,360,0,360,720,0,720",
+                frame_shape=(720, 720),
+            ),
+            "car": RuntimeFilterConfig(min_score=0.7, min_ratio=0.5),
+        }
+
+        expected = [
+            is_object_filtered(
+                (labels[i], scores[i], tuple(boxes[i]), areas[i], ratios[i]),
+                ["person", "car", "cat"],
+                object_filters,
+            )
+            for i in range(200)
+        ]
+        filtered = objects_filtered(
+            labels,
+            scores,
+            boxes,
+            areas,
+            ratios,
+            ["person", "car", "cat"],
+            object_filters,
+        )
+        assert filtered.tolist() == expected
+        assert 0 < sum(expected) < 200
+
+
 class TestRegionGrid(unittest.TestCase):
     def setUp(self) -> None:
         pass
@@ -309,7 +392,7 @@ class TestRegionGrid(unittest.TestCase):
             [],
             [],
             [],
-            [{}, {}, {}, {}, {}, {"sizes": [0.25], "mean": 0.26, "std_dev": 0.01}],
+            [{}, {}, {}, {}, {}, {"count": 1, "mean": 0.26, "std_dev": 0.01}],
         ]
 
         region = get_region_from_grid(frame_shape, box, 320, region_grid)
@@ -323,8 +406,451 @@ class TestRegionGrid(unittest.TestCase):
             [],
             [],
             [],
-            [{}, {}, {}, {}, {}, {"sizes": [0.5], "mean": 0.5, "std_dev": 0.1}],
+            [{}, {}, {}, {}, {}, {"count": 1, "mean": 0.5, "std_dev": 0.1}],
         ]
 
         region = get_region_from_grid(frame_shape, box, 320, region_grid)
         assert region[2] - region[0] > 320
+
+    def test_running_statistics(self):
+        """Test that the grid statistics match the full list of sizes."""
+        detect = DetectConfig(width=1280, height=720)
+        rng = np.random.default_rng(0)
+        # boxes of different sizes centered in the same cell
+        boxes = [
+            [0.3 - w / 2, 0.3 - w * 8 / 9, w, w * 16 / 9]
+            for w in rng.uniform(0.05, 0.15, size=50)
+        ]
+
+        grid = create_region_grid()
+        update_region_grid(grid, detect, 160, boxes)
+        cell = grid[2][2]
+        assert cell["count"] == 50
+
+        # the same statistics as the old grid that kept every size
+        sizes = []
+        for box in boxes:
+            region = calculate_region(
+                (720, 1280),
+                box[0] * 1280,
+                box[1] * 720,
+                (box[0] + box[2]) * 1280,
+                (box[1] + box[3]) * 720,
+                160,
+                1.35,
+            )
+            sizes.append((region[2] - region[0]) / 1280)
+
+        assert np.isclose(cell["mean"], np.mean(sizes))
+        assert cell["std_dev"] > 0
+        assert np.isclose(cell["std_dev"], np.std(sizes))
+
+        old_grid = create_region_grid()
+        old_grid[2][2] = {"x": 2, "y": 2, "sizes": sizes}
+        assert upgrade_region_grid(old_grid)
+        assert not upgrade_region_grid(old_grid)
+        assert old_grid[2][2].keys() == cell.keys()
+        assert all(np.isclose(old_grid[2][2][k], cell[k]) for k in cell)
+
+        regions = get_startup_regions((720, 1280), 320, grid)
+        assert len(regions) == 1
+
+
+class TestReadFrame(unittest.TestCase):
+    def setUp(self):
+        read_fd, self.write_fd = os.pipe()
+        self.pipe = os.fdopen(read_fd, "rb", buffering=0)
+
+    def tearDown(self):
+        self.pipe.close()
+
+    def write_chunks(self, chunks):
+        def write():
+            for chunk in chunks:
+                os.write(self.write_fd, chunk)
+            os.close(self.write_fd)
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        return writer
+
+    def test_short_reads_fill_buffer(self):
+        buffer = memoryview(bytearray(8))
+        writer = self.write_chunks([b"\x01\x02\x03", b"\x04\x05", b"\x06\x07\x08"])
+        read_frame(self.pipe, buffer)
+        writer.join()
+        assert bytes(buffer) == bytes(range(1, 9))
+
+    def test_set_pipe_size(self):
+        os.close(self.write_fd)
+        set_pipe_size(self.pipe, 256 * 1024)
+
+        # F_GETPIPE_SZ, only exported by fcntl since python 3.10
+        assert fcntl.fcntl(self.pipe.fileno(), 1032) == 256 * 1024
+
+    def test_incomplete_frame_raises(self):
+        buffer = memoryview(bytearray(8))
+        writer = self.write_chunks([b"\x01\x02\x03"])
+
+        with self.assertRaises(EOFError):
+            read_frame(self.pipe, buffer)
+
+        writer.join()
+
+
+class TestCaptureFrames(unittest.TestCase):
+    class FfmpegProcess:
+        def __init__(self, stdout):
+            self.stdout = stdout
+
+        def poll(self):
+            return 0
+
+    def setUp(self):
+        self.ring = SharedMemoryFrameRing("test_capture", 6, 6, create=True)
+        self.frame_manager = SharedMemoryFrameManager()
+        read_fd, write_fd = os.pipe()
+        self.pipe = os.fdopen(read_fd, "rb", buffering=0)
+
+        for i in range(4):
+            os.write(write_fd, bytes([i] * 6))
+        os.close(write_fd)
+
+    def tearDown(self):
+        self.pipe.close()
+        self.frame_manager.get_ring("test_capture").close()
+        self.ring.close()
+        self.ring.unlink()
+
+    def capture(self, latest_frame_wins):
+        frame_queue = queue.Queue(maxsize=2)
+        skipped_fps = mp.Value("d", 0.0)
+        self.bytes_copied = mp.Value("Q", 0)
+        capture_frames(
+            self.FfmpegProcess(self.pipe),
+            "test_capture",
+            (3, 2),
+            self.frame_manager,
+            frame_queue,
+            mp.Value("d", 0.0),
+            skipped_fps,
+            self.bytes_copied,
+            mp.Value("d", 0.0),
+            mp.Event(),
+            latest_frame_wins,
+        )
+
+        queued = []
+        while not frame_queue.empty():
+            _, frame_index = frame_queue.get()
+            queued.append(int(self.ring.get(frame_index, (6,))[0]))
+            self.ring.release(frame_index, FrameStageEnum.process)
+
+        # only the queued frames were held, so every slot is free again
+        assert not self.ring.holds.any()
+        return queued
+
+    def test_newest_frames_are_dropped(self):
+        assert self.capture(False) == [0, 1]
+
+        # dropped frames are not counted as copied
+        assert self.bytes_copied.value == 12
+
+    def test_latest_frame_wins(self):
+        assert self.capture(True) == [2, 3]
+        assert self.bytes_copied.value == 24
+
+
+class TestCaptureMultiplexer(unittest.TestCase):
+    def setUp(self):
+        self.cameras = ["test_mux_a", "test_mux_b"]
+        self.rings = {
+            name: SharedMemoryFrameRing(name, 6, 6, create=True)
+            for name in self.cameras
+        }
+        self.stop_event = mp.Event()
+        self.multiplexer = CaptureMultiplexer(self.stop_event)
+        self.multiplexer.start()
+
+    def tearDown(self):
+        self.stop_event.set()
+        self.multiplexer.join()
+
+        for ring in self.multiplexer.frame_manager.rings.values():
+            ring.close()
+
+        for ring in self.rings.values():
+            ring.close()
+            ring.unlink()
+
+    def test_frames_are_assembled_per_camera(self):
+        captures = {}
+        writes = []
+
+        for i, name in enumerate(self.cameras):
+            read_fd, write_fd = os.pipe()
+            captures[name] = self.multiplexer.add(
+                name,
+                TestCaptureFrames.FfmpegProcess(os.fdopen(read_fd, "rb", buffering=0)),
+                (3, 2),
+                queue.Queue(maxsize=4),
+                mp.Value("d", 0.0),
+                mp.Value("d", 0.0),
+                mp.Value("Q", 0),
+            )
+            # frames arrive in pieces that don't line up with frame boundaries
+            writes.append((write_fd, bytes([i * 10 + f // 6 for f in range(18)])))
+
+        for offset in range(0, 18, 4):
+            for write_fd, data in writes:
+                os.write(write_fd, data[offset : offset + 4])
+
+        for write_fd, _ in writes:
+            os.close(write_fd)
+
+        for i, name in enumerate(self.cameras):
+            capture = captures[name]
+            frame_queue = capture.frame_queue
+            frames = []
+
+            for _ in range(3):
+                _, frame_index = frame_queue.get(True, 5)
+                frames.append(self.rings[name].get(frame_index, (6,)).tolist())
+
+            assert frames == [[i * 10 + f] * 6 for f in range(3)]
+            assert capture.bytes_copied.value == 18
+
+        for capture in captures.values():
+            for _ in range(50):
+                if not capture.is_alive():
+                    break
+                self.stop_event.wait(0.1)
+
+            assert not capture.is_alive()
+            capture.ffmpeg_process.stdout.close()
+
+
+class TestIdleScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = IdleScheduler(IdleConfig(enabled=True, fps=1, timeout=10))
+
+    def process(self, frame_time, active=False):
+        if not self.scheduler.should_process(frame_time):
+            return False
+
+        self.scheduler.update(frame_time, active)
+        return True
+
+    def test_idle_rate_after_timeout(self):
+        processed = [self.process(i / 5) for i in range(0, 75)]
+        # full rate until idle for 10 seconds, then one frame a second
+        assert all(processed[:51])
+        assert self.scheduler.idle
+        assert sum(processed[51:]) == 4
+
+    def test_motion_resumes_full_rate(self):
+        for i in range(0, 60):
+            self.process(i / 5)
+
+        assert self.scheduler.idle
+        assert self.process(13.0, active=True)
+        assert not self.scheduler.idle
+        assert self.process(13.2)
+
+    def test_disabled(self):
+        self.scheduler = IdleScheduler(IdleConfig(timeout=0))
+        assert all(self.process(i / 5) for i in range(0, 100))
+
+    def test_idle_frames_are_forwarded(self):
+        ring = SharedMemoryFrameRing("test_idle", 24, 20, create=True)
+        self.addCleanup(ring.unlink)
+        self.addCleanup(ring.close)
+        frame_manager = SharedMemoryFrameManager()
+        self.addCleanup(frame_manager.get_ring("test_idle").close)
+
+        frame_queue = queue.Queue()
+        for i in range(20):
+            frame_index = ring.acquire(i / 5)
+            queue_frame(ring, frame_queue, i / 5, frame_index, False)
+            ring.release(frame_index, FrameStageEnum.capture)
+
+        motion_detector = Mock(**{"detect.return_value": []})
+        object_tracker = Mock(tracked_objects={}, untracked_object_boxes=[])
+        object_detector = Mock(**{"fps.eps.return_value": 0.0})
+        detected_objects_queue = queue.Queue()
+        process_info = {
+            key: mp.Value("d", 0.0)
+            for key in [
+                "process_fps",
+                "detection_fps",
+                "idle",
+                "region_cache_hits",
+                "region_cache_misses",
+                "region_cache_forced_refreshes",
+                "detection_frame",
+            ]
+        }
+
+        process_frames(
+            "test_idle",
+            queue.Queue(),
+            frame_queue,
+            queue.Queue(),
+            (4, 4),
+            ModelConfig(),
+            DetectConfig(idle=IdleConfig(enabled=True, fps=1, timeout=1)),
+            frame_manager,
+            motion_detector,
+            object_detector,
+            object_tracker,
+            detected_objects_queue,
+            process_info,
+            [],
+            {},
+            mp.Value("i", 0),
+            mp.Value("i", 1),
+            mp.Event(),
+            {"ptz_frame_time": mp.Value("d", 0.0)},
+            [],
+            exit_on_empty=True,
+        )
+
+        # idle after 1 second, then motion is only checked once a second
+        assert process_info["idle"].value
+        assert motion_detector.detect.call_count == 8
+
+        # every frame is still passed on, idle frames without motion
+        forwarded = [detected_objects_queue.get_nowait() for _ in range(20)]
+        assert [f[1] for f in forwarded] == [i / 5 for i in range(20)]
+        assert all(f[4] == [] for f in forwarded)
+        assert object_tracker.update_frame_times.call_count == 12
+
+
+class TestDetectMosaic(unittest.TestCase):
+    def setUp(self):
+        self.detect_config = DetectConfig(
+            width=1280, height=720, mosaic=MosaicConfig(enabled=True)
+        )
+        self.model_config = ModelConfig(width=320, height=320)
+        self.frame = np.zeros((1080, 1280), np.uint8)
+        self.regions = [(0, 0, 320, 320), (640, 320, 960, 640), (960, 0, 1280, 320)]
+
+        # make each region a different brightness
+        for i, region in enumerate(self.regions):
+            self.frame[region[1] : region[3], region[0] : region[2]] = 60 * (i + 1)
+
+        self.frame[720:] = 128
+
+    def test_regions_are_tiled(self):
+        mosaic = create_mosaic_input(self.frame, self.model_config, self.regions, 2)
+        assert mosaic.shape == (1, 320, 320, 3)
+
+        # tiles are filled row by row
+        tiles = [mosaic[0, :160, :160], mosaic[0, :160, 160:], mosaic[0, 160:, :160]]
+        brightness = [int(np.median(t[..., 0])) for t in tiles]
+        assert brightness[0] < brightness[1] < brightness[2]
+        assert not mosaic[0, 160:, 160:].any()
+
+    def test_detections_are_mapped_to_regions(self):
+        class MosaicDetector:
+            def detect(self, tensor_input):
+                return [
+                    # inside the first tile
+                    ("person", 0.9, (0.1, 0.1, 0.4, 0.3)),
+                    # inside the second tile, top right
+                    ("person", 0.8, (0.05, 0.6, 0.45, 0.9)),
+                    # crosses the seam between the first and second tile
+                    ("person", 0.7, (0.1, 0.3, 0.4, 0.7)),
+                    # in the empty fourth tile
+                    ("person", 0.6, (0.6, 0.6, 0.9, 0.9)),
+                ]
+
+        detections = detect_mosaic(
+            self.detect_config,
+            MosaicDetector(),
+            self.frame,
+            self.model_config,
+            self.regions,
+            ["person"],
+            {},
+        )
+
+        assert [d[1] for d in detections] == [0.9, 0.8]
+        assert detections[0][2] == (64, 64, 192, 256)
+        assert detections[0][5] == self.regions[0]
+        assert detections[1][2] == (704, 352, 896, 608)
+        assert detections[1][5] == self.regions[1]
+
+    def test_region_groups(self):
+        class RecordingDetector(ObjectDetector):
+            def __init__(self):
+                self.shapes = []
+
+            def detect(self, tensor_input, threshold=0.4):
+                self.shapes.append(tensor_input.shape)
+                return [("person", 0.9, (0.1, 0.1, 0.4, 0.3))]
+
+        detector = RecordingDetector()
+        detections = detect_regions(
+            self.detect_config,
+            detector,
+            self.frame,
+            self.model_config,
+            [self.regions[:2], [self.regions[2]]],
+            ["person"],
+            {},
+        )
+
+        assert detector.shapes == [(1, 320, 320, 3)] * 2
+        assert [d[5] for d in detections] == [self.regions[0], self.regions[2]]
+
+
+class TestRegionResultCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = RegionResultCache(
+            RegionCacheConfig(enabled=True, threshold=2, max_age=5)
+        )
+        self.frame = np.full((1080, 1280), 100, np.uint8)
+        self.region = (320, 0, 640, 320)
+        self.detections = [("car", 0.9, (400, 100, 500, 200), 10000, 1, self.region)]
+
+    def lookup(self, frame_time):
+        fingerprint = self.cache.fingerprint(self.frame, self.region)
+        return self.cache.get(frame_time, self.region, fingerprint), fingerprint
+
+    def process(self, frame_time):
+        """Look up and refresh the region in the order of process_frames."""
+        cached, fingerprint = self.lookup(frame_time)
+        if cached is None:
+            self.cache.set(frame_time, self.region, fingerprint, self.detections)
+        self.cache.expire(frame_time)
+        return cached
+
+    def test_unchanged_region_is_reused(self):
+        cached, fingerprint = self.lookup(1.0)
+        assert cached is None
+        self.cache.set(1.0, self.region, fingerprint, self.detections)
+
+        # noise and changes outside of the region are ignored
+        self.frame[0:320, 320:640:7] += 3
+        self.frame[400:, :] = 0
+        assert self.lookup(2.0)[0] == self.detections
+
+        # a new object in the region is detected
+        self.frame[100:200, 400:500] = 250
+        assert self.lookup(3.0)[0] is None
+        assert (self.cache.hits, self.cache.misses) == (1, 2)
+
+    def test_max_age(self):
+        assert self.process(1.0) is None
+        assert self.process(6.0) == self.detections
+        assert self.process(6.5) is None
+        assert self.cache.forced_refreshes == 1
+
+        # the refreshed detections are reused
+        assert self.process(7.0) == self.detections
+        assert (self.cache.hits, self.cache.misses) == (2, 1)
+
+        # regions that are no longer detected are dropped
+        self.cache.expire(12.0)
+        assert not self.cache.entries
@@ -1,5 +1,6 @@
 """Record events for object, audio, etc. detections."""
 
+import datetime
 import logging
 import queue
 import threading
@@ -10,6 +11,11 @@ from opengate.config import OpenGateConfig
 from opengate.events.maintainer import EventTypeEnum
 from opengate.models import Timeline
 from opengate.util.builtin import to_relative_box
+from opengate.util.object import (
+    get_camera_regions_grid,
+    save_region_grid,
+    update_region_grid,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +34,9 @@ class TimelineProcessor(threading.Thread):
         self.config = config
         self.queue = queue
         self.stop_event = stop_event
+        self.region_grids: dict[str, list[list[dict[str, any]]]] = {}
+        # boxes of the timeline entries of each ongoing event
+        self.event_boxes: dict[str, list[list[float]]] = {}
 
     def run(self) -> None:
         while not self.stop_event.is_set():
@@ -79,7 +88,7 @@ class TimelineProcessor(threading.Thread):
         }
         if event_type == "start":
             timeline_entry[Timeline.class_type] = "visible"
-            Timeline.insert(timeline_entry).execute()
+            self.insert_entry(timeline_entry)
         elif event_type == "update":
             # zones have been updated
             if (
@@ -89,24 +98,52 @@ class TimelineProcessor(threading.Thread):
             ):
                 timeline_entry[Timeline.class_type] = "entered_zone"
                 timeline_entry[Timeline.data]["zones"] = event_data["current_zones"]
-                Timeline.insert(timeline_entry).execute()
+                self.insert_entry(timeline_entry)
             elif prev_event_data["stationary"] != event_data["stationary"]:
                 timeline_entry[Timeline.class_type] = (
                     "stationary" if event_data["stationary"] else "active"
                 )
-                Timeline.insert(timeline_entry).execute()
+                self.insert_entry(timeline_entry)
             elif prev_event_data["attributes"] == {} and event_data["attributes"] != {}:
                 timeline_entry[Timeline.class_type] = "attribute"
                 timeline_entry[Timeline.data]["attribute"] = list(
                     event_data["attributes"].keys()
                 )[0]
-                Timeline.insert(timeline_entry).execute()
+                self.insert_entry(timeline_entry)
         elif event_type == "end":
             if event_data["has_clip"] or event_data["has_snapshot"]:
                 timeline_entry[Timeline.class_type] = "gone"
-                Timeline.insert(timeline_entry).execute()
+                self.insert_entry(timeline_entry)
+                self.update_region_grid(camera, event_data)
             else:
+                self.event_boxes.pop(event_data["id"], None)
+
                 # if event was not saved then the timeline entries should be deleted
                 Timeline.delete().where(
                     Timeline.source_id == event_data["id"]
                 ).execute()
+
+    def insert_entry(self, timeline_entry: dict[any, any]) -> None:
+        Timeline.insert(timeline_entry).execute()
+        self.event_boxes.setdefault(timeline_entry[Timeline.source_id], []).append(
+            timeline_entry[Timeline.data]["box"]
+        )
+
+    def update_region_grid(self, camera: str, event_data: dict[any, any]) -> None:
+        """Add the regions of a saved event to the camera's region grid."""
+        boxes = self.event_boxes.pop(event_data["id"], [])
+
+        if event_data["false_positive"] or not boxes:
+            return
+
+        detect = self.config.cameras[camera].detect
+        min_region_size = max(self.config.model.width, self.config.model.height)
+
+        if camera not in self.region_grids:
+            self.region_grids[camera] = get_camera_regions_grid(
+                camera, detect, min_region_size
+            )
+
+        grid = self.region_grids[camera]
+        update_region_grid(grid, detect, min_region_size, boxes)
+        save_region_grid(camera, grid, datetime.datetime.now().timestamp())
@@ -5,9 +5,11 @@ from multiprocessing.synchronize import Event
 from typing import Optional, TypedDict
 
 from opengate.object_detection import ObjectDetectProcess
+from opengate.util.image import SharedMemoryFrameRing
 
 
 class CameraMetricsTypes(TypedDict):
+    bytes_copied: Synchronized
     camera_fps: Synchronized
     capture_process: Optional[Process]
     detection_enabled: Synchronized
@@ -15,6 +17,7 @@ class CameraMetricsTypes(TypedDict):
     detection_frame: Synchronized
     ffmpeg_pid: Synchronized
     frame_queue: Queue
+    idle: Synchronized
     motion_enabled: Synchronized
     improve_contrast_enabled: Synchronized
     motion_threshold: Synchronized
@@ -22,6 +25,9 @@ class CameraMetricsTypes(TypedDict):
     process: Optional[Process]
     process_fps: Synchronized
     read_start: Synchronized
+    region_cache_hits: Synchronized
+    region_cache_misses: Synchronized
+    region_cache_forced_refreshes: Synchronized
     skipped_fps: Synchronized
     audio_rms: Synchronized
     audio_dBFS: Synchronized
@@ -50,6 +56,7 @@ class FeatureMetricsTypes(TypedDict):
 class StatsTrackingTypes(TypedDict):
     camera_metrics: dict[str, CameraMetricsTypes]
     detectors: dict[str, ObjectDetectProcess]
+    frame_rings: dict[str, SharedMemoryFrameRing]
     started: int
     latest_opengate_version: str
     last_updated: int
@@ -0,0 +1,48 @@
+"""Box geometry on (N, 4) arrays of x_min, y_min, x_max, y_max boxes.
+
+These follow the same conventions as the single box helpers in
+opengate.util.object: edges are inclusive, so boxes that touch overlap.
+"""
+
+import numpy as np
+
+
+def as_boxes(boxes) -> np.ndarray:
+    """Get boxes as an (N, 4) array, accepting a list of box tuples."""
+    boxes = np.asarray(boxes)
+
+    if boxes.size == 0:
+        return np.empty((0, 4), dtype=boxes.dtype)
+
+    return boxes.reshape(-1, 4)
+
+
+def overlap_matrix(boxes_a, boxes_b) -> np.ndarray:
+    """Get a bool matrix where [i, j] is True when boxes_a[i] overlaps boxes_b[j]."""
+    a = as_boxes(boxes_a)[:, np.newaxis, :]
+    b = as_boxes(boxes_b)[np.newaxis, :, :]
+    return (
+        (a[..., 2] >= b[..., 0])
+        & (a[..., 0] <= b[..., 2])
+        & (a[..., 1] <= b[..., 3])
+        & (a[..., 3] >= b[..., 1])
+    )
+
+
+def inside_matrix(outer, inner) -> np.ndarray:
+    """Get a bool matrix where [i, j] is True when inner[j] is inside outer[i]."""
+    a = as_boxes(outer)[:, np.newaxis, :]
+    b = as_boxes(inner)[np.newaxis, :, :]
+    return np.all(b[..., :2] >= a[..., :2], axis=2) & np.all(
+        b[..., 2:] <= a[..., 2:], axis=2
+    )
+
+
+def intersects_any(boxes, others) -> np.ndarray:
+    """Get a bool mask of the boxes that overlap at least one of the others."""
+    return overlap_matrix(boxes, others).any(axis=1)
+
+
+def inside_any(boxes, others) -> np.ndarray:
+    """Get a bool mask of the boxes that are inside at least one of the others."""
+    return inside_matrix(others, boxes).any(axis=0)
@@ -2,7 +2,9 @@
 
 import datetime
 import logging
+import os
 from abc import ABC, abstractmethod
+from enum import IntEnum
 from multiprocessing import shared_memory
 from string import printable
 from typing import AnyStr, Optional
@@ -11,6 +13,8 @@ import cv2
 import numpy as np
 from unidecode import unidecode
 
+from opengate.const import FRAME_LATENCY_SAMPLES, FRAME_LEAK_TIMEOUT
+
 logger = logging.getLogger(__name__)
 
 
@@ -636,16 +640,282 @@ class DictFrameManager(FrameManager):
         del self.frames[name]
 
 
+class FrameStageEnum(IntEnum):
+    """Pipeline stages that can hold a reference to a frame in a frame ring."""
+
+    capture = 0
+    process = 1
+    tracked = 2
+    output = 3
+
+
+class FrameLatencyEnum(IntEnum):
+    """Points in the pipeline where the age of a frame is recorded."""
+
+    motion = 0
+    detect = 1
+    track = 2
+    processed = 3
+    output = 4
+
+
+class SharedMemoryFrameRing:
+    """A fixed number of frame slots preallocated in a single shared memory segment.
+
+    Frames are addressed by a frame index that only ever increases. The slot of a
+    frame is frame_index % slots and the index is stored as the generation of the
+    slot, so a reader holding an index for a slot that has since been reused can
+    tell the frame is gone.
+
+    Each slot keeps one hold per FrameStageEnum and is only reused once no
+    stage holds it. A stage only ever clears its own hold, and a frame is handed
+    to the next stage by holding it for that stage before it is queued, so no
+    locking is needed across processes.
+
+    A hold is the pid of the process registered for the stage, so the frames
+    of a process that exited can be reclaimed while live stages keep theirs
+    for as long as they need.
+
+    The header also keeps the most recent frame ages seen at each
+    FrameLatencyEnum point, each of which is only written by a single process.
+    """
+
+    # slots, frame size, leaked frames, then early frees per stage
+    META_FIELDS = 3 + len(FrameStageEnum)
+    ALIGNMENT = 64
+
+    def __init__(
+        self,
+        name: str,
+        frame_size: int = 0,
+        slots: int = 0,
+        create=False,
+        leak_timeout: int = FRAME_LEAK_TIMEOUT,
+    ):
+        self.name = f"frames-{name}"
+        self.leak_timeout = leak_timeout
+
+        if create:
+            size = self.data_offset(slots) + slots * frame_size
+
+            try:
+                self.shm = shared_memory.SharedMemory(
+                    name=self.name, create=True, size=size
+                )
+            except FileExistsError:
+                # left behind by a previous run, sizes may have changed
+                stale = shared_memory.SharedMemory(name=self.name)
+                stale.close()
+                stale.unlink()
+                self.shm = shared_memory.SharedMemory(
+                    name=self.name, create=True, size=size
+                )
+
+            meta = np.ndarray((2,), dtype=np.int64, buffer=self.shm.buf)
+            meta[:] = (slots, frame_size)
+            del meta
+        else:
+            self.shm = shared_memory.SharedMemory(name=self.name)
+            meta = np.ndarray((2,), dtype=np.int64, buffer=self.shm.buf)
+            slots, frame_size = int(meta[0]), int(meta[1])
+            del meta
+
+        self.slots = slots
+        self.frame_size = frame_size
+        self.offset = self.data_offset(slots)
+
+        offset = 0
+        for field, dtype, shape in self.header_fields(slots):
+            view = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)
+            setattr(self, field, view)
+            offset += view.nbytes
+
+        self.early_frees = self.meta[3:]
+
+        if create:
+            self.meta[2:] = 0
+            self.generations[:] = -1
+            self.frame_times[:] = 0
+            self.holds[:] = 0
+            self.stage_pids[:] = 0
+            self.latency_counts[:] = 0
+            self.latencies[:] = 0
+
+        # resume after the newest generation in case the producer was restarted
+        self.next_index = max(0, int(self.generations.max()))
+
+    @classmethod
+    def header_fields(cls, slots: int) -> list[tuple[str, type, tuple[int, ...]]]:
+        return [
+            ("meta", np.int64, (cls.META_FIELDS,)),
+            ("generations", np.int64, (slots,)),
+            ("frame_times", np.float64, (slots,)),
+            ("holds", np.int64, (slots, len(FrameStageEnum))),
+            ("stage_pids", np.int64, (len(FrameStageEnum),)),
+            ("latency_counts", np.int64, (len(FrameLatencyEnum),)),
+            (
+                "latencies",
+                np.float64,
+                (len(FrameLatencyEnum), FRAME_LATENCY_SAMPLES),
+            ),
+        ]
+
+    @classmethod
+    def data_offset(cls, slots: int) -> int:
+        header_size = sum(
+            np.dtype(dtype).itemsize * int(np.prod(shape))
+            for _, dtype, shape in cls.header_fields(slots)
+        )
+        return -(-header_size // cls.ALIGNMENT) * cls.ALIGNMENT
+
+    @property
+    def leaked(self) -> int:
+        """Frames reclaimed from stages whose process exited."""
+        return int(self.meta[2])
+
+    @property
+    def freed_early(self) -> int:
+        """Frames that were already reused when a stage tried to use them."""
+        return int(self.early_frees.sum())
+
+    def acquire(self, frame_time: float) -> Optional[int]:
+        """Claim the next free slot for capture, None if every slot is held."""
+        for _ in range(self.slots):
+            self.next_index += 1
+            slot = self.next_index % self.slots
+
+            if self.holds[slot].any():
+                # a stage that exited will never release the frame
+                if frame_time - self.frame_times[slot] < self.leak_timeout or not all(
+                    self.owner_exited(pid) for pid in self.holds[slot] if pid
+                ):
+                    continue
+
+                self.holds[slot] = 0
+                self.meta[2] += 1
+
+            self.holds[slot, FrameStageEnum.capture] = os.getpid()
+            self.frame_times[slot] = frame_time
+            self.generations[slot] = self.next_index
+            return self.next_index
+
+        return None
+
+    def buffer(self, frame_index: int) -> memoryview:
+        start = self.offset + (frame_index % self.slots) * self.frame_size
+        return self.shm.buf[start : start + self.frame_size]
+
+    def get(self, frame_index: int, shape) -> Optional[np.ndarray]:
+        slot = frame_index % self.slots
+
+        if self.generations[slot] != frame_index:
+            return None
+
+        return np.ndarray(
+            shape,
+            dtype=np.uint8,
+            buffer=self.shm.buf,
+            offset=self.offset + slot * self.frame_size,
+        )
+
+    def find(self, frame_time: float) -> Optional[int]:
+        """Get the frame index of the slot currently holding frame_time."""
+        slots = np.flatnonzero(self.frame_times == frame_time)
+
+        if len(slots) == 0:
+            return None
+
+        return int(self.generations[slots[0]])
+
+    @staticmethod
+    def owner_exited(pid: int) -> bool:
+        """Check if the process of a hold is gone, -1 is a stage without owner."""
+        if pid < 0:
+            return True
+
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+
+        return False
+
+    def register(self, stage: FrameStageEnum) -> None:
+        """Make the calling process the owner of the frames held for stage."""
+        self.stage_pids[stage] = os.getpid()
+
+    def hold(self, frame_index: int, stage: FrameStageEnum) -> bool:
+        """Take a reference to the frame for stage, False if it was already reused."""
+        slot = frame_index % self.slots
+
+        if self.generations[slot] != frame_index:
+            self.early_frees[stage] += 1
+            return False
+
+        self.holds[slot, stage] = self.stage_pids[stage] or -1
+        return True
+
+    def release(self, frame_index: int, stage: FrameStageEnum) -> None:
+        slot = frame_index % self.slots
+
+        if self.generations[slot] == frame_index:
+            self.holds[slot, stage] = 0
+
+    def record_latency(self, point: FrameLatencyEnum, frame_time: float) -> None:
+        """Record how long ago frame_time was captured when it reached point."""
+        count = self.latency_counts[point]
+        self.latencies[point, count % FRAME_LATENCY_SAMPLES] = (
+            datetime.datetime.now().timestamp() - frame_time
+        )
+        self.latency_counts[point] = count + 1
+
+    def latency_percentiles(
+        self, point: FrameLatencyEnum, percentiles=(50, 95, 99)
+    ) -> Optional[list[float]]:
+        """Get percentiles in seconds of the recent frame ages at point."""
+        count = min(int(self.latency_counts[point]), FRAME_LATENCY_SAMPLES)
+
+        if count == 0:
+            return None
+
+        return np.percentile(self.latencies[point, :count], percentiles).tolist()
+
+    def close(self) -> None:
+        # views into the buffer need to go before the segment can be closed
+        for field, _, _ in self.header_fields(self.slots):
+            delattr(self, field)
+        del self.early_frees
+        self.shm.close()
+
+    def unlink(self) -> None:
+        self.shm.unlink()
+
+
 class SharedMemoryFrameManager(FrameManager):
     def __init__(self):
         self.shm_store = {}
+        self.rings: dict[str, SharedMemoryFrameRing] = {}
 
     def create(self, name, size) -> AnyStr:
         shm = shared_memory.SharedMemory(name=name, create=True, size=size)
         self.shm_store[name] = shm
         return shm.buf
 
-    def get(self, name, shape):
+    def get_ring(self, name) -> SharedMemoryFrameRing:
+        if name not in self.rings:
+            self.rings[name] = SharedMemoryFrameRing(name)
+        return self.rings[name]
+
+    def get(self, name, shape, frame_index: Optional[int] = None):
+        """Get a frame by name, or from the frame ring of camera name by index.
+
+        Returns None if frame_index refers to a slot that has been reused.
+        """
+        if frame_index is not None:
+            return self.get_ring(name).get(frame_index, shape)
+
         if name in self.shm_store:
             shm = self.shm_store[name]
         else:
@@ -653,6 +923,14 @@ class SharedMemoryFrameManager(FrameManager):
             self.shm_store[name] = shm
         return np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
 
+    def hold(self, name, frame_index: int, stage: FrameStageEnum) -> bool:
+        """Hold a frame in the frame ring of camera name for stage."""
+        return self.get_ring(name).hold(frame_index, stage)
+
+    def release(self, name, frame_index: int, stage: FrameStageEnum) -> None:
+        """Release the hold of stage on a frame in the frame ring of camera name."""
+        self.get_ring(name).release(frame_index, stage)
+
     def close(self, name):
         if name in self.shm_store:
             self.shm_store[name].close()
@@ -0,0 +1,135 @@
+"""Shared memory structures for passing requests between processes."""
+
+import os
+import select
+import struct
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+
+class MessagePipe:
+    """A pipe of fixed size messages that wakes up its reader.
+
+    Messages of at most PIPE_BUF bytes are written atomically, so any number
+    of processes can send to one reader. Like a lock, the write and the read
+    of a message order the shared memory writes of the sender before the
+    reads of the receiver, so a message hands over shared memory to the
+    receiver. Only one process should receive from a MessagePipe.
+    """
+
+    def __init__(self, message_format: str):
+        self.message = struct.Struct(message_format)
+        self.read_fd, self.write_fd = os.pipe()
+        os.set_blocking(self.read_fd, False)
+        os.set_blocking(self.write_fd, False)
+
+    def send(self, *values) -> bool:
+        """Send a message, returns False if the pipe is full."""
+        try:
+            os.write(self.write_fd, self.message.pack(*values))
+        except BlockingIOError:
+            return False
+
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a message without receiving it, returns False on timeout."""
+        ready, _, _ = select.select([self.read_fd], [], [], timeout)
+        return bool(ready)
+
+    def receive(self, count: int = 256, timeout: float = 0) -> list[tuple]:
+        """Receive up to count messages, waiting at most timeout for the first."""
+        # reads of whole messages never split the atomic writes
+        size = count * self.message.size
+
+        try:
+            data = os.read(self.read_fd, size)
+        except BlockingIOError:
+            if not timeout or not self.wait(timeout):
+                return []
+
+            try:
+                data = os.read(self.read_fd, size)
+            except BlockingIOError:
+                return []
+
+        return list(self.message.iter_unpack(data))
+
+    def close(self) -> None:
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+
+class DetectionSlots:
+    """Shared memory slots for the in flight detection requests of a camera.
+
+    Each slot holds the request time, model input and detections of one
+    request. A slot is handed to a detector by a request message and back to
+    the camera by a response message.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        slots: int = 0,
+        input_size: int = 0,
+        max_detections: int = 20,
+        create: bool = False,
+    ):
+        if create:
+            self.shm = shared_memory.SharedMemory(
+                name=name,
+                create=True,
+                size=self.size(slots, input_size, max_detections),
+            )
+            header = np.ndarray((3,), dtype=np.uint64, buffer=self.shm.buf)
+            header[:] = (slots, input_size, max_detections)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name, create=False)
+            header = np.ndarray((3,), dtype=np.uint64, buffer=self.shm.buf)
+            slots, input_size, max_detections = (int(v) for v in header)
+
+        self.slots = slots
+        self.input_size = input_size
+        self.max_detections = max_detections
+
+        offset = 24
+        self.request_times = np.ndarray(
+            (slots,), dtype=np.float64, buffer=self.shm.buf, offset=offset
+        )
+        offset += slots * 8
+        self.outputs = np.ndarray(
+            (slots, max_detections, 6),
+            dtype=np.float32,
+            buffer=self.shm.buf,
+            offset=offset,
+        )
+        self.inputs_offset = offset + slots * max_detections * 6 * 4
+
+    @staticmethod
+    def size(slots: int, input_size: int, max_detections: int) -> int:
+        return 24 + slots * (8 + max_detections * 6 * 4 + input_size)
+
+    def input(self, slot: int, shape: tuple[int, ...]) -> np.ndarray:
+        return np.ndarray(
+            shape,
+            dtype=np.uint8,
+            buffer=self.shm.buf,
+            offset=self.inputs_offset + slot * self.input_size,
+        )
+
+    def set_output(self, slot: int, detections: np.ndarray) -> None:
+        """Copy a detections array to a slot, padding or truncating its rows."""
+        output = self.outputs[slot]
+        count = min(len(detections), len(output))
+        output[:count] = detections[:count]
+        output[count:] = 0
+
+    def close(self) -> None:
+        del self.request_times, self.outputs
+        self.shm.close()
+
+    def unlink(self) -> None:
+        self.shm.unlink()
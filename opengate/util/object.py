@@ -11,10 +11,14 @@ from peewee import DoesNotExist
 
 from opengate.config import DetectConfig, ModelConfig
 from opengate.const import (
+    CLUSTER_VECTORIZE_MIN_BOXES,
     LABEL_CONSOLIDATION_DEFAULT,
     LABEL_CONSOLIDATION_MAP,
     LABEL_NMS_DEFAULT,
     LABEL_NMS_MAP,
+    MOSAIC_SEAM_TOLERANCE,
+    REGION_GRID_EVENT_BATCH,
+    REGION_GRID_MAX_ENTRIES,
 )
 from opengate.detectors.detector_config import PixelFormatEnum
 from opengate.models import Event, Regions, Timeline
@@ -34,71 +38,40 @@ logger = logging.getLogger(__name__)
 GRID_SIZE = 8
 
 
-def get_camera_regions_grid(
-    name: str,
-    detect: DetectConfig,
-    min_region_size: int,
-) -> list[list[dict[str, any]]]:
-    """Build a grid of expected region sizes for a camera."""
-    # get grid from db if available
-    try:
-        regions: Regions = Regions.select().where(Regions.camera == name).get()
-        grid = regions.grid
-        last_update = regions.last_update
-    except DoesNotExist:
-        grid = []
-        for x in range(GRID_SIZE):
-            row = []
-            for y in range(GRID_SIZE):
-                row.append({"sizes": []})
-            grid.append(row)
-        last_update = 0
+def create_region_grid() -> list[list[dict[str, any]]]:
+    return [[{"count": 0} for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
 
-    # get events for timeline entries
-    events = (
-        Event.select(Event.id)
-        .where(Event.camera == name)
-        .where((Event.false_positive == None) | (Event.false_positive == False))
-        .where(Event.start_time > last_update)
-    )
-    valid_event_ids = [e["id"] for e in events.dicts()]
-    logger.debug(f"Found {len(valid_event_ids)} new events for {name}")
 
-    # no new events, return as is
-    if not valid_event_ids:
-        return grid
+def add_region_size(cell: dict[str, any], size: float) -> None:
+    """Add a relative region size to the running statistics of a grid cell."""
+    # Welford's algorithm, so the sizes themselves never need to be kept
+    count = cell.get("count", 0) + 1
+    delta = size - cell.get("mean", 0.0)
+    mean = cell.get("mean", 0.0) + delta / count
+    m2 = cell.get("m2", 0.0) + delta * (size - mean)
+    cell["count"] = count
+    cell["mean"] = mean
+    cell["m2"] = m2
+    cell["std_dev"] = math.sqrt(m2 / count)
 
-    new_update = datetime.datetime.now().timestamp()
-    timeline = (
-        Timeline.select(
-            *[
-                Timeline.camera,
-                Timeline.source,
-                Timeline.data,
-            ]
-        )
-        .where(Timeline.source_id << valid_event_ids)
-        .limit(10000)
-        .dicts()
-    )
-
-    logger.debug(f"Found {len(timeline)} new entries for {name}")
 
+def update_region_grid(
+    grid: list[list[dict[str, any]]],
+    detect: DetectConfig,
+    min_region_size: int,
+    boxes: list[list[float]],
+) -> None:
+    """Add the regions of relative x, y, width, height object boxes to a grid."""
     width = detect.width
     height = detect.height
 
-    for t in timeline:
-        if t.get("source") != "tracked_object":
-            continue
-
-        box = t["data"]["box"]
-
+    for box in boxes:
         # calculate centroid position
         x = box[0] + (box[2] / 2)
         y = box[1] + (box[3] / 2)
 
-        x_pos = int(x * GRID_SIZE)
-        y_pos = int(y * GRID_SIZE)
+        x_pos = min(GRID_SIZE - 1, int(x * GRID_SIZE))
+        y_pos = min(GRID_SIZE - 1, int(y * GRID_SIZE))
 
         calculated_region = calculate_region(
             (height, width),
@@ -110,30 +83,41 @@ def get_camera_regions_grid(
             1.35,
         )
         # save width of region to grid as relative
-        grid[x_pos][y_pos]["sizes"].append(
-            (calculated_region[2] - calculated_region[0]) / width
-        )
+        cell = grid[x_pos][y_pos]
+        cell["x"] = x_pos
+        cell["y"] = y_pos
+        add_region_size(cell, (calculated_region[2] - calculated_region[0]) / width)
 
-    for x in range(GRID_SIZE):
-        for y in range(GRID_SIZE):
-            cell = grid[x][y]
 
-            if len(cell["sizes"]) == 0:
+def upgrade_region_grid(grid: list[list[dict[str, any]]]) -> bool:
+    """Replace the size lists of an old grid with running statistics."""
+    upgraded = False
+
+    for row in grid:
+        for cell in row:
+            if "sizes" not in cell:
                 continue
 
-            std_dev = np.std(cell["sizes"])
-            mean = np.mean(cell["sizes"])
-            logger.debug(f"std dev: {std_dev} mean: {mean}")
-            cell["x"] = x
-            cell["y"] = y
-            cell["std_dev"] = std_dev
-            cell["mean"] = mean
+            sizes = cell.pop("sizes")
+            cell["count"] = len(sizes)
 
-    # update db with new grid
+            if sizes:
+                cell["mean"] = float(np.mean(sizes))
+                cell["m2"] = float(np.var(sizes) * len(sizes))
+                cell["std_dev"] = float(np.std(sizes))
+
+            upgraded = True
+
+    return upgraded
+
+
+def save_region_grid(
+    name: str, grid: list[list[dict[str, any]]], last_update: float
+) -> None:
     region = {
         Regions.camera: name,
         Regions.grid: grid,
-        Regions.last_update: new_update,
+        Regions.last_update: last_update,
     }
     (
         Regions.insert(region)
@@ -144,6 +128,64 @@ def get_camera_regions_grid(
         .execute()
     )
 
+
+def get_camera_regions_grid(
+    name: str,
+    detect: DetectConfig,
+    min_region_size: int,
+) -> list[list[dict[str, any]]]:
+    """Build a grid of expected region sizes for a camera.
+
+    The grid is kept up to date as events end, the timeline is only read to
+    build a new grid or to catch up a grid from before the running statistics.
+    """
+    # get grid from db if available
+    try:
+        regions: Regions = Regions.select().where(Regions.camera == name).get()
+        grid = regions.grid
+        last_update = regions.last_update
+
+        if not upgrade_region_grid(grid):
+            return grid
+    except DoesNotExist:
+        grid = create_region_grid()
+        last_update = 0
+
+    # get events for timeline entries
+    events = (
+        Event.select(Event.id)
+        .where(Event.camera == name)
+        .where((Event.false_positive == None) | (Event.false_positive == False))
+        .where(Event.start_time > last_update)
+    )
+    valid_event_ids = [e["id"] for e in events.dicts()]
+    logger.debug(f"Found {len(valid_event_ids)} new events for {name}")
+
+    new_update = datetime.datetime.now().timestamp()
+    entries = 0
+
+    # query in batches to keep the IN clause small
+    for i in range(0, len(valid_event_ids), REGION_GRID_EVENT_BATCH):
+        timeline = (
+            Timeline.select(Timeline.data)
+            .where(
+                Timeline.source_id << valid_event_ids[i : i + REGION_GRID_EVENT_BATCH]
+            )
+            .where(Timeline.source == "tracked_object")
+            .limit(REGION_GRID_MAX_ENTRIES - entries)
+            .dicts()
+        )
+        boxes = [t["data"]["box"] for t in timeline]
+        update_region_grid(grid, detect, min_region_size, boxes)
+        entries += len(boxes)
+
+        if entries >= REGION_GRID_MAX_ENTRIES:
+            break
+
+    logger.debug(f"Found {entries} new entries for {name}")
+
+    # update db with new grid
+    save_region_grid(name, grid, new_update)
     return grid
 
 
@@ -182,7 +224,7 @@ def get_region_from_grid(
     cell = region_grid[grid_x][grid_y]
 
     # if there is no known data, use original region calculation
-    if not cell or not cell["sizes"]:
+    if not cell or not cell.get("count"):
         return box
 
     # convert the calculated region size to relative
@@ -266,18 +308,59 @@ def is_object_filtered(obj, objects_to_track, object_filters):
     return False
 
 
+def objects_filtered(
+    labels, scores, boxes, areas, ratios, objects_to_track, object_filters
+) -> np.ndarray:
+    """Get a bool mask of the objects that is_object_filtered would filter."""
+    labels = np.asarray(labels)
+    scores = np.asarray(scores)
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    areas = np.asarray(areas)
+    ratios = np.asarray(ratios)
+
+    filtered = ~np.isin(labels, list(objects_to_track))
+
+    for object_name in set(labels.tolist()) & object_filters.keys():
+        obj_settings = object_filters[object_name]
+        selected = np.flatnonzero(labels == object_name)
+
+        filtered[selected] |= (
+            (obj_settings.min_area > areas[selected])
+            | (obj_settings.max_area < areas[selected])
+            | (obj_settings.min_score > scores[selected])
+            | (obj_settings.min_ratio > ratios[selected])
+            | (obj_settings.max_ratio < ratios[selected])
+        )
+
+        if obj_settings.mask is not None:
+            mask = np.asarray(obj_settings.mask)
+            # bottom center of the object, clamped to the mask
+            y_location = np.minimum(boxes[selected, 3].astype(int), mask.shape[0] - 1)
+            x_location = np.minimum(
+                ((boxes[selected, 2] + boxes[selected, 0]) / 2.0).astype(int),
+                mask.shape[1] - 1,
+            )
+            filtered[selected] |= mask[y_location, x_location] == 0
+
+    return filtered
+
+
 def get_min_region_size(model_config: ModelConfig) -> int:
     """Get the min region size."""
     return max(model_config.height, model_config.width)
 
 
-def create_tensor_input(frame, model_config: ModelConfig, region):
+def crop_region(frame, model_config: ModelConfig, region):
     if model_config.input_pixel_format == PixelFormatEnum.rgb:
-        cropped_frame = yuv_region_2_rgb(frame, region)
+        return yuv_region_2_rgb(frame, region)
     elif model_config.input_pixel_format == PixelFormatEnum.bgr:
-        cropped_frame = yuv_region_2_bgr(frame, region)
+        return yuv_region_2_bgr(frame, region)
     else:
-        cropped_frame = yuv_region_2_yuv(frame, region)
+        return yuv_region_2_yuv(frame, region)
+
+
+def create_tensor_input(frame, model_config: ModelConfig, region):
+    cropped_frame = crop_region(frame, model_config, region)
 
     # Resize if needed
     if cropped_frame.shape != (model_config.height, model_config.width, 3):
@@ -291,6 +374,67 @@ def create_tensor_input(frame, model_config: ModelConfig, region):
     return np.expand_dims(cropped_frame, axis=0)
 
 
+def get_mosaic_tile_size(model_config: ModelConfig, grid: int) -> tuple[int, int]:
+    return model_config.width // grid, model_config.height // grid
+
+
+def create_mosaic_input(frame, model_config: ModelConfig, regions, grid: int):
+    """Tile up to grid x grid regions row by row into a single model input."""
+    tile_width, tile_height = get_mosaic_tile_size(model_config, grid)
+    mosaic = np.zeros((model_config.height, model_config.width, 3), np.uint8)
+
+    for i, region in enumerate(regions):
+        row, col = divmod(i, grid)
+        mosaic[
+            row * tile_height : (row + 1) * tile_height,
+            col * tile_width : (col + 1) * tile_width,
+        ] = cv2.resize(
+            crop_region(frame, model_config, region),
+            dsize=(tile_width, tile_height),
+            interpolation=cv2.INTER_AREA,
+        )
+
+    return np.expand_dims(mosaic, axis=0)
+
+
+def split_mosaic_detections(
+    detections, model_config: ModelConfig, grid: int, tile_count: int
+) -> list[list]:
+    """Split mosaic detections by tile with boxes relative to their tile.
+
+    Boxes crossing a tile seam mix two regions and are dropped.
+    """
+    tile_width, tile_height = get_mosaic_tile_size(model_config, grid)
+    tile_detections = [[] for _ in range(tile_count)]
+
+    for label, score, box in detections:
+        # boxes are y_min, x_min, y_max, x_max relative to the model input
+        y_min, y_max = box[0] * model_config.height, box[2] * model_config.height
+        x_min, x_max = box[1] * model_config.width, box[3] * model_config.width
+        row = int((y_min + y_max) / 2 // tile_height)
+        col = int((x_min + x_max) / 2 // tile_width)
+
+        if row >= grid or col >= grid or row * grid + col >= tile_count:
+            continue
+
+        tile_box = (
+            (y_min - row * tile_height) / tile_height,
+            (x_min - col * tile_width) / tile_width,
+            (y_max - row * tile_height) / tile_height,
+            (x_max - col * tile_width) / tile_width,
+        )
+
+        if (
+            min(tile_box) < -MOSAIC_SEAM_TOLERANCE
+            or max(tile_box) > 1 + MOSAIC_SEAM_TOLERANCE
+        ):
+            continue
+
+        tile_detections[row * grid + col].append((label, score, tile_box))
+
+    return tile_detections
+
+
 def box_overlaps(b1, b2):
     if b1[2] < b2[0] or b1[0] > b2[2] or b1[1] > b2[3] or b1[3] < b2[1]:
         return False
@@ -358,49 +502,105 @@ def get_cluster_boundary(box, min_region):
     ]
 
 
+def get_boxes_inside_boundaries(boxes, min_region) -> list[list[int]]:
+    """For each box get the indexes of the boxes inside its cluster boundary."""
+    # same as get_cluster_boundary for all boxes at once
+    box_array = np.asarray(boxes, dtype=np.float64)
+    half_size = (box_array[:, 2:] - box_array[:, :2]) / 2
+    max_region_size = np.maximum(
+        min_region,
+        np.trunc(np.sqrt(np.abs(np.prod(half_size * 2, axis=1)) / 0.1)),
+    )
+    centroid = half_size + box_array[:, :2]
+    max_dist = np.trunc(max_region_size[:, np.newaxis] - half_size * 1.1)
+    boundaries = np.trunc(
+        np.concatenate([centroid - max_dist, centroid + max_dist], axis=1)
+    )
+
+    # inside[i, j] is True when box j is inside the cluster boundary of box i
+    inside = np.all(
+        box_array[np.newaxis, :, :2] >= boundaries[:, np.newaxis, :2], axis=2
+    )
+    inside &= np.all(
+        box_array[np.newaxis, :, 2:] <= boundaries[:, np.newaxis, 2:], axis=2
+    )
+    return [np.flatnonzero(row).tolist() for row in inside]
+
+
 def get_cluster_candidates(frame_shape, min_region, boxes):
     # and create a cluster of other boxes using it's max region size
     # only include boxes where the region is an appropriate(except the region could possibly be smaller?)
     # size in the cluster. in order to be in the cluster, the furthest corner needs to be within x,y offset
     # determined by the max_region size minus half the box + 20%
-    # TODO: see if we can do this with numpy
+    # numpy only pays off once there are enough pairs to compare
+    if len(boxes) >= CLUSTER_VECTORIZE_MIN_BOXES:
+        boxes_inside = get_boxes_inside_boundaries(boxes, min_region)
+    else:
+        boxes_inside = None
+    areas = [area(b) for b in boxes]
+
     cluster_candidates = []
-    used_boxes = []
+    used = [False] * len(boxes)
     # loop over each box
     for current_index, b in enumerate(boxes):
-        if current_index in used_boxes:
+        if used[current_index]:
             continue
+
+        used[current_index] = True
         cluster = [current_index]
-        used_boxes.append(current_index)
-        cluster_boundary = get_cluster_boundary(b, min_region)
-        # find all other boxes that fit inside the boundary
-        for compare_index, compare_box in enumerate(boxes):
-            if compare_index in used_boxes:
+        # the bounds of the cluster, same as get_cluster_region
+        min_x = min(b[0], frame_shape[1])
+        min_y = min(b[1], frame_shape[0])
+        max_x = max(b[2], 0)
+        max_y = max(b[3], 0)
+        min_area = areas[current_index]
+
+        # only boxes that fit inside the boundary can join the cluster
+        if boxes_inside is None:
+            cluster_boundary = get_cluster_boundary(b, min_region)
+            compare_indexes = range(len(boxes))
+        else:
+            compare_indexes = boxes_inside[current_index]
+
+        for compare_index in compare_indexes:
+            if used[compare_index]:
                 continue
 
-            # if the box is not inside the potential cluster area, cluster them
-            if not box_inside(cluster_boundary, compare_box):
+            compare_box = boxes[compare_index]
+            if boxes_inside is None and not box_inside(cluster_boundary, compare_box):
                 continue
 
+            cluster_min_x = min(compare_box[0], min_x)
+            cluster_min_y = min(compare_box[1], min_y)
+            cluster_max_x = max(compare_box[2], max_x)
+            cluster_max_y = max(compare_box[3], max_y)
+            cluster_min_area = min(areas[compare_index], min_area)
+
             # get the region if you were to add this box to the cluster
-            potential_cluster = cluster + [compare_index]
-            cluster_region = get_cluster_region(
-                frame_shape, min_region, potential_cluster, boxes
+            cluster_region = calculate_region(
+                frame_shape,
+                cluster_min_x,
+                cluster_min_y,
+                cluster_max_x,
+                cluster_max_y,
+                min_region,
+                multiplier=1.2,
             )
+
             # if region could be smaller and either box would be too small
             # for the resulting region, dont cluster
-            should_cluster = True
-            if (cluster_region[2] - cluster_region[0]) > min_region:
-                for b in potential_cluster:
-                    box = boxes[b]
-                    # boxes should be more than 5% of the area of the region
-                    if area(box) / area(cluster_region) < 0.05:
-                        should_cluster = False
-                        break
+            # boxes should be more than 5% of the area of the region
+            if (cluster_region[2] - cluster_region[0]) > min_region and (
+                cluster_min_area / area(cluster_region) < 0.05
+            ):
+                continue
+
+            cluster.append(compare_index)
+            used[compare_index] = True
+            min_x, min_y = cluster_min_x, cluster_min_y
+            max_x, max_y = cluster_max_x, cluster_max_y
+            min_area = cluster_min_area
 
-            if should_cluster:
-                cluster.append(compare_index)
-                used_boxes.append(compare_index)
         cluster_candidates.append(cluster)
 
     # return the unique clusters only
@@ -431,12 +631,12 @@ def get_startup_regions(
     """Get a list of regions to run on startup."""
     # return 8 most popular regions for the camera
     all_cells = np.concatenate(region_grid).flat
-    startup_cells = sorted(all_cells, key=lambda c: len(c["sizes"]), reverse=True)[0:8]
+    startup_cells = sorted(all_cells, key=lambda c: c.get("count", 0), reverse=True)
     regions = []
 
-    for cell in startup_cells:
+    for cell in startup_cells[0:8]:
         # rest of the cells are empty
-        if not cell["sizes"]:
+        if not cell.get("count"):
             break
 
         x = frame_shape[1] / GRID_SIZE * (0.5 + cell["x"])
@@ -0,0 +1 @@
+VERSION = "0.13.2-06db446"
@@ -1,22 +1,33 @@
 import datetime
+import fcntl
 import logging
 import multiprocessing as mp
 import os
 import queue
+import selectors
 import signal
 import subprocess as sp
 import threading
 import time
 
 import cv2
+import numpy as np
 from setproctitle import setproctitle
 
-from opengate.config import CameraConfig, DetectConfig, ModelConfig
+from opengate.config import (
+    CameraConfig,
+    DetectConfig,
+    IdleConfig,
+    ModelConfig,
+    RegionCacheConfig,
+)
 from opengate.const import (
     ALL_ATTRIBUTE_LABELS,
     ATTRIBUTE_LABEL_MAP,
     CACHE_DIR,
     CACHE_SEGMENT_FORMAT,
+    MOTION_CACHE_DIR,
+    REGION_FINGERPRINT_SIZE,
     REQUEST_REGION_GRID,
 )
 from opengate.log import LogPipe
@@ -27,29 +38,34 @@ from opengate.ptz.autotrack import ptz_moving_at_frame_time
 from opengate.track import ObjectTracker
 from opengate.track.norfair_tracker import NorfairTracker
 from opengate.types import PTZMetricsTypes
+from opengate.util import boxes as box_ops
 from opengate.util.builtin import EventsPerSecond, get_tomorrow_at_time
 from opengate.util.image import (
-    FrameManager,
+    FrameLatencyEnum,
+    FrameStageEnum,
     SharedMemoryFrameManager,
+    SharedMemoryFrameRing,
     draw_box_with_label,
 )
 from opengate.util.object import (
-    box_inside,
+    create_mosaic_input,
     create_tensor_input,
     get_cluster_candidates,
     get_cluster_region,
     get_cluster_region_from_grid,
     get_min_region_size,
     get_startup_regions,
-    inside_any,
-    intersects_any,
-    is_object_filtered,
+    objects_filtered,
     reduce_detections,
+    split_mosaic_detections,
 )
 from opengate.util.services import listen
 
 logger = logging.getLogger(__name__)
 
+# only exported by fcntl since python 3.10
+F_SETPIPE_SZ = getattr(fcntl, "F_SETPIPE_SZ", 1031)
+
 
 def stop_ffmpeg(ffmpeg_process, logger):
     logger.info("Terminating the existing ffmpeg process...")
@@ -79,43 +95,121 @@ def start_or_restart_ffmpeg(
             start_new_session=True,
         )
     else:
+        # unbuffered so frames can be read straight into shared memory
         process = sp.Popen(
             ffmpeg_cmd,
             stdout=sp.PIPE,
             stderr=logpipe,
             stdin=sp.DEVNULL,
-            bufsize=frame_size * 10,
+            bufsize=0,
             start_new_session=True,
         )
+        set_pipe_size(process.stdout, frame_size)
     return process
 
 
+def set_pipe_size(pipe, size: int) -> None:
+    """Grow the kernel buffer of a pipe so a frame needs fewer reads."""
+    try:
+        with open("/proc/sys/fs/pipe-max-size") as f:
+            size = min(size, int(f.read()))
+
+        fcntl.fcntl(pipe.fileno(), F_SETPIPE_SZ, size)
+    except (OSError, ValueError) as e:
+        # not supported on this platform, keep the default size
+        logger.debug(f"Unable to set the pipe size to {size}: {e}")
+
+
+def read_frame(pipe, buffer: memoryview) -> None:
+    """Fill buffer from an unbuffered pipe, handling short reads.
+
+    Raises EOFError if the pipe closes before the frame is complete.
+    """
+    size = len(buffer)
+    read = 0
+
+    while read < size:
+        count = pipe.readinto(buffer[read:])
+
+        if not count:
+            raise EOFError(f"Pipe closed after {read} of {size} bytes.")
+
+        read += count
+
+
+def queue_frame(
+    ring: SharedMemoryFrameRing,
+    frame_queue,
+    frame_time: float,
+    frame_index: int,
+    latest_frame_wins: bool,
+) -> tuple[bool, bool]:
+    """Hand a captured frame over to the camera processor.
+
+    Returns if the frame was queued and if a frame had to be dropped because
+    the queue was full.
+    """
+    ring.hold(frame_index, FrameStageEnum.process)
+
+    # don't lock the queue to check, just try since it should rarely be full
+    try:
+        # add to the queue
+        frame_queue.put((frame_time, frame_index), False)
+        return True, False
+    except queue.Full:
+        pass
+
+    if latest_frame_wins:
+        # drop the oldest queued frame so the newest one gets processed
+        try:
+            _, oldest_index = frame_queue.get_nowait()
+            ring.release(oldest_index, FrameStageEnum.process)
+            frame_queue.put((frame_time, frame_index), False)
+            return True, True
+        except (queue.Empty, queue.Full):
+            pass
+
+    # if the queue is full, skip this frame
+    ring.release(frame_index, FrameStageEnum.process)
+    return False, True
+
+
 def capture_frames(
     ffmpeg_process,
     camera_name,
     frame_shape,
-    frame_manager: FrameManager,
+    frame_manager: SharedMemoryFrameManager,
     frame_queue,
     fps: mp.Value,
     skipped_fps: mp.Value,
+    bytes_copied: mp.Value,
     current_frame: mp.Value,
     stop_event: mp.Event,
+    latest_frame_wins: bool = False,
 ):
     frame_size = frame_shape[0] * frame_shape[1]
     frame_rate = EventsPerSecond()
     frame_rate.start()
     skipped_eps = EventsPerSecond()
     skipped_eps.start()
+    ring = frame_manager.get_ring(camera_name)
+    # frames are still read from ffmpeg when every slot is in use
+    discard_buffer = memoryview(bytearray(frame_size))
     while True:
         fps.value = frame_rate.eps()
         skipped_fps.value = skipped_eps.eps()
 
         current_frame.value = datetime.datetime.now().timestamp()
-        frame_name = f"{camera_name}{current_frame.value}"
-        frame_buffer = frame_manager.create(frame_name, frame_size)
+        frame_index = ring.acquire(current_frame.value)
+        frame_buffer = (
+            discard_buffer if frame_index is None else ring.buffer(frame_index)
+        )
         try:
-            frame_buffer[:] = ffmpeg_process.stdout.read(frame_size)
+            read_frame(ffmpeg_process.stdout, frame_buffer)
         except Exception:
+            if frame_index is not None:
+                ring.release(frame_index, FrameStageEnum.capture)
+
             # shutdown has been initiated
             if stop_event.is_set():
                 break
@@ -125,22 +219,27 @@ def capture_frames(
                 logger.error(
                     f"{camera_name}: ffmpeg process is not running. exiting capture thread..."
                 )
-                frame_manager.delete(frame_name)
                 break
             continue
 
         frame_rate.update()
 
-        # don't lock the queue to check, just try since it should rarely be full
-        try:
-            # add to the queue
-            frame_queue.put(current_frame.value, False)
-            # close the frame
-            frame_manager.close(frame_name)
-        except queue.Full:
-            # if the queue is full, skip this frame
+        # every slot is still held by a consumer, skip this frame
+        if frame_index is None:
             skipped_eps.update()
-            frame_manager.delete(frame_name)
+            continue
+
+        queued, dropped = queue_frame(
+            ring, frame_queue, current_frame.value, frame_index, latest_frame_wins
+        )
+
+        if queued:
+            bytes_copied.value += frame_size
+
+        if dropped:
+            skipped_eps.update()
+
+        ring.release(frame_index, FrameStageEnum.capture)
 
 
 class CameraWatchdog(threading.Thread):
@@ -151,8 +250,10 @@ class CameraWatchdog(threading.Thread):
         frame_queue,
         camera_fps,
         skipped_fps,
+        bytes_copied,
         ffmpeg_pid,
         stop_event,
+        capture_multiplexer=None,
     ):
         threading.Thread.__init__(self)
         self.logger = logging.getLogger(f"watchdog.{camera_name}")
@@ -164,10 +265,12 @@ class CameraWatchdog(threading.Thread):
         self.ffmpeg_other_processes: list[dict[str, any]] = []
         self.camera_fps = camera_fps
         self.skipped_fps = skipped_fps
+        self.bytes_copied = bytes_copied
         self.ffmpeg_pid = ffmpeg_pid
         self.frame_queue = frame_queue
         self.frame_shape = self.config.frame_shape_yuv
         self.frame_size = self.frame_shape[0] * self.frame_shape[1]
+        self.capture_multiplexer = capture_multiplexer
         self.stop_event = stop_event
         self.sleeptime = self.config.ffmpeg.retry_interval
 
@@ -208,27 +311,13 @@ class CameraWatchdog(threading.Thread):
                 self.logger.info(
                     f"No frames received from {self.camera_name} in 20 seconds. Exiting ffmpeg..."
                 )
-                self.ffmpeg_detect_process.terminate()
-                try:
-                    self.logger.info("Waiting for ffmpeg to exit gracefully...")
-                    self.ffmpeg_detect_process.communicate(timeout=30)
-                except sp.TimeoutExpired:
-                    self.logger.info("FFmpeg did not exit. Force killing...")
-                    self.ffmpeg_detect_process.kill()
-                    self.ffmpeg_detect_process.communicate()
+                self.terminate_ffmpeg_detect()
             elif self.camera_fps.value >= (self.config.detect.fps + 10):
                 self.camera_fps.value = 0
                 self.logger.info(
                     f"{self.camera_name} exceeded fps limit. Exiting ffmpeg..."
                 )
-                self.ffmpeg_detect_process.terminate()
-                try:
-                    self.logger.info("Waiting for ffmpeg to exit gracefully...")
-                    self.ffmpeg_detect_process.communicate(timeout=30)
-                except sp.TimeoutExpired:
-                    self.logger.info("FFmpeg did not exit. Force killing...")
-                    self.ffmpeg_detect_process.kill()
-                    self.ffmpeg_detect_process.communicate()
+                self.terminate_ffmpeg_detect()
 
             for p in self.ffmpeg_other_processes:
                 poll = p["process"].poll()
@@ -265,7 +354,11 @@ class CameraWatchdog(threading.Thread):
                     p["cmd"], self.logger, p["logpipe"], ffmpeg_process=p["process"]
                 )
 
-        stop_ffmpeg(self.ffmpeg_detect_process, self.logger)
+        if self.capture_multiplexer:
+            self.logger.info("Terminating the existing ffmpeg process...")
+            self.terminate_ffmpeg_detect()
+        else:
+            stop_ffmpeg(self.ffmpeg_detect_process, self.logger)
         for p in self.ffmpeg_other_processes:
             stop_ffmpeg(p["process"], self.logger)
             p["logpipe"].close()
@@ -279,6 +372,20 @@ class CameraWatchdog(threading.Thread):
             ffmpeg_cmd, self.logger, self.logpipe, self.frame_size
         )
         self.ffmpeg_pid.value = self.ffmpeg_detect_process.pid
+
+        if self.capture_multiplexer:
+            self.capture_thread = self.capture_multiplexer.add(
+                self.camera_name,
+                self.ffmpeg_detect_process,
+                self.frame_shape,
+                self.frame_queue,
+                self.camera_fps,
+                self.skipped_fps,
+                self.bytes_copied,
+                self.config.detect.latest_frame_wins,
+            )
+            return
+
         self.capture_thread = CameraCapture(
             self.camera_name,
             self.ffmpeg_detect_process,
@@ -286,10 +393,30 @@ class CameraWatchdog(threading.Thread):
             self.frame_queue,
             self.camera_fps,
             self.skipped_fps,
+            self.bytes_copied,
             self.stop_event,
+            self.config.detect.latest_frame_wins,
         )
         self.capture_thread.start()
 
+    def terminate_ffmpeg_detect(self):
+        self.ffmpeg_detect_process.terminate()
+        try:
+            self.logger.info("Waiting for ffmpeg to exit gracefully...")
+            self.wait_ffmpeg_detect(timeout=30)
+        except sp.TimeoutExpired:
+            self.logger.info("FFmpeg did not exit. Force killing...")
+            self.ffmpeg_detect_process.kill()
+            self.wait_ffmpeg_detect()
+
+    def wait_ffmpeg_detect(self, timeout=None):
+        # the multiplexer keeps draining the pipe until ffmpeg exits,
+        # reading it here as well would race with it
+        if self.capture_multiplexer:
+            self.ffmpeg_detect_process.wait(timeout=timeout)
+        else:
+            self.ffmpeg_detect_process.communicate(timeout=timeout)
+
     def get_latest_segment_datetime(self, latest_segment: datetime.datetime) -> int:
         """Checks if ffmpeg is still writing recording segments to cache."""
         cache_files = sorted(
@@ -325,7 +452,9 @@ class CameraCapture(threading.Thread):
         frame_queue,
         fps,
         skipped_fps,
+        bytes_copied,
         stop_event,
+        latest_frame_wins=False,
     ):
         threading.Thread.__init__(self)
         self.name = f"capture:{camera_name}"
@@ -335,6 +464,8 @@ class CameraCapture(threading.Thread):
         self.fps = fps
         self.stop_event = stop_event
         self.skipped_fps = skipped_fps
+        self.bytes_copied = bytes_copied
+        self.latest_frame_wins = latest_frame_wins
         self.frame_manager = SharedMemoryFrameManager()
         self.ffmpeg_process = ffmpeg_process
         self.current_frame = mp.Value("d", 0.0)
@@ -349,11 +480,215 @@ class CameraCapture(threading.Thread):
             self.frame_queue,
             self.fps,
             self.skipped_fps,
+            self.bytes_copied,
             self.current_frame,
             self.stop_event,
+            self.latest_frame_wins,
         )
 
 
+class MultiplexedCapture:
+    """Frame assembly state of one camera read by a CaptureMultiplexer.
+
+    Quacks like CameraCapture for the watchdog, it is alive until its ffmpeg
+    process closes the pipe.
+    """
+
+    def __init__(
+        self,
+        camera_name,
+        ffmpeg_process,
+        frame_shape,
+        frame_queue,
+        ring: SharedMemoryFrameRing,
+        fps,
+        skipped_fps,
+        bytes_copied,
+        latest_frame_wins=False,
+    ):
+        self.camera_name = camera_name
+        self.ffmpeg_process = ffmpeg_process
+        self.frame_size = frame_shape[0] * frame_shape[1]
+        self.frame_queue = frame_queue
+        self.ring = ring
+        self.fps = fps
+        self.skipped_fps = skipped_fps
+        self.bytes_copied = bytes_copied
+        self.latest_frame_wins = latest_frame_wins
+        self.current_frame = mp.Value("d", datetime.datetime.now().timestamp())
+        self.frame_rate = EventsPerSecond()
+        self.frame_rate.start()
+        self.skipped_eps = EventsPerSecond()
+        self.skipped_eps.start()
+        # frames are still read from ffmpeg when every slot is in use
+        self.discard_buffer = memoryview(bytearray(self.frame_size))
+        self.frame_index = None
+        self.frame_buffer = None
+        self.offset = 0
+        self.alive = threading.Event()
+        self.alive.set()
+
+    def is_alive(self) -> bool:
+        return self.alive.is_set()
+
+    def update_metrics(self) -> None:
+        self.fps.value = self.frame_rate.eps()
+        self.skipped_fps.value = self.skipped_eps.eps()
+
+    def read(self) -> bool:
+        """Read whatever is available on the pipe, returns False once it is closed."""
+        if self.frame_buffer is None:
+            self.current_frame.value = datetime.datetime.now().timestamp()
+            self.frame_index = self.ring.acquire(self.current_frame.value)
+            self.frame_buffer = (
+                self.discard_buffer
+                if self.frame_index is None
+                else self.ring.buffer(self.frame_index)
+            )
+
+        try:
+            count = self.ffmpeg_process.stdout.readinto(
+                self.frame_buffer[self.offset :]
+            )
+        except BlockingIOError:
+            return True
+        except (OSError, ValueError):
+            count = 0
+
+        if count is None:
+            return True
+
+        if count == 0:
+            self.close()
+            return False
+
+        self.offset += count
+
+        if self.offset < self.frame_size:
+            return True
+
+        self.frame_rate.update()
+
+        # every slot is still held by a consumer, skip this frame
+        if self.frame_index is None:
+            self.skipped_eps.update()
+        else:
+            queued, dropped = queue_frame(
+                self.ring,
+                self.frame_queue,
+                self.current_frame.value,
+                self.frame_index,
+                self.latest_frame_wins,
+            )
+
+            if queued:
+                self.bytes_copied.value += self.frame_size
+
+            if dropped:
+                self.skipped_eps.update()
+
+            self.ring.release(self.frame_index, FrameStageEnum.capture)
+
+        self.frame_index = None
+        self.frame_buffer = None
+        self.offset = 0
+        self.update_metrics()
+        return True
+
+    def close(self) -> None:
+        if self.frame_index is not None:
+            self.ring.release(self.frame_index, FrameStageEnum.capture)
+            self.frame_index = None
+
+        self.frame_buffer = None
+        self.alive.clear()
+
+
+class CaptureMultiplexer(threading.Thread):
+    """Reads the detect pipes of many cameras from a single thread."""
+
+    def __init__(self, stop_event):
+        threading.Thread.__init__(self)
+        self.name = "capture:multiplexer"
+        self.stop_event = stop_event
+        self.frame_manager = SharedMemoryFrameManager()
+        self.selector = selectors.DefaultSelector()
+        self.pending = queue.Queue()
+        # lets add() interrupt a select that is waiting on the other pipes
+        self.wakeup_read, self.wakeup_write = os.pipe()
+        os.set_blocking(self.wakeup_read, False)
+        self.selector.register(self.wakeup_read, selectors.EVENT_READ)
+
+    def add(
+        self,
+        camera_name,
+        ffmpeg_process,
+        frame_shape,
+        frame_queue,
+        fps,
+        skipped_fps,
+        bytes_copied,
+        latest_frame_wins=False,
+    ) -> MultiplexedCapture:
+        os.set_blocking(ffmpeg_process.stdout.fileno(), False)
+        capture = MultiplexedCapture(
+            camera_name,
+            ffmpeg_process,
+            frame_shape,
+            frame_queue,
+            self.frame_manager.get_ring(camera_name),
+            fps,
+            skipped_fps,
+            bytes_copied,
+            latest_frame_wins,
+        )
+        self.pending.put(capture)
+        os.write(self.wakeup_write, b"\0")
+        return capture
+
+    def run(self):
+        last_metrics_update = 0.0
+
+        while not self.stop_event.is_set():
+            while not self.pending.empty():
+                capture = self.pending.get()
+                self.selector.register(
+                    capture.ffmpeg_process.stdout, selectors.EVENT_READ, capture
+                )
+
+            for key, _ in self.selector.select(timeout=1):
+                if key.data is None:
+                    try:
+                        os.read(self.wakeup_read, 1024)
+                    except BlockingIOError:
+                        pass
+                    continue
+
+                capture: MultiplexedCapture = key.data
+
+                if not capture.read():
+                    self.selector.unregister(key.fileobj)
+                    logger.error(
+                        f"{capture.camera_name}: Unable to read frames from ffmpeg process."
+                    )
+
+            # keep the fps decaying for cameras that stopped sending frames
+            now = datetime.datetime.now().timestamp()
+            if now - last_metrics_update >= 1:
+                last_metrics_update = now
+                for key in self.selector.get_map().values():
+                    if key.data is not None:
+                        key.data.update_metrics()
+
+        for key in list(self.selector.get_map().values()):
+            if key.data is not None:
+                key.data.close()
+
+        self.selector.close()
+        os.close(self.wakeup_read)
+        os.close(self.wakeup_write)
+
+
 def capture_camera(name, config: CameraConfig, process_info):
     stop_event = mp.Event()
 
@@ -373,6 +708,7 @@ def capture_camera(name, config: CameraConfig, process_info):
         frame_queue,
         process_info["camera_fps"],
         process_info["skipped_fps"],
+        process_info["bytes_copied"],
         process_info["ffmpeg_pid"],
         stop_event,
     )
@@ -380,12 +716,53 @@ def capture_camera(name, config: CameraConfig, process_info):
     camera_watchdog.join()
 
 
+def capture_cameras(
+    index: int, configs: dict[str, CameraConfig], process_infos: dict[str, dict]
+):
+    """Capture the detect streams of many cameras in a single process."""
+    stop_event = mp.Event()
+
+    def receiveSignal(signalNumber, frame):
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, receiveSignal)
+    signal.signal(signal.SIGINT, receiveSignal)
+
+    threading.current_thread().name = f"capture:multiplexed_{index}"
+    setproctitle(f"opengate.capture:multiplexed_{index}")
+
+    multiplexer = CaptureMultiplexer(stop_event)
+    multiplexer.start()
+
+    watchdogs = []
+    for name, config in configs.items():
+        process_info = process_infos[name]
+        camera_watchdog = CameraWatchdog(
+            name,
+            config,
+            process_info["frame_queue"],
+            process_info["camera_fps"],
+            process_info["skipped_fps"],
+            process_info["bytes_copied"],
+            process_info["ffmpeg_pid"],
+            stop_event,
+            multiplexer,
+        )
+        camera_watchdog.start()
+        watchdogs.append(camera_watchdog)
+
+    for camera_watchdog in watchdogs:
+        camera_watchdog.join()
+
+    multiplexer.join()
+
+
 def track_camera(
     name,
     config: CameraConfig,
     model_config,
     labelmap,
-    detection_queue,
+    detector_queues,
     result_connection,
     detected_objects_queue,
     inter_process_queue,
@@ -424,9 +801,17 @@ def track_camera(
         improve_contrast_enabled,
         motion_threshold,
         motion_contour_area,
+        name=name,
+        state_path=os.path.join(MOTION_CACHE_DIR, f"{name}.npz"),
     )
     object_detector = RemoteObjectDetector(
-        name, labelmap, detection_queue, result_connection, model_config, stop_event
+        name,
+        labelmap,
+        detector_queues,
+        result_connection,
+        model_config,
+        stop_event,
+        config.detect,
     )
 
     object_tracker = NorfairTracker(config, ptz_metrics)
@@ -456,6 +841,7 @@ def track_camera(
         region_grid,
     )
 
+    motion_detector.save_state()
     logger.info(f"{name}: exiting subprocess")
 
 
@@ -469,40 +855,251 @@ def detect(
     object_filters,
 ):
     tensor_input = create_tensor_input(frame, model_config, region)
+    return map_region_detections(
+        detect_config,
+        object_detector.detect(tensor_input),
+        region,
+        objects_to_track,
+        object_filters,
+    )
+
+
+def detect_mosaic(
+    detect_config: DetectConfig,
+    object_detector,
+    frame,
+    model_config,
+    regions,
+    objects_to_track,
+    object_filters,
+):
+    """Detect objects in several regions with a single mosaic input."""
+    grid = detect_config.mosaic.grid
+    tensor_input = create_mosaic_input(frame, model_config, regions, grid)
+    return map_mosaic_detections(
+        detect_config,
+        object_detector.detect(tensor_input),
+        model_config,
+        regions,
+        objects_to_track,
+        object_filters,
+    )
+
+
+def detect_regions(
+    detect_config: DetectConfig,
+    object_detector,
+    frame,
+    model_config,
+    region_groups,
+    objects_to_track,
+    object_filters,
+):
+    """Detect objects in groups of regions, tiling groups of several regions.
+
+    All inputs are submitted before the results are gathered, so the regions
+    of a frame are detected concurrently when the detector allows it.
+    """
+    grid = detect_config.mosaic.grid
+    tensor_inputs = (
+        create_tensor_input(frame, model_config, group[0])
+        if len(group) == 1
+        else create_mosaic_input(frame, model_config, group, grid)
+        for group in region_groups
+    )
 
     detections = []
-    region_detections = object_detector.detect(tensor_input)
-    for d in region_detections:
-        box = d[2]
-        size = region[2] - region[0]
-        x_min = int(max(0, (box[1] * size) + region[0]))
-        y_min = int(max(0, (box[0] * size) + region[1]))
-        x_max = int(min(detect_config.width - 1, (box[3] * size) + region[0]))
-        y_max = int(min(detect_config.height - 1, (box[2] * size) + region[1]))
-
-        # ignore objects that were detected outside the frame
-        if (x_min >= detect_config.width - 1) or (y_min >= detect_config.height - 1):
-            continue
+    for group, group_detections in zip(
+        region_groups, object_detector.detect_all(tensor_inputs)
+    ):
+        if len(group) == 1:
+            detections.extend(
+                map_region_detections(
+                    detect_config,
+                    group_detections,
+                    group[0],
+                    objects_to_track,
+                    object_filters,
+                )
+            )
+        else:
+            detections.extend(
+                map_mosaic_detections(
+                    detect_config,
+                    group_detections,
+                    model_config,
+                    group,
+                    objects_to_track,
+                    object_filters,
+                )
+            )
+    return detections
 
-        width = x_max - x_min
-        height = y_max - y_min
-        area = width * height
-        ratio = width / max(1, height)
-        det = (
-            d[0],
-            d[1],
-            (x_min, y_min, x_max, y_max),
-            area,
-            ratio,
-            region,
+
+def map_mosaic_detections(
+    detect_config: DetectConfig,
+    mosaic_detections,
+    model_config,
+    regions,
+    objects_to_track,
+    object_filters,
+):
+    """Map detections relative to a mosaic to filtered frame detections."""
+    tile_detections = split_mosaic_detections(
+        mosaic_detections, model_config, detect_config.mosaic.grid, len(regions)
+    )
+
+    detections = []
+    for region, region_detections in zip(regions, tile_detections):
+        detections.extend(
+            map_region_detections(
+                detect_config,
+                region_detections,
+                region,
+                objects_to_track,
+                object_filters,
+            )
         )
-        # apply object filters
-        if is_object_filtered(det, objects_to_track, object_filters):
-            continue
-        detections.append(det)
     return detections
 
 
+def map_region_detections(
+    detect_config: DetectConfig,
+    region_detections,
+    region,
+    objects_to_track,
+    object_filters,
+):
+    """Map detections relative to a region to filtered frame detections."""
+    if len(region_detections) == 0:
+        return []
+
+    labels = [d[0] for d in region_detections]
+    scores = [d[1] for d in region_detections]
+    # y_min, x_min, y_max, x_max relative to the region
+    relative = np.array([d[2] for d in region_detections], np.float64)
+
+    size = region[2] - region[0]
+    boxes = np.stack(
+        [
+            np.maximum(0, relative[:, 1] * size + region[0]),
+            np.maximum(0, relative[:, 0] * size + region[1]),
+            np.minimum(detect_config.width - 1, relative[:, 3] * size + region[0]),
+            np.minimum(detect_config.height - 1, relative[:, 2] * size + region[1]),
+        ],
+        axis=1,
+    ).astype(int)
+
+    width = boxes[:, 2] - boxes[:, 0]
+    height = boxes[:, 3] - boxes[:, 1]
+    areas = width * height
+    ratios = width / np.maximum(1, height)
+
+    # ignore objects that were detected outside the frame, apply object filters
+    keep = (boxes[:, 0] < detect_config.width - 1) & (
+        boxes[:, 1] < detect_config.height - 1
+    )
+    keep &= ~objects_filtered(
+        labels, scores, boxes, areas, ratios, objects_to_track, object_filters
+    )
+
+    boxes = boxes.tolist()
+    areas = areas.tolist()
+    ratios = ratios.tolist()
+    return [
+        (labels[i], scores[i], tuple(boxes[i]), areas[i], ratios[i], region)
+        for i in np.flatnonzero(keep)
+    ]
+
+
+class RegionResultCache:
+    """Reuses the detections of regions whose pixels have not changed."""
+
+    def __init__(self, config: RegionCacheConfig):
+        self.config = config
+        # region -> (frame time, fingerprint, detections)
+        self.entries: dict[tuple[int, ...], tuple[float, np.ndarray, list]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.forced_refreshes = 0
+
+    @staticmethod
+    def fingerprint(frame: np.ndarray, region) -> np.ndarray:
+        """Get the downscaled luma of a region from a yuv frame."""
+        # the luma plane is the top two thirds of the frame
+        luma_height = frame.shape[0] * 2 // 3
+        crop = frame[
+            max(0, region[1]) : min(luma_height, region[3]),
+            max(0, region[0]) : min(frame.shape[1], region[2]),
+        ]
+        return cv2.resize(
+            crop,
+            (REGION_FINGERPRINT_SIZE, REGION_FINGERPRINT_SIZE),
+            interpolation=cv2.INTER_AREA,
+        ).astype(np.int16)
+
+    def get(self, frame_time: float, region, fingerprint: np.ndarray):
+        """Get the cached detections of a region or None if it must be detected."""
+        entry = self.entries.get(tuple(region))
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        cached_time, cached_fingerprint, detections = entry
+
+        # compare to the detected pixels so slow changes can't accumulate
+        if np.mean(np.abs(fingerprint - cached_fingerprint)) > self.config.threshold:
+            self.misses += 1
+            return None
+
+        if frame_time - cached_time > self.config.max_age:
+            self.forced_refreshes += 1
+            return None
+
+        self.hits += 1
+        return detections
+
+    def set(self, frame_time: float, region, fingerprint: np.ndarray, detections):
+        self.entries[tuple(region)] = (frame_time, fingerprint, detections)
+
+    def expire(self, frame_time: float) -> None:
+        """Drop the regions that have not been detected within max_age."""
+        self.entries = {
+            region: entry
+            for region, entry in self.entries.items()
+            if frame_time - entry[0] <= self.config.max_age
+        }
+
+
+class IdleScheduler:
+    """Lowers the processing rate of a camera without motion or tracked objects."""
+
+    def __init__(self, config: IdleConfig):
+        self.config = config
+        self.idle = False
+        self.last_active = None
+        self.last_processed = 0.0
+
+    def should_process(self, frame_time: float) -> bool:
+        if not self.idle:
+            return True
+
+        return frame_time - self.last_processed >= 1 / self.config.fps
+
+    def update(self, frame_time: float, active: bool) -> bool:
+        """Update with the result of a processed frame, returns if the camera is idle."""
+        self.last_processed = frame_time
+
+        if active or self.last_active is None:
+            self.last_active = frame_time
+
+        self.idle = (
+            self.config.enabled and frame_time - self.last_active >= self.config.timeout
+        )
+        return self.idle
+
+
 def process_frames(
     camera_name: str,
     inter_process_queue: mp.Queue,
@@ -511,7 +1108,7 @@ def process_frames(
     frame_shape,
     model_config: ModelConfig,
     detect_config: DetectConfig,
-    frame_manager: FrameManager,
+    frame_manager: SharedMemoryFrameManager,
     motion_detector: MotionDetector,
     object_detector: RemoteObjectDetector,
     object_tracker: ObjectTracker,
@@ -528,6 +1125,12 @@ def process_frames(
 ):
     fps = process_info["process_fps"]
     detection_fps = process_info["detection_fps"]
+    idle = process_info["idle"]
+    idle_scheduler = IdleScheduler(detect_config.idle)
+    region_cache = RegionResultCache(detect_config.region_cache)
+    region_cache_hits = process_info["region_cache_hits"]
+    region_cache_misses = process_info["region_cache_misses"]
+    region_cache_forced_refreshes = process_info["region_cache_forced_refreshes"]
     current_frame_time = process_info["detection_frame"]
     next_region_update = get_tomorrow_at_time(2)
 
@@ -538,6 +1141,8 @@ def process_frames(
     stationary_frame_counter = 0
 
     region_min_size = get_min_region_size(model_config)
+    ring = frame_manager.get_ring(camera_name)
+    ring.register(FrameStageEnum.process)
 
     while not stop_event.is_set():
         if (
@@ -555,9 +1160,9 @@ def process_frames(
 
         try:
             if exit_on_empty:
-                frame_time = frame_queue.get(False)
+                frame_time, frame_index = frame_queue.get(False)
             else:
-                frame_time = frame_queue.get(True, 1)
+                frame_time, frame_index = frame_queue.get(True, 1)
         except queue.Empty:
             if exit_on_empty:
                 logger.info("Exiting track_objects...")
@@ -566,25 +1171,44 @@ def process_frames(
 
         current_frame_time.value = frame_time
         ptz_metrics["ptz_frame_time"].value = frame_time
-        key = f"{camera_name}{frame_time}"
+
+        # capture already holds the frame for this stage, this only verifies it
+        if not frame_manager.hold(camera_name, frame_index, FrameStageEnum.process):
+            logger.info(
+                f"{camera_name}: frame {frame_time} was freed before processing."
+            )
+            continue
+
+        # idle cameras only look for motion and objects at the idle rate, the
+        # other frames are passed on with the last tracked objects
+        idle_frame = not idle_scheduler.should_process(frame_time)
 
         # The ratio is because YUV later reduces the frame size by 1.5
         # So we bumped up the ratio here, later reduced it in the YUV conversion
         # and gets a perfect frame
-        frame = frame_manager.get(key, (frame_shape[0] * 3 // 2, frame_shape[1]))
+        frame = frame_manager.get(
+            camera_name, (frame_shape[0] * 3 // 2, frame_shape[1]), frame_index
+        )
 
         if frame is None:
             logger.info(f"{camera_name}: frame {frame_time} is not in memory store.")
             continue
 
         # look for motion if enabled
-        motion_boxes = motion_detector.detect(frame) if motion_enabled.value else []
+        motion_boxes = (
+            motion_detector.detect(frame)
+            if motion_enabled.value and not idle_frame
+            else []
+        )
+        ring.record_latency(FrameLatencyEnum.motion, frame_time)
 
         regions = []
         consolidated_detections = []
 
+        if idle_frame:
+            object_tracker.update_frame_times(frame_time)
         # if detection is disabled
-        if not detection_enabled.value:
+        elif not detection_enabled.value:
             object_tracker.match_and_update(frame_time, [])
         else:
             # get stationary object ids
@@ -596,18 +1220,23 @@ def process_frames(
                 stationary_object_ids = []
             else:
                 stationary_frame_counter += 1
-                stationary_object_ids = [
-                    obj["id"]
+                stationary_objects = [
+                    obj
                     for obj in object_tracker.tracked_objects.values()
                     # if it has exceeded the stationary threshold
                     if obj["motionless_count"] >= detect_config.stationary.threshold
                     # and it hasn't disappeared
                     and object_tracker.disappeared[obj["id"]] == 0
-                    # and it doesn't overlap with any current motion boxes when not calibrating
-                    and not intersects_any(
-                        obj["box"],
-                        [] if motion_detector.is_calibrating() else motion_boxes,
-                    )
+                ]
+                # and it doesn't overlap with any current motion boxes when not calibrating
+                moving = box_ops.intersects_any(
+                    [obj["box"] for obj in stationary_objects],
+                    [] if motion_detector.is_calibrating() else motion_boxes,
+                )
+                stationary_object_ids = [
+                    obj["id"]
+                    for obj, obj_moving in zip(stationary_objects, moving)
+                    if not obj_moving
                 ]
 
             # get tracked object boxes that aren't stationary
@@ -642,7 +1271,11 @@ def process_frames(
             ):
                 # find motion boxes that are not inside tracked object regions
                 standalone_motion_boxes = [
-                    b for b in motion_boxes if not inside_any(b, regions)
+                    b
+                    for b, inside in zip(
+                        motion_boxes, box_ops.inside_any(motion_boxes, regions)
+                    )
+                    if not inside
                 ]
 
                 if standalone_motion_boxes:
@@ -686,20 +1319,70 @@ def process_frames(
                 if obj["id"] in stationary_object_ids
             ]
 
-            for region in regions:
-                detections.extend(
-                    detect(
-                        detect_config,
-                        object_detector,
-                        frame,
-                        model_config,
+            # reuse the detections of regions that have not changed
+            uncached_regions = regions
+            if detect_config.region_cache.enabled:
+                uncached_regions = []
+                fingerprints = []
+
+                for region in regions:
+                    fingerprint = region_cache.fingerprint(frame, region)
+                    cached = region_cache.get(frame_time, region, fingerprint)
+
+                    if cached is None:
+                        uncached_regions.append(region)
+                        fingerprints.append(fingerprint)
+                    else:
+                        detections.extend(cached)
+
+                region_cache_hits.value = region_cache.hits
+                region_cache_misses.value = region_cache.misses
+                region_cache_forced_refreshes.value = region_cache.forced_refreshes
+
+            # tile the minimum size regions into shared inputs
+            mosaic_regions = []
+            tiles = detect_config.mosaic.grid**2
+            if detect_config.mosaic.enabled:
+                mosaic_regions = [
+                    r for r in uncached_regions if r[2] - r[0] <= region_min_size
+                ]
+
+                # too few regions left for the last mosaic are detected alone
+                remainder = len(mosaic_regions) % tiles
+                if remainder and remainder < detect_config.mosaic.min_regions:
+                    mosaic_regions = mosaic_regions[:-remainder]
+
+            region_groups = [
+                mosaic_regions[i : i + tiles]
+                for i in range(0, len(mosaic_regions), tiles)
+            ] + [[r] for r in uncached_regions if r not in mosaic_regions]
+
+            region_detections = detect_regions(
+                detect_config,
+                object_detector,
+                frame,
+                model_config,
+                region_groups,
+                objects_to_track,
+                object_filters,
+            )
+
+            if detect_config.region_cache.enabled:
+                for region, fingerprint in zip(uncached_regions, fingerprints):
+                    region_cache.set(
+                        frame_time,
                         region,
-                        objects_to_track,
-                        object_filters,
+                        fingerprint,
+                        [d for d in region_detections if d[5] == region],
                     )
-                )
+
+                # after the lookups so the refreshes of old regions are counted
+                region_cache.expire(frame_time)
+
+            detections.extend(region_detections)
 
             consolidated_detections = reduce_detections(frame_shape, detections)
+            ring.record_latency(FrameLatencyEnum.detect, frame_time)
 
             # if detection was run on this frame, consolidate
             if len(regions) > 0:
@@ -714,6 +1397,15 @@ def process_frames(
             else:
                 object_tracker.update_frame_times(frame_time)
 
+        ring.record_latency(FrameLatencyEnum.track, frame_time)
+
+        # any motion or tracked object resumes the full rate
+        if not idle_frame:
+            idle.value = idle_scheduler.update(
+                frame_time,
+                len(motion_boxes) > 0 or len(object_tracker.tracked_objects) > 0,
+            )
+
         # group the attribute detections based on what label they apply to
         attribute_detections = {}
         for label, attribute_labels in ATTRIBUTE_LABEL_MAP.items():
@@ -721,15 +1413,29 @@ def process_frames(
                 d for d in consolidated_detections if d[0] in attribute_labels
             ]
 
+        # find the attributes inside each object with an associated label
+        tracked_objects = list(object_tracker.tracked_objects.values())
+        attributes_inside = {
+            label: box_ops.inside_matrix(
+                [obj["box"] for obj in tracked_objects],
+                [d[2] for d in label_attributes],
+            )
+            for label, label_attributes in attribute_detections.items()
+            if label_attributes
+        }
+
         # build detections and add attributes
         detections = {}
-        for obj in object_tracker.tracked_objects.values():
+        for i, obj in enumerate(tracked_objects):
             attributes = []
             # if the objects label has associated attribute detections
-            if obj["label"] in attribute_detections.keys():
+            if obj["label"] in attributes_inside:
                 # add them to attributes if they intersect
-                for attribute_detection in attribute_detections[obj["label"]]:
-                    if box_inside(obj["box"], (attribute_detection[2])):
+                for attribute_detection, inside in zip(
+                    attribute_detections[obj["label"]],
+                    attributes_inside[obj["label"]][i],
+                ):
+                    if inside:
                         attributes.append(
                             {
                                 "label": attribute_detection[0],
@@ -812,19 +1518,22 @@ def process_frames(
             )
         # add to the queue if not full
         if detected_objects_queue.full():
-            frame_manager.delete(f"{camera_name}{frame_time}")
+            frame_manager.release(camera_name, frame_index, FrameStageEnum.process)
             continue
         else:
             fps_tracker.update()
             fps.value = fps_tracker.eps()
+            # hand the frame over to the tracked object processor
+            frame_manager.hold(camera_name, frame_index, FrameStageEnum.tracked)
             detected_objects_queue.put(
                 (
                     camera_name,
                     frame_time,
+                    frame_index,
                     detections,
                     motion_boxes,
                     regions,
                 )
             )
             detection_fps.value = object_detector.fps.eps()
-            frame_manager.close(f"{camera_name}{frame_time}")
+            frame_manager.release(camera_name, frame_index, FrameStageEnum.process)
@@ -113,6 +113,10 @@ class ProcessClip:
             "process_fps": mp.Value("d", 0.0),
             "detection_fps": mp.Value("d", 0.0),
             "detection_frame": mp.Value("d", 0.0),
+            "idle": mp.Value("i", 0),
+            "region_cache_hits": mp.Value("i", 0),
+            "region_cache_misses": mp.Value("i", 0),
+            "region_cache_forced_refreshes": mp.Value("i", 0),
         }
 
         detection_enabled = mp.Value("d", 1)